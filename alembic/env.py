@@ -8,7 +8,7 @@ from app.models.base import Base
 # Import all models for Alembic to detect
 from app.models.user import User
 from app.models.horse import Horse, HorseImage  # noqa
-from app.models.market import MarketListing, Transaction
+from app.models.market import MarketListing, Transaction, PriceStatistic
 from app.models.rental import RentalListing, RentalBooking
 
 config = context.config
@@ -18,6 +18,13 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Objects created by DDL outside the models (search tables, columns and
+    # indexes, see app.db.search) aren't autogenerate's to drop
+    if reflected and compare_to is None:
+        return False
+    return True
+
 def get_url():
     return settings.SQLALCHEMY_DATABASE_URL
 
@@ -26,6 +33,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -44,8 +52,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, 
-            target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,221 @@
+"""baseline schema
+
+The schema as `Base.metadata.create_all()` created it before migrations:
+existing databases created that way are `alembic stamp 0001`-ed, new
+ones start with `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 18:57:55.459248
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('price_statistics',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Float(), nullable=False),
+    sa.Column('min_price', sa.Float(), nullable=True),
+    sa.Column('max_price', sa.Float(), nullable=True),
+    sa.Column('sketch', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dimension', 'key')
+    )
+    op.create_index(op.f('ix_price_statistics_id'), 'price_statistics', ['id'], unique=False)
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('horses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('breed', sa.Enum('ARABIAN', 'THOROUGHBRED', 'QUARTER_HORSE', 'APPALOOSA', 'ANDALUSIAN', 'FRIESIAN', 'MORGAN', 'MUSTANG', 'PAINT', 'WARMBLOOD', 'OTHER', name='horsebreed'), nullable=True),
+    sa.Column('age', sa.Integer(), nullable=True),
+    sa.Column('gender', sa.Enum('STALLION', 'MARE', 'GELDING', 'COLT', 'FILLY', name='horsegender'), nullable=True),
+    sa.Column('color', sa.String(length=50), nullable=True),
+    sa.Column('height', sa.Float(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('training_level', sa.String(length=100), nullable=True),
+    sa.Column('health_records', sa.Text(), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_horses_id'), 'horses', ['id'], unique=False)
+    op.create_table('horse_images',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('horse_id', sa.Integer(), nullable=True),
+    sa.Column('image_url', sa.String(length=255), nullable=False),
+    sa.Column('is_primary', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['horse_id'], ['horses.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_horse_images_id'), 'horse_images', ['id'], unique=False)
+    op.create_table('market_listings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('horse_id', sa.Integer(), nullable=False),
+    sa.Column('seller_id', sa.Integer(), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('ACTIVE', 'PENDING', 'SOLD', 'CANCELLED', name='listingstatus'), nullable=True),
+    sa.Column('is_negotiable', sa.Boolean(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['horse_id'], ['horses.id'], ),
+    sa.ForeignKeyConstraint(['seller_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_market_listings_id'), 'market_listings', ['id'], unique=False)
+    op.create_table('rental_listings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('horse_id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('price_per_hour', sa.Float(), nullable=True),
+    sa.Column('price_per_day', sa.Float(), nullable=True),
+    sa.Column('price_per_week', sa.Float(), nullable=True),
+    sa.Column('price_per_month', sa.Float(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('AVAILABLE', 'BOOKED', 'UNAVAILABLE', name='rentalstatus'), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('requirements', sa.Text(), nullable=True),
+    sa.Column('available_durations', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['horse_id'], ['horses.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rental_listings_id'), 'rental_listings', ['id'], unique=False)
+    op.create_table('rental_bookings',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('rental_listing_id', sa.Integer(), nullable=False),
+    sa.Column('renter_id', sa.Integer(), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('end_date', sa.DateTime(), nullable=False),
+    sa.Column('duration_type', sa.Enum('HOURLY', 'DAILY', 'WEEKLY', 'MONTHLY', name='rentalduration'), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'CONFIRMED', 'ACTIVE', 'COMPLETED', 'CANCELLED', name='bookingstatus'), nullable=True),
+    sa.Column('special_requests', sa.Text(), nullable=True),
+    sa.Column('payment_status', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['rental_listing_id'], ['rental_listings.id'], ),
+    sa.ForeignKeyConstraint(['renter_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_rental_bookings_id'), 'rental_bookings', ['id'], unique=False)
+    op.create_index('ix_rental_bookings_listing_period', 'rental_bookings', ['rental_listing_id', 'start_date', 'end_date'], unique=False)
+    op.create_table('transactions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('listing_id', sa.Integer(), nullable=False),
+    sa.Column('buyer_id', sa.Integer(), nullable=False),
+    sa.Column('final_price', sa.Float(), nullable=False),
+    sa.Column('payment_status', sa.String(), nullable=True),
+    sa.Column('payment_method', sa.String(), nullable=True),
+    sa.Column('transaction_notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['buyer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['listing_id'], ['market_listings.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_transactions_id'), 'transactions', ['id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Horse search (app.db.search): weighted tsvector + trigram indexes
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "ALTER TABLE horses ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(name, '')), 'A') "
+            "|| setweight(to_tsvector('english', coalesce(description, '')), 'B')) STORED"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_horses_search_vector ON horses USING gin (search_vector)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_horses_name_trgm ON horses USING gin (name gin_trgm_ops)")
+        # No overlapping active bookings per listing
+        op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        op.execute(
+            "ALTER TABLE rental_bookings ADD CONSTRAINT rental_bookings_no_overlap "
+            "EXCLUDE USING gist (rental_listing_id WITH =, tsrange(start_date, end_date) WITH &&) "
+            "WHERE (status IN ('PENDING', 'CONFIRMED', 'ACTIVE'))"
+        )
+    elif dialect == "sqlite":
+        # Horse search: FTS5 trigram index kept in sync by triggers
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS horses_fts USING fts5(name, description, "
+            "content='horses', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS horses_fts_ai AFTER INSERT ON horses BEGIN "
+            "INSERT INTO horses_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS horses_fts_ad AFTER DELETE ON horses BEGIN "
+            "INSERT INTO horses_fts(horses_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS horses_fts_au AFTER UPDATE OF name, description ON horses BEGIN "
+            "INSERT INTO horses_fts(horses_fts, rowid, name, description) "
+            "VALUES ('delete', old.id, old.name, old.description); "
+            "INSERT INTO horses_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("DROP TABLE IF EXISTS horses_fts")
+    op.drop_index(op.f('ix_transactions_id'), table_name='transactions')
+    op.drop_table('transactions')
+    op.drop_index('ix_rental_bookings_listing_period', table_name='rental_bookings')
+    op.drop_index(op.f('ix_rental_bookings_id'), table_name='rental_bookings')
+    op.drop_table('rental_bookings')
+    op.drop_index(op.f('ix_rental_listings_id'), table_name='rental_listings')
+    op.drop_table('rental_listings')
+    op.drop_index(op.f('ix_market_listings_id'), table_name='market_listings')
+    op.drop_table('market_listings')
+    op.drop_index(op.f('ix_horse_images_id'), table_name='horse_images')
+    op.drop_table('horse_images')
+    op.drop_index(op.f('ix_horses_id'), table_name='horses')
+    op.drop_table('horses')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_price_statistics_id'), table_name='price_statistics')
+    op.drop_table('price_statistics')
+    if op.get_bind().dialect.name == "postgresql":
+        for name in ("bookingstatus", "rentalduration", "rentalstatus", "listingstatus", "horsegender", "horsebreed"):
+            sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,58 @@
+"""query shape indexes
+
+Indexes for the filters and orderings the CRUD layer actually issues: the
+per-user lists (`WHERE <owner> = ? ORDER BY id LIMIT ?`), listings by
+status, price ranges over active listings and the images every horse page
+loads. See `benchmarks.indexes` for their effect on a seeded dataset.
+
+On Postgres they are built CONCURRENTLY, so upgrading a live database
+doesn't block writes to these tables.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 18:58:36.258403
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_ONLY = {
+    "postgresql_where": sa.text("status = 'ACTIVE'"),
+    "sqlite_where": sa.text("status = 'ACTIVE'"),
+}
+
+# (name, table, columns, dialect options)
+INDEXES = [
+    ('ix_horses_owner', 'horses', ['owner_id', 'id'], {}),
+    ('ix_horse_images_horse', 'horse_images', ['horse_id'], {}),
+    ('ix_market_listings_seller', 'market_listings', ['seller_id', 'id'], {}),
+    ('ix_market_listings_status', 'market_listings', ['status', 'id'], {}),
+    ('ix_market_listings_active_price', 'market_listings', ['price'], ACTIVE_ONLY),
+    ('ix_transactions_buyer', 'transactions', ['buyer_id', 'id'], {}),
+    ('ix_rental_listings_owner', 'rental_listings', ['owner_id', 'id'], {}),
+    ('ix_rental_bookings_renter', 'rental_bookings', ['renter_id', 'id'], {}),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, postgresql_concurrently=True, **options
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,50 @@
+"""listing coordinates
+
+Latitude/longitude on market and rental listings, and the indexed grid
+cell (see `app.db.geo`) radius searches look them up by. Existing listings
+have no coordinates and so don't show up in radius searches. The cell is
+indexed after the status since radius searches only look at active or
+available listings.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 19:32:10.118231
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('market_listings', 'rental_listings')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('latitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('longitude', sa.Float(), nullable=True))
+        op.add_column(table, sa.Column('geo_cell', sa.Integer(), nullable=True))
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_geo_cell', table, ['status', 'geo_cell'], unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.drop_index(f'ix_{table}_geo_cell', table_name=table, postgresql_concurrently=True)
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('geo_cell')
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,30 @@
+"""horse image uploads
+
+Content hash of uploaded horse images, which locates the image and its
+variants in the media store (see `app.core.media`).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 21:05:42.530114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('horse_images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('horse_images') as batch_op:
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,33 @@
+"""listing versions
+
+Version counters of market and rental listings, which make concurrent
+updates of the same listing fail instead of overwriting each other.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 23:12:08.417305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('market_listings', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('rental_listings', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('rental_listings') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('market_listings') as batch_op:
+        batch_op.drop_column('version')
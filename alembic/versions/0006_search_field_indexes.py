@@ -0,0 +1,49 @@
+"""search field indexes
+
+GIN indexes on each searchable horse column's weighted tsvector, which
+`app.db.search` matches against when `search_in` names only some of the
+columns, so such searches don't scan every row. Postgres only; SQLite's
+FTS5 table already filters by column.
+
+Built CONCURRENTLY, so upgrading a live database doesn't block writes.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:41:27.530912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, expression); must match SearchIndex._vector_sql
+INDEXES = [
+    ('ix_horses_name_tsvector', "setweight(to_tsvector('english', coalesce(name, '')), 'A')"),
+    ('ix_horses_description_tsvector', "setweight(to_tsvector('english', coalesce(description, '')), 'B')"),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, expression in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON horses USING gin (({expression}))"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,31 @@
+"""user superuser flag
+
+Marks the users allowed to see operational endpoints such as /metrics.
+Nobody is a superuser until granted with
+`python -m app.cli grant-superuser <email>`.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:27:53.104761
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('is_superuser', sa.Boolean(), server_default=sa.false(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('is_superuser')
@@ -0,0 +1,50 @@
+"""price stats shards
+
+Spreads each price statistics group over several rows, so that concurrent
+sales don't all lock the same one; existing rows become shard 0.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 21:36:52.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 0001 left the (dimension, key) constraint unnamed: Postgres named it
+# itself, SQLite reflects it as named by this convention
+_SQLITE_NAMES = {"uq": "uq_%(table_name)s_%(column_0_name)s"}
+
+
+def _old_constraint() -> str:
+    if op.get_bind().dialect.name == 'sqlite':
+        return 'uq_price_statistics_dimension'
+    return 'price_statistics_dimension_key_key'
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('price_statistics', naming_convention=_SQLITE_NAMES) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+        batch_op.drop_constraint(_old_constraint(), type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_price_statistics_dimension_key_shard', ['dimension', 'key', 'shard']
+        )
+
+
+def downgrade() -> None:
+    # Only shard 0 fits the old constraint; run `python -m app.cli
+    # rebuild-price-stats` afterwards to count the other shards' sales again
+    op.execute("DELETE FROM price_statistics WHERE shard <> 0")
+    with op.batch_alter_table('price_statistics', naming_convention=_SQLITE_NAMES) as batch_op:
+        batch_op.drop_constraint('uq_price_statistics_dimension_key_shard', type_='unique')
+        batch_op.create_unique_constraint(_old_constraint(), ['dimension', 'key'])
+        batch_op.drop_column('shard')
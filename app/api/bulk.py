@@ -0,0 +1,224 @@
+import csv
+import json
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.config import settings
+from app.schemas.bulk import BulkImportResult, BulkRowError
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv",)
+
+# (line, row) pairs as they flow through an import
+Row = Tuple[int, Any]
+RowError = Tuple[int, str]
+ChunkInserter = Callable[[List[Row]], Awaitable[Tuple[List[int], List[RowError]]]]
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+def _check_line(line_no: int, size: int) -> None:
+    if size > settings.BULK_IMPORT_MAX_LINE_BYTES:
+        raise _too_large(
+            f"Line {line_no} is longer than {settings.BULK_IMPORT_MAX_LINE_BYTES} bytes"
+        )
+
+
+async def _lines(stream: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    buffer = b""
+    line_no = 0
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > settings.BULK_IMPORT_MAX_BODY_BYTES:
+            raise _too_large(f"Body is larger than {settings.BULK_IMPORT_MAX_BODY_BYTES} bytes")
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            _check_line(line_no, len(line))
+            yield line_no, line.rstrip(b"\r")
+        # The line in progress, which no newline may ever end
+        _check_line(line_no + 1, len(buffer))
+    if buffer.strip():
+        yield line_no + 1, buffer.rstrip(b"\r")
+
+
+async def _ndjson_records(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    async for line_no, line in _lines(stream):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+
+
+async def _csv_records(
+    stream: AsyncIterator[bytes],
+) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    header: Optional[List[str]] = None
+    pending: List[str] = []
+    pending_size = 0
+    start = 0
+    async for line_no, raw in _lines(stream):
+        try:
+            line = raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError as e:
+            yield line_no, None, f"Invalid UTF-8: {e}"
+            continue
+        if not pending:
+            start = line_no
+            pending_size = 0
+        pending.append(line)
+        pending_size += len(raw) + 1
+        # A quoted field that never closes would gather the rest of the body
+        _check_line(start, pending_size)
+        # An odd number of quotes means a quoted field continues on the next line
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        values = next(csv.reader(["\n".join(pending)]), [])
+        pending = []
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if not any(values):
+            continue
+        if len(values) != len(header):
+            yield start, None, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells are missing values, so optional fields fall back to defaults
+        yield start, {
+            name: value for name, value in zip(header, values) if value != ""
+        }, None
+    if pending:
+        yield start, None, "Unterminated quoted field"
+
+
+def _records(request: Request) -> AsyncIterator[Tuple[int, Any, Optional[str]]]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > settings.BULK_IMPORT_MAX_BODY_BYTES:
+        raise _too_large(f"Body is larger than {settings.BULK_IMPORT_MAX_BODY_BYTES} bytes")
+    if content_type in NDJSON_CONTENT_TYPES:
+        return _ndjson_records(request.stream())
+    if content_type in CSV_CONTENT_TYPES:
+        return _csv_records(request.stream())
+    raise HTTPException(
+        status_code=415,
+        detail="Send rows as application/x-ndjson or text/csv",
+    )
+
+
+def _validate(
+    adapter: TypeAdapter, batch: List[Row]
+) -> Tuple[List[Row], List[BulkRowError]]:
+    # One pydantic call for the whole batch; only when some rows fail are
+    # the remaining ones validated again without them
+    try:
+        models = adapter.validate_python([data for _, data in batch])
+        return [(line, model) for (line, _), model in zip(batch, models)], []
+    except ValidationError as e:
+        by_index: Dict[int, List[Any]] = {}
+        for error in e.errors(include_url=False, include_context=False):
+            index, *loc = error["loc"]
+            by_index.setdefault(index, []).append({**error, "loc": loc})
+    errors = [
+        BulkRowError(line=batch[index][0], message="Invalid row", errors=row_errors)
+        for index, row_errors in sorted(by_index.items())
+    ]
+    remaining = [row for index, row in enumerate(batch) if index not in by_index]
+    valid, _ = _validate(adapter, remaining) if remaining else ([], [])
+    return valid, errors
+
+
+def split_owned(
+    rows: Iterable[Row], owned: Set[int], field: str = "horse_id"
+) -> Tuple[List[Row], List[RowError]]:
+    """
+    Separate rows whose `field` references a horse in `owned` from the rest.
+    """
+    allowed, rejected = [], []
+    for line, model in rows:
+        if getattr(model, field) in owned:
+            allowed.append((line, model))
+        else:
+            rejected.append((line, "Horse not found or not owned by you"))
+    return allowed, rejected
+
+
+async def import_rows(
+    request: Request, schema: Type[BaseModel], insert_chunk: ChunkInserter
+) -> BulkImportResult:
+    """
+    Stream NDJSON or CSV rows from the request body, validate them against
+    `schema` chunk by chunk and hand each chunk's valid rows to
+    `insert_chunk`, which inserts them in one transaction and returns the
+    new ids plus any rows it rejected. A chunk that fails in the database
+    is rolled back as a whole and its rows are reported as failed; earlier
+    chunks stay committed. A line (or CSV record) or body over the
+    BULK_IMPORT_MAX_* limits stops the import with 413, also leaving the
+    chunks before it committed.
+    """
+    adapter = TypeAdapter(List[schema])
+    chunk_size = settings.BULK_IMPORT_CHUNK_SIZE
+    result = BulkImportResult(created=0, failed=0, ids=[], errors=[])
+
+    def fail(error: BulkRowError) -> None:
+        result.failed += 1
+        if len(result.errors) < settings.BULK_IMPORT_MAX_ERRORS:
+            result.errors.append(error)
+        else:
+            result.errors_truncated = True
+
+    async def flush(batch: List[Row]) -> None:
+        valid, invalid = _validate(adapter, batch)
+        for error in invalid:
+            fail(error)
+        if not valid:
+            return
+        try:
+            ids, rejected = await insert_chunk(valid)
+        except SQLAlchemyError as e:
+            message = f"Chunk rolled back: {e.__class__.__name__}: {getattr(e, 'orig', None) or e}"
+            for line, _ in valid:
+                fail(BulkRowError(line=line, message=message))
+            return
+        for line, message in rejected:
+            fail(BulkRowError(line=line, message=message))
+        result.ids.extend(ids)
+        result.created += len(ids)
+
+    batch: List[Row] = []
+    async for line, data, error in _records(request):
+        if error is not None:
+            fail(BulkRowError(line=line, message=error))
+            continue
+        batch.append((line, data))
+        if len(batch) >= chunk_size:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    # Errors are collected per chunk; report them in file order
+    result.errors.sort(key=lambda error: error.line)
+    return result
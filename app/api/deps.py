@@ -1,49 +1,68 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Optional, Union
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.principal_cache import principal_cache
+from app.core.request_metrics import span
 from app.core.security import verify_password
-from app.db.session import SessionLocal
+from app.db.replicas import USER_ID
+from app.db.session import get_async_db, get_db
 from app.models.user import User
-from app.crud import user as crud_user
+from app.crud import crud_user
+from app.crud.aio import crud_user as async_crud_user
 from app.schemas.token import TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(
-    db: Session = Depends(get_db),
-    token: str = Depends(reusable_oauth2)
-) -> User:
+def _decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = crud_user.user.get(db, id=token_data.sub)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    return user
+
+def _identify(request: Request, db: Union[Session, AsyncSession], user_id: Optional[int]) -> None:
+    # Whose writes this request's reads must see, see RoutingSession
+    db.info[USER_ID] = user_id
+    request.state.user_id = user_id
+
+def get_current_user(
+    request: Request,
+    db: Session = Depends(get_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    with span("auth"):
+        token_data = _decode_token(token)
+        _identify(request, db, token_data.sub)
+        if token_data.sub is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user = principal_cache.get(token_data.sub, token)
+        if user is not None:
+            return user
+        generation = principal_cache.generation(token_data.sub)
+        user = crud_user.user.get(db, id=token_data.sub)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        principal_cache.set(user.id, token, user, generation)
+        return user
 
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
@@ -53,4 +72,60 @@ def get_current_active_user(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def get_current_user_async(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    token: str = Depends(reusable_oauth2)
+) -> User:
+    with span("auth"):
+        token_data = _decode_token(token)
+        _identify(request, db, token_data.sub)
+        if token_data.sub is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        user = principal_cache.get(token_data.sub, token)
+        if user is not None:
+            return user
+        generation = principal_cache.generation(token_data.sub)
+        user = await async_crud_user.user.get(db, id=token_data.sub)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        principal_cache.set(user.id, token, user, generation)
+        return user
+
+async def get_current_active_user_async(
+    current_user: User = Depends(get_current_user_async),
+) -> User:
+    if not async_crud_user.user.is_active(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return current_user
+
+def get_current_active_superuser(
+    current_user: User = Depends(get_current_active_user),
+) -> User:
+    if not crud_user.user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return current_user
+
+async def get_current_active_superuser_async(
+    current_user: User = Depends(get_current_active_user_async),
+) -> User:
+    if not async_crud_user.user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges"
+        )
+    return current_user
@@ -0,0 +1,127 @@
+import os
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+# Content-addressed files never change
+IMMUTABLE = "public, max-age=31536000, immutable"
+# ASGI extension of servers that can sendfile() a file to the socket
+ZEROCOPY = "http.response.zerocopysend"
+
+
+def byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    The `(start, end)` (end exclusive) a `Range: bytes=...` header asks
+    for, None to send the whole file (no header or several ranges), and
+    (0, 0) if it can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            return (max(size - length, 0), size) if length > 0 and size else (0, 0)
+        start = int(first)
+        end = min(int(last) + 1, size) if last else size
+    except ValueError:
+        return None
+    if start >= size or end <= start:
+        return (0, 0)
+    return start, end
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags or "*" in tags
+
+
+class ImmutableFileResponse(Response):
+    """
+    A file that never changes, e.g. a stored image variant, sent with
+    long-lived cache headers and an ETag, answering If-None-Match with 304
+    and single-range Range requests with 206.
+
+    The body goes out by sendfile() when the server offers the ASGI
+    zero-copy extension, through the front proxy when
+    MEDIA_ACCEL_REDIRECT is set, and in chunks read off the event loop
+    otherwise.
+    """
+
+    def __init__(self, path: str, media_type: str, etag: str, accel_path: Optional[str] = None):
+        self.path = path
+        self.accel_path = accel_path
+        self.media_type = media_type
+        self.etag = etag
+        self.status_code = 200
+        self.background = None
+        self.init_headers({"ETag": etag, "Cache-Control": IMMUTABLE, "Accept-Ranges": "bytes"})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        head = scope.get("method") == "HEAD"
+        if _matches(request_headers.get("if-none-match"), self.etag):
+            await self._send_empty(send, 304)
+            return
+        if self.accel_path is not None and settings.MEDIA_ACCEL_REDIRECT:
+            # The proxy answers Range requests itself
+            self.headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT.rstrip("/") + "/" + self.accel_path
+            await self._send_empty(send, 200)
+            return
+
+        size = (await anyio.to_thread.run_sync(os.stat, self.path)).st_size
+        start, end, status = 0, size, 200
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range == self.etag:
+            requested = byte_range(request_headers.get("range"), size)
+            if requested == (0, 0):
+                self.headers["Content-Range"] = f"bytes */{size}"
+                await self._send_empty(send, 416)
+                return
+            if requested is not None:
+                start, end = requested
+                status = 206
+                self.headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        self.headers["Content-Length"] = str(end - start)
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+        if head:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZEROCOPY in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": ZEROCOPY,
+                    "file": f,
+                    "offset": start,
+                    "count": end - start,
+                    "more_body": False,
+                })
+            return
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(start)
+            remaining = end - start
+            while True:
+                chunk = await f.read(min(CHUNK_SIZE, remaining))
+                remaining -= len(chunk)
+                more = remaining > 0 and bool(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+                if not more:
+                    break
+
+    async def _send_empty(self, send: Send, status: int) -> None:
+        if status != 200:
+            del self.headers["Content-Type"]
+        if status != 304:
+            self.headers["Content-Length"] = "0"
+        await send({"type": "http.response.start", "status": status, "headers": self.raw_headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import time
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+from fastapi.exceptions import ResponseValidationError
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.request_metrics import RequestMetrics, current
+
+# Keyword under which the route asks FastAPI for the shared Response object
+# when the endpoint itself doesn't take one
+_RESPONSE_PARAM = "__sub_response"
+
+
+class Projected(NamedTuple):
+    """
+    Endpoint result to be serialized as `response_type` instead of the
+    route's response model, e.g. the model narrowed by a `fields=`
+    selection (see `app.schemas.fields`).
+    """
+
+    data: Any
+    response_type: Any
+
+
+@lru_cache(maxsize=256)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def _render(adapter: TypeAdapter, content: Any, sub_response: Response, status_code: Optional[int]) -> Response:
+    try:
+        value = adapter.validate_python(content, from_attributes=True)
+    except ValidationError as e:
+        errors = [
+            {**error, "loc": ("response", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ]
+        raise ResponseValidationError(errors=errors, body=content)
+    response = Response(
+        adapter.dump_json(value, by_alias=True),
+        status_code=sub_response.status_code or status_code or 200,
+        media_type="application/json",
+    )
+    response.headers.raw.extend(sub_response.headers.raw)
+    return response
+
+
+class _Serializer:
+    """
+    Turns an endpoint's return value into the JSON response FastAPI would
+    send, in one validate-and-dump pass through a TypeAdapter compiled once
+    for the route: ORM objects are read by attribute and written straight
+    to bytes, without the intermediate dicts and `json.dumps` of the
+    default path.
+    """
+
+    def __init__(self, route: APIRoute):
+        self.adapter = _adapter(route.response_model)
+        self.status_code = route.status_code
+
+    @staticmethod
+    def supports(route: APIRoute) -> bool:
+        return route.response_field is not None and not (
+            route.response_model_include
+            or route.response_model_exclude
+            or route.response_model_exclude_unset
+            or route.response_model_exclude_defaults
+            or route.response_model_exclude_none
+            or not route.response_model_by_alias
+        )
+
+    def __call__(self, content: Any, sub_response: Response) -> Response:
+        if isinstance(content, Response):
+            return content
+        return _render(self.adapter, content, sub_response, self.status_code)
+
+
+def _add_span(metrics: Optional[RequestMetrics], name: str, started: float) -> None:
+    if metrics is not None:
+        metrics.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def _wrap_endpoint(route: APIRoute) -> Callable[..., Any]:
+    dependant = route.dependant
+    call = dependant.call
+    serialize = _Serializer(route) if settings.FAST_SERIALIZATION and _Serializer.supports(route) else None
+    response_param = dependant.response_param_name
+    forward_response = True
+    if response_param is None:
+        response_param = dependant.response_param_name = _RESPONSE_PARAM
+        forward_response = False
+
+    def split(kwargs: Dict[str, Any]) -> Response:
+        return kwargs[response_param] if forward_response else kwargs.pop(response_param)
+
+    def encode(content: Any, sub_response: Response) -> Response:
+        if isinstance(content, Projected):
+            adapter = _adapter(content.response_type)
+            return _render(adapter, content.data, sub_response, route.status_code)
+        return serialize(content, sub_response)
+
+    def respond(content: Any, sub_response: Response, metrics: Optional[RequestMetrics]) -> Any:
+        if isinstance(content, Projected) and content.response_type == route.response_model:
+            # Nothing was narrowed away
+            content = content.data
+        if serialize is not None or isinstance(content, Projected):
+            started = time.perf_counter()
+            try:
+                content = encode(content, sub_response)
+            finally:
+                _add_span(metrics, "serialize", started)
+        if metrics is not None:
+            metrics.endpoint_finished = time.perf_counter()
+        return content
+
+    if asyncio.iscoroutinefunction(call):
+        @wraps(call)
+        async def endpoint_async(**kwargs: Any) -> Any:
+            sub_response = split(kwargs)
+            metrics = current()
+            started = time.perf_counter()
+            try:
+                content = await call(**kwargs)
+            finally:
+                _add_span(metrics, "endpoint", started)
+            return respond(content, sub_response, metrics)
+        return endpoint_async
+
+    # Sync endpoints go to the threadpool here rather than in FastAPI, so
+    # the time spent queued for a worker can be told apart; their response
+    # is serialized on the worker too
+    @wraps(call)
+    async def endpoint_sync(**kwargs: Any) -> Any:
+        sub_response = split(kwargs)
+        submitted = time.perf_counter()
+
+        def run() -> Any:
+            metrics = current()
+            started = time.perf_counter()
+            thread_id = threading.get_ident()
+            if metrics is not None:
+                metrics.add_span("threadpool", (started - submitted) * 1000)
+                metrics.threads.add(thread_id)
+            try:
+                try:
+                    content = call(**kwargs)
+                finally:
+                    _add_span(metrics, "endpoint", started)
+                return respond(content, sub_response, metrics)
+            finally:
+                if metrics is not None:
+                    metrics.threads.discard(thread_id)
+
+        return await run_in_threadpool(run)
+    return endpoint_sync
+
+
+class AppRoute(APIRoute):
+    """
+    APIRoute used by every router. It admits requests through the route's
+    admission pool (see `app.core.admission`) and reports to the request's
+    metrics how long that took, how long the endpoint function ran, how
+    long a sync endpoint waited for a threadpool worker and how long
+    serializing its result took. With
+    FAST_SERIALIZATION it also encodes response models itself (see
+    `_Serializer`) instead of FastAPI's validate, `jsonable_encoder`-style
+    dump and `json.dumps` passes. Endpoints can return `Projected` to have
+    their result encoded as a narrower type than the response model.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        self.dependant.call = _wrap_endpoint(self)
+        handler = super().get_route_handler()
+        pool = admission.pool_for(self.methods, self.path_format)
+
+        async def admitted_handler(request: Request) -> Response:
+            if pool is None:
+                return await handler(request)
+            # Before dependencies run, since authenticating takes a thread
+            # and a query too
+            waited = await pool.acquire()
+            metrics = current()
+            if metrics is not None:
+                metrics.add_span("admission", waited)
+            try:
+                return await handler(request)
+            finally:
+                pool.release()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await admitted_handler(request)
+            metrics = current()
+            if metrics is not None and metrics.endpoint_finished is not None:
+                # What FastAPI still does after the endpoint returned
+                metrics.add_span(
+                    "serialize", (time.perf_counter() - metrics.endpoint_finished) * 1000
+                )
+            return response
+
+        return timed_handler
@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.core.image_pool import ImagePoolBusy, image_pool
+from app.core.image_variants import BadImage
+from app.core.media import ImageTooLarge, UnsupportedImage, media_store
+
+# Multipart field holding the image
+FILE_FIELD = "file"
+# Longest value accepted for any other form field
+_MAX_FIELD_BYTES = 1024
+# Allowance for boundaries, part headers and form fields in Content-Length
+_FORM_OVERHEAD = 64 * 1024
+
+
+class ReceivedImage(NamedTuple):
+    digest: str
+    form: Any
+
+
+class _FormEvents:
+    # Collects what the multipart parser finds in a chunk of the body as
+    # ("part", name, filename), ("data", bytes) and ("end",) events
+    def __init__(self):
+        self.events: List[Tuple[Any, ...]] = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": lambda: self.events.append(("end",)),
+        }
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def _header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def _headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        self.events.append(("part", name, None if filename is None else filename.decode("latin-1")))
+
+    def _part_data(self, data: bytes, start: int, end: int) -> None:
+        self.events.append(("data", data[start:end]))
+
+
+async def receive_image(request: Request, form_schema: Type[BaseModel]) -> ReceivedImage:
+    """
+    Stream a multipart/form-data body holding an image in its `file` field
+    into the media store, hashing it on the way, without buffering it in
+    memory or in a spooled temporary file first. Other fields are
+    validated against `form_schema`. Bodies over IMAGE_UPLOAD_MAX_BYTES
+    fail with 413 as soon as they get there, and anything that doesn't
+    start like a JPEG, PNG, GIF or WebP file with 415, as does a file that
+    then doesn't decode in the image pool.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=415, detail="Send the image as multipart/form-data")
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > settings.IMAGE_UPLOAD_MAX_BYTES + _FORM_OVERHEAD:
+        raise HTTPException(status_code=413, detail="Image too large")
+
+    form = _FormEvents()
+    parser = MultipartParser(boundary, form.callbacks())
+    upload = await run_in_threadpool(media_store.new_upload)
+    fields: Dict[str, bytes] = {}
+    current: Optional[str] = None
+    received_file = False
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            data: List[bytes] = []
+            for kind, *event in form.events:
+                if kind == "part":
+                    name, filename = event
+                    if name == FILE_FIELD and filename is not None:
+                        if received_file:
+                            raise HTTPException(status_code=400, detail="Upload one image per request")
+                        received_file = True
+                        current = FILE_FIELD
+                    else:
+                        current = name
+                        fields[name] = b""
+                elif kind == "data":
+                    if current == FILE_FIELD:
+                        data.append(event[0])
+                    elif current is not None:
+                        fields[current] += event[0]
+                        if len(fields[current]) > _MAX_FIELD_BYTES:
+                            raise HTTPException(status_code=400, detail=f"Form field '{current}' too long")
+                else:
+                    current = None
+            form.events.clear()
+            if data:
+                await run_in_threadpool(upload.write, b"".join(data))
+        parser.finalize()
+        if not received_file:
+            raise HTTPException(status_code=400, detail=f"Send the image in a '{FILE_FIELD}' field")
+        values = {
+            name: value.decode("utf-8", "replace") for name, value in fields.items()
+            if name in form_schema.model_fields
+        }
+        try:
+            validated = form_schema(**values)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+        await run_in_threadpool(upload.close)
+        await image_pool.verify_async(upload.path)
+        digest = await run_in_threadpool(upload.commit)
+    except BaseException as e:
+        await run_in_threadpool(upload.discard)
+        if isinstance(e, ImageTooLarge):
+            raise HTTPException(status_code=413, detail=str(e))
+        if isinstance(e, UnsupportedImage):
+            raise HTTPException(status_code=415, detail=str(e))
+        if isinstance(e, BadImage):
+            raise HTTPException(status_code=415, detail="The image could not be decoded")
+        if isinstance(e, ImagePoolBusy):
+            raise HTTPException(
+                status_code=503,
+                detail="Too many images being processed, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        if isinstance(e, MultipartParseError):
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        raise
+    return ReceivedImage(digest, validated)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from typing import Any
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.api.routing import AppRoute
+from app.core import security
+from app.core.config import settings
+from app.crud.aio import crud_user
+from app.schemas.token import Token
+from app.schemas.user import User, UserCreate
+
+router = APIRouter(route_class=AppRoute)
+
+@router.post("/login", response_model=Token)
+async def login(
+    db: AsyncSession = Depends(deps.get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends()
+) -> Any:
+    """
+    OAuth2 compatible token login, get an access token for future requests
+    """
+    user = await crud_user.user.authenticate(
+        db, email=form_data.username, password=form_data.password
+    )
+    if not user:
+        raise HTTPException(
+            status_code=400, detail="Incorrect email or password"
+        )
+    elif not crud_user.user.is_active(user):
+        raise HTTPException(
+            status_code=400, detail="Inactive user"
+        )
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": security.create_access_token(
+            user.id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer",
+    }
+
+@router.post("/register", response_model=User)
+async def register(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_in: UserCreate,
+) -> Any:
+    """
+    Create new user.
+    """
+    user = await crud_user.user.get_by_email(db, email=user_in.email)
+    if user:
+        raise HTTPException(
+            status_code=400,
+            detail="A user with this email already exists.",
+        )
+    user = await crud_user.user.get_by_username(db, username=user_in.username)
+    if user:
+        raise HTTPException(
+            status_code=400,
+            detail="A user with this username already exists.",
+        )
+    user = await crud_user.user.create(db, obj_in=user_in)
+    return user 
\ No newline at end of file
@@ -0,0 +1,314 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import bulk, deps, uploads
+from app.api.routing import AppRoute, Projected
+from app.core.image_pool import image_pool
+from app.core.media import image_url
+from app.core.response_cache import response_cache
+from app.crud.aio import crud_horse
+from app.models.user import User
+from app.schemas.horse import (
+    Horse,
+    HorseCreate,
+    HorseUpdate,
+    HorseImage,
+    HorseImageCreate,
+    HorseImageBulkCreate,
+    HorseImageUpload,
+)
+from app.schemas.bulk import BulkImportResult
+from app.schemas.facets import FacetCounts
+from app.schemas.query import (
+    BatchParams,
+    FieldsParams,
+    PaginationParams,
+    SortParams,
+    HorseFilterParams,
+    SearchParams
+)
+
+router = APIRouter(route_class=AppRoute)
+
+def _horse_filters(filters: HorseFilterParams) -> Dict[str, Any]:
+    filter_dict = {}
+    if filters.breed:
+        filter_dict["breed"] = filters.breed
+    if filters.gender:
+        filter_dict["gender"] = filters.gender
+    if filters.min_age is not None or filters.max_age is not None:
+        filter_dict["age"] = {
+            "min": filters.min_age,
+            "max": filters.max_age
+        }
+    if filters.min_height is not None or filters.max_height is not None:
+        filter_dict["height"] = {
+            "min": filters.min_height,
+            "max": filters.max_height
+        }
+    if filters.location:
+        filter_dict["location"] = filters.location
+    return filter_dict
+
+@router.get("/", response_model=List[Horse])
+async def list_horses(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+    sort: SortParams = Depends(),
+    filters: HorseFilterParams = Depends(),
+    search: SearchParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Retrieve all horses with filtering, sorting, and search capabilities.
+    """
+    fieldset = fields.resolve(Horse)
+    filter_dict = _horse_filters(filters)
+    horses = await crud_horse.horse.get_multi(
+        db=db,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        filters=filter_dict,
+        sort_by=sort.sort_by,
+        order=sort.order,
+        search_query=search.q,
+        search_fields=search.search_in,
+        fields=fieldset.tree,
+    )
+    if not crud_horse.horse.ranks_by_relevance(search.q, sort.sort_by):
+        next_cursor = crud_horse.horse.next_cursor(
+            horses, limit=pagination.limit, sort_by=sort.sort_by
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(horses, List[fieldset.model])
+
+@router.get("/facets", response_model=FacetCounts)
+async def horse_facets(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    filters: HorseFilterParams = Depends(),
+    search: SearchParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Count the horses matching the filters and search, in total and by
+    breed and gender.
+    """
+    cached = response_cache.lookup(request, "horses")
+    if cached.response is not None:
+        return cached.response
+    facets = await crud_horse.horse.get_facets(
+        db,
+        filters=_horse_filters(filters),
+        search_query=search.q,
+        search_fields=search.search_in,
+    )
+    return cached.store(FacetCounts, facets)
+
+@router.post("/", response_model=Horse)
+async def create_horse(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_in: HorseCreate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Create new horse.
+    """
+    horse = await crud_horse.horse.create_with_owner(
+        db=db, obj_in=horse_in, owner_id=current_user.id
+    )
+    return horse
+
+@router.post("/bulk", response_model=BulkImportResult)
+async def bulk_import_horses(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Import horses from an NDJSON or CSV body, one horse per row.
+    """
+    async def insert_chunk(rows):
+        horses = [horse for _, horse in rows]
+        ids = await crud_horse.horse.create_many_with_owner(
+            db, objs_in=horses, owner_id=current_user.id
+        )
+        return ids, []
+
+    return await bulk.import_rows(request, HorseCreate, insert_chunk)
+
+@router.post("/images/bulk", response_model=BulkImportResult)
+async def bulk_import_horse_images(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Import images for your horses from an NDJSON or CSV body.
+    """
+    async def insert_chunk(rows):
+        owned = await crud_horse.horse.owned_ids(
+            db, owner_id=current_user.id, ids=[image.horse_id for _, image in rows]
+        )
+        rows, rejected = bulk.split_owned(rows, owned)
+        ids = await crud_horse.horse.add_images(db, images=[image for _, image in rows])
+        return ids, rejected
+
+    return await bulk.import_rows(request, HorseImageBulkCreate, insert_chunk)
+
+@router.get("/my-horses", response_model=List[Horse])
+async def list_my_horses(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+) -> Any:
+    """
+    Retrieve horses owned by current user.
+    """
+    fieldset = fields.resolve(Horse)
+    horses = await crud_horse.horse.get_by_owner(
+        db=db,
+        owner_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = crud_horse.horse.next_cursor(horses, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(horses, List[fieldset.model])
+
+@router.get("/batch", response_model=List[Horse])
+async def get_horses_batch(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    batch: BatchParams = Depends(),
+    fields: FieldsParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get several horses by ID with one query, in the order asked for; IDs
+    that don't exist are left out.
+    """
+    fieldset = fields.resolve(Horse)
+    cached = response_cache.lookup(request, "horses")
+    if cached.response is not None:
+        return cached.response
+    horses = await crud_horse.horse.get_many(db, batch.ids, fields=fieldset.tree)
+    return cached.store(List[fieldset.model], horses)
+
+@router.get("/{horse_id}", response_model=Horse)
+async def get_horse(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Get horse by ID.
+    """
+    cached = response_cache.lookup(request, "horses")
+    if cached.response is not None:
+        return cached.response
+    horse = await crud_horse.horse.get(db=db, id=horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    return cached.store(Horse, horse)
+
+@router.put("/{horse_id}", response_model=Horse)
+async def update_horse(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_id: int,
+    horse_in: HorseUpdate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Update a horse.
+    """
+    horse = await crud_horse.horse.get(db=db, id=horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    if horse.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    horse = await crud_horse.horse.update(db=db, db_obj=horse, obj_in=horse_in)
+    return horse
+
+@router.post("/{horse_id}/images", response_model=HorseImage)
+async def add_horse_image(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_id: int,
+    image_in: HorseImageCreate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Add an image to a horse.
+    """
+    horse = await crud_horse.horse.get(db=db, id=horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    if horse.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    image = await crud_horse.horse.add_image(db=db, horse_id=horse_id, image=image_in)
+    return image
+
+@router.post("/{horse_id}/images/upload", response_model=HorseImage)
+async def upload_horse_image(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Upload an image of a horse as multipart/form-data: the file in a
+    `file` field, optionally `is_primary`. Its thumbnail and large
+    variants are rendered in the background.
+    """
+    horse = await crud_horse.horse.get(db=db, id=horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    if horse.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    received = await uploads.receive_image(request, HorseImageUpload)
+    image_in = HorseImageCreate(
+        image_url=image_url(received.digest, "large"), is_primary=received.form.is_primary
+    )
+    image = await crud_horse.horse.add_image(
+        db=db, horse_id=horse_id, image=image_in, content_hash=received.digest
+    )
+    await run_in_threadpool(image_pool.render_later, received.digest)
+    return image
+
+@router.get("/{horse_id}/images", response_model=List[HorseImage])
+async def list_horse_images(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    horse_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    List all images for a horse.
+    """
+    cached = response_cache.lookup(request, "horses")
+    if cached.response is not None:
+        return cached.response
+    horse = await crud_horse.horse.get(db=db, id=horse_id)
+    if not horse:
+        raise HTTPException(status_code=404, detail="Horse not found")
+    images = await crud_horse.horse.get_images(db=db, horse_id=horse_id)
+    return cached.store(List[HorseImage], images) 
\ No newline at end of file
@@ -0,0 +1,309 @@
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.api import bulk, deps, export
+from app.api.routing import AppRoute, Projected
+from app.core.response_cache import response_cache
+from app.crud.aio import horse, rental_listing, rental_booking
+from app.crud.crud_rental import BookingConflict
+from app.models.user import User
+from app.schemas.rental import (
+    RentalListing,
+    RentalListingCreate,
+    RentalListingUpdate,
+    RentalBooking,
+    RentalBookingCreate,
+    RentalBookingUpdate,
+)
+from app.schemas.bulk import BulkImportResult
+from app.schemas.query import (
+    ExportParams,
+    FieldsParams,
+    GeoParams,
+    PaginationParams,
+    RentalFilterParams,
+)
+
+router = APIRouter(route_class=AppRoute)
+
+@router.get("/listings", response_model=List[RentalListing])
+async def list_listings(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+    filters: RentalFilterParams = Depends(),
+    near: GeoParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Retrieve available rental listings, optionally only those free for a
+    date range or within radius_km of lat/lon (nearest first).
+    """
+    fieldset = fields.resolve(RentalListing)
+    cached = response_cache.lookup(request, "rental")
+    if cached.response is not None:
+        return cached.response
+
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+
+    listings = await rental_listing.get_available_listings(
+        db,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+        circle=near.circle,
+    )
+    next_cursor = None
+    if near.circle is None:
+        next_cursor = rental_listing.next_cursor(listings, limit=pagination.limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return cached.store(List[fieldset.model], listings, headers=headers)
+
+@router.post("/listings", response_model=RentalListing)
+async def create_listing(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    listing_in: RentalListingCreate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Create new rental listing.
+    """
+    listing = await rental_listing.create_with_owner(
+        db=db, obj_in=listing_in, owner_id=current_user.id
+    )
+    return listing
+
+@router.post("/listings/bulk", response_model=BulkImportResult)
+async def bulk_import_listings(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Import rental listings for your horses from an NDJSON or CSV body.
+    """
+    async def insert_chunk(rows):
+        owned = await horse.owned_ids(
+            db, owner_id=current_user.id, ids=[listing.horse_id for _, listing in rows]
+        )
+        rows, rejected = bulk.split_owned(rows, owned)
+        ids = await rental_listing.create_many_with_owner(
+            db, objs_in=[listing for _, listing in rows], owner_id=current_user.id
+        )
+        return ids, rejected
+
+    return await bulk.import_rows(request, RentalListingCreate, insert_chunk)
+
+@router.get("/my-listings", response_model=List[RentalListing])
+async def list_my_listings(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+) -> Any:
+    """
+    Retrieve rental listings created by current user.
+    """
+    fieldset = fields.resolve(RentalListing)
+    listings = await rental_listing.get_by_owner(
+        db=db,
+        owner_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = rental_listing.next_cursor(listings, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(listings, List[fieldset.model])
+
+@router.get("/listings/export")
+async def export_listings(
+    db: AsyncSession = Depends(deps.get_async_db),
+    filters: RentalFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Stream available rental listings as NDJSON or CSV, with the same
+    filters as the listing endpoint.
+    """
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+    stmt = rental_listing.select_available(
+        dialect=db.get_bind().dialect.name,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+    )
+    # The export streams on its own session; don't hold this one meanwhile
+    await db.close()
+    return export.stream_export_async(
+        stmt, fmt=output.format, filename="rental-listings", user_id=current_user.id
+    )
+
+@router.get("/listings/{listing_id}", response_model=RentalListing)
+async def get_listing(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    listing_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Get rental listing by ID.
+    """
+    listing = await rental_listing.get(db=db, id=listing_id)
+    if not listing:
+        raise HTTPException(status_code=404, detail="Rental listing not found")
+    return listing
+
+@router.put("/listings/{listing_id}", response_model=RentalListing)
+async def update_listing(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    listing_id: int,
+    listing_in: RentalListingUpdate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Update a rental listing.
+    """
+    listing = await rental_listing.get(db=db, id=listing_id)
+    if not listing:
+        raise HTTPException(status_code=404, detail="Rental listing not found")
+    if listing.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        listing = await rental_listing.update(db=db, db_obj=listing, obj_in=listing_in)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=409, detail="Listing changed meanwhile, reload it and try again"
+        )
+    return listing
+
+@router.post("/bookings", response_model=RentalBooking)
+async def create_booking(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    booking_in: RentalBookingCreate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Create a booking for a rental listing.
+    """
+    listing = await rental_listing.get(db=db, id=booking_in.rental_listing_id)
+    if not listing:
+        raise HTTPException(status_code=404, detail="Rental listing not found")
+    if listing.owner_id == current_user.id:
+        raise HTTPException(status_code=400, detail="Cannot book your own listing")
+    try:
+        booking = await rental_booking.create_with_renter(
+            db=db, obj_in=booking_in, renter_id=current_user.id
+        )
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return booking
+
+@router.get("/my-bookings", response_model=List[RentalBooking])
+async def list_my_bookings(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_active_user_async),
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+) -> Any:
+    """
+    Retrieve bookings made by current user.
+    """
+    fieldset = fields.resolve(RentalBooking)
+    bookings = await rental_booking.get_by_renter(
+        db=db,
+        renter_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = rental_booking.next_cursor(bookings, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(bookings, List[fieldset.model])
+
+@router.get("/my-bookings/export")
+async def export_my_bookings(
+    db: AsyncSession = Depends(deps.get_async_db),
+    filters: RentalFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Stream the current user's bookings as NDJSON or CSV; `available_from`
+    and `available_to` select bookings overlapping that period.
+    """
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+    stmt = rental_booking.select_by_renter(
+        renter_id=current_user.id,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+    )
+    await db.close()
+    return export.stream_export_async(
+        stmt, fmt=output.format, filename="bookings", user_id=current_user.id
+    )
+
+@router.put("/bookings/{booking_id}", response_model=RentalBooking)
+async def update_booking(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    booking_id: int,
+    booking_in: RentalBookingUpdate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Update a booking.
+    """
+    booking = await rental_booking.get(db=db, id=booking_id)
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    if booking.renter_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    try:
+        booking = await rental_booking.update(db=db, db_obj=booking, obj_in=booking_in)
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return booking 
\ No newline at end of file
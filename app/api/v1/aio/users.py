@@ -0,0 +1,52 @@
+from typing import Any, List
+from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.api.routing import AppRoute
+from app.crud.aio import crud_user
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.schemas.user import UserUpdate
+
+router = APIRouter(route_class=AppRoute)
+
+@router.get("/me", response_model=UserSchema)
+async def read_user_me(
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Get current user.
+    """
+    return current_user
+
+@router.put("/me", response_model=UserSchema)
+async def update_user_me(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_in: UserUpdate,
+    current_user: User = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Update own user.
+    """
+    user = await crud_user.user.update(db, db_obj=current_user, obj_in=user_in)
+    return user
+
+@router.get("/{user_id}", response_model=UserSchema)
+async def read_user_by_id(
+    user_id: int,
+    current_user: User = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Get a specific user by id.
+    """
+    user = await crud_user.user.get(db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
+    return user 
\ No newline at end of file
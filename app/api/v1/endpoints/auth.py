@@ -5,13 +5,14 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.api.routing import AppRoute
 from app.core import security
 from app.core.config import settings
-from app.crud import user as crud_user
+from app.crud import crud_user
 from app.schemas.token import Token
 from app.schemas.user import User, UserCreate
 
-router = APIRouter()
+router = APIRouter(route_class=AppRoute)
 
 @router.post("/login", response_model=Token)
 def login(
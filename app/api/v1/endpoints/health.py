@@ -0,0 +1,26 @@
+from typing import Any
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.api.routing import AppRoute
+from app.core.health import health
+
+router = APIRouter(route_class=AppRoute)
+
+@router.get("/live")
+async def liveness() -> Any:
+    """
+    Whether this worker process is up and its event loop responsive.
+    """
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness() -> Any:
+    """
+    Whether this worker should get traffic: 503 once it is draining for
+    shutdown. It accepts connections only after warming up.
+    """
+    status = health.status()
+    if not health.is_ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
@@ -0,0 +1,48 @@
+import os
+from typing import Any
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.files import ImmutableFileResponse
+from app.api.routing import AppRoute
+from app.core.image_pool import ImagePoolBusy, image_pool
+from app.core.media import VARIANT_TYPES, media_store
+
+router = APIRouter(route_class=AppRoute)
+
+# One route per method keeps their OpenAPI operation ids apart; the
+# status_code is what gets documented, the response picks 200, 206 or 304
+@router.get("/{digest}/{name}", response_class=ImmutableFileResponse, status_code=200)
+@router.head("/{digest}/{name}", response_class=ImmutableFileResponse, status_code=200)
+async def get_image_variant(digest: str, name: str) -> Any:
+    """
+    A variant of an uploaded image, e.g. `thumb.webp` or `large.jpg`.
+    Public so pages can link it, and cacheable forever since its URL
+    names its content. Variants not rendered yet are rendered first,
+    unless rendering that image failed before.
+    """
+    path = media_store.variant_path(digest, name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not await run_in_threadpool(os.path.exists, path):
+        if not await run_in_threadpool(os.path.exists, media_store.original_path(digest)):
+            raise HTTPException(status_code=404, detail="Image not found")
+        if await run_in_threadpool(media_store.has_failed, digest):
+            raise HTTPException(status_code=404, detail="Image could not be rendered")
+        try:
+            await image_pool.render_async(digest)
+        except ImagePoolBusy:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many images being rendered, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        except Exception:
+            # Logged by the pool; e.g. a corrupt or oversized image
+            raise HTTPException(status_code=404, detail="Image could not be rendered")
+    return ImmutableFileResponse(
+        path,
+        media_type=VARIANT_TYPES[name.rpartition(".")[2]],
+        etag=f'"{digest}-{name}"',
+        accel_path=os.path.relpath(path, media_store.root),
+    )
@@ -1,32 +1,82 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+from typing import Any, Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.api import deps
-from app.crud import market as crud_market
+from app.api import bulk, deps, export
+from app.api.routing import AppRoute, Projected
+from app.core.response_cache import response_cache
+from app.crud import crud_horse, crud_market
+from app.crud.crud_market import ListingUnavailable
+from app.crud.crud_price_stats import price_stats
+from app.models.market import ListingStatus, Transaction as TransactionModel
 from app.models.user import User
 from app.schemas.market import (
     MarketListing,
     MarketListingCreate,
     MarketListingUpdate,
+    PriceStats,
     Transaction,
     TransactionCreate,
 )
+from app.schemas.bulk import BulkImportResult
+from app.schemas.facets import FacetCounts
+from app.schemas.query import (
+    BatchParams,
+    ExportParams,
+    FieldsParams,
+    GeoParams,
+    MarketFilterParams,
+    PaginationParams,
+    PriceStatsParams,
+)
+
+router = APIRouter(route_class=AppRoute)
 
-router = APIRouter()
+def _listing_filters(filters: MarketFilterParams) -> Dict[str, Any]:
+    # Active listings unless another status is asked for
+    filter_dict = {"status": filters.status or ListingStatus.ACTIVE}
+    if filters.min_price is not None or filters.max_price is not None:
+        filter_dict["price"] = {
+            "min": filters.min_price,
+            "max": filters.max_price
+        }
+    if filters.is_negotiable is not None:
+        filter_dict["is_negotiable"] = filters.is_negotiable
+    return filter_dict
 
 @router.get("/listings", response_model=List[MarketListing])
 def list_listings(
+    request: Request,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+    near: GeoParams = Depends(),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Retrieve all active market listings.
+    Retrieve all active market listings, or those within radius_km of
+    lat/lon, nearest first.
     """
-    listings = crud_market.market.get_active_listings(db, skip=skip, limit=limit)
-    return listings
+    fieldset = fields.resolve(MarketListing)
+    cached = response_cache.lookup(request, "market")
+    if cached.response is not None:
+        return cached.response
+    listings = crud_market.market.get_active_listings(
+        db,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        circle=near.circle,
+        fields=fieldset.tree,
+    )
+    next_cursor = None
+    if near.circle is None:
+        next_cursor = crud_market.market.next_cursor(listings, limit=pagination.limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return cached.store(List[fieldset.model], listings, headers=headers)
 
 @router.post("/listings", response_model=MarketListing)
 def create_listing(
@@ -43,20 +93,111 @@ def create_listing(
     )
     return listing
 
+@router.post("/listings/bulk", response_model=BulkImportResult)
+async def bulk_import_listings(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Import market listings for your horses from an NDJSON or CSV body.
+    """
+    def insert_chunk(rows):
+        owned = crud_horse.horse.owned_ids(
+            db, owner_id=current_user.id, ids=[listing.horse_id for _, listing in rows]
+        )
+        rows, rejected = bulk.split_owned(rows, owned)
+        ids = crud_market.market.create_many_with_seller(
+            db, objs_in=[listing for _, listing in rows], seller_id=current_user.id
+        )
+        return ids, rejected
+
+    return await bulk.import_rows(request, MarketListingCreate, partial(run_in_threadpool, insert_chunk))
+
 @router.get("/my-listings", response_model=List[MarketListing])
 def list_my_listings(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
 ) -> Any:
     """
     Retrieve listings created by current user.
     """
+    fieldset = fields.resolve(MarketListing)
     listings = crud_market.market.get_by_seller(
-        db=db, seller_id=current_user.id, skip=skip, limit=limit
+        db=db,
+        seller_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = crud_market.market.next_cursor(listings, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(listings, List[fieldset.model])
+
+@router.get("/listings/export")
+def export_listings(
+    db: Session = Depends(deps.get_db),
+    filters: MarketFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream market listings (active ones unless `status` is given) as NDJSON
+    or CSV.
+    """
+    stmt = crud_market.market.select_listings(
+        filters=_listing_filters(filters), location=filters.location
+    )
+    # The export streams on its own session; don't hold this one meanwhile
+    db.close()
+    return export.stream_export(
+        stmt, fmt=output.format, filename="market-listings", user_id=current_user.id
+    )
+
+@router.get("/listings/facets", response_model=FacetCounts)
+def listing_facets(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    filters: MarketFilterParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Count the listings (active ones unless `status` is given) matching the
+    filters, in total and by breed, gender, location, price bucket and
+    negotiability.
+    """
+    cached = response_cache.lookup(request, "market")
+    if cached.response is not None:
+        return cached.response
+    facets = crud_market.market.get_facets(
+        db, filters=_listing_filters(filters), location=filters.location
     )
-    return listings
+    return cached.store(FacetCounts, facets)
+
+@router.get("/listings/batch", response_model=List[MarketListing])
+def get_listings_batch(
+    *,
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    batch: BatchParams = Depends(),
+    fields: FieldsParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get several market listings by ID with one query, in the order asked for; IDs
+    that don't exist are left out.
+    """
+    fieldset = fields.resolve(MarketListing)
+    cached = response_cache.lookup(request, "market")
+    if cached.response is not None:
+        return cached.response
+    listings = crud_market.market.get_many(db, batch.ids, fields=fieldset.tree)
+    return cached.store(List[fieldset.model], listings)
 
 @router.get("/listings/{listing_id}", response_model=MarketListing)
 def get_listing(
@@ -89,7 +230,12 @@ def update_listing(
         raise HTTPException(status_code=404, detail="Market listing not found")
     if listing.seller_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    listing = crud_market.market.update(db=db, db_obj=listing, obj_in=listing_in)
+    try:
+        listing = crud_market.market.update(db=db, db_obj=listing, obj_in=listing_in)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=409, detail="Listing changed meanwhile, reload it and try again"
+        )
     return listing
 
 @router.post("/transactions", response_model=Transaction)
@@ -107,22 +253,84 @@ def create_transaction(
         raise HTTPException(status_code=404, detail="Market listing not found")
     if listing.seller_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot buy your own listing")
-    transaction = crud_market.market.create_transaction(
-        db=db, obj_in=transaction_in
-    )
+    try:
+        transaction = crud_market.market.create_transaction(
+            db=db, obj_in=transaction_in
+        )
+    except ListingUnavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
     return transaction
 
 @router.get("/my-transactions", response_model=List[Transaction])
 def list_my_transactions(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
 ) -> Any:
     """
     Retrieve transactions where current user is the buyer.
     """
+    fieldset = fields.resolve(Transaction)
     transactions = crud_market.market.get_transactions_by_buyer(
-        db=db, buyer_id=current_user.id, skip=skip, limit=limit
+        db=db,
+        buyer_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = crud_market.market.next_cursor(
+        transactions, limit=pagination.limit, model=TransactionModel
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(transactions, List[fieldset.model])
+
+@router.get("/price-stats", response_model=List[PriceStats])
+def get_price_stats(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    params: PriceStatsParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Sale prices of all sold horses and of those of the given breed,
+    location and age band: count, mean, range and percentiles.
+    """
+    cached = response_cache.lookup(request, "market")
+    if cached.response is not None:
+        return cached.response
+    stats = price_stats.get_stats(
+        db, breed=params.breed, location=params.location, age=params.age
+    )
+    return cached.store(List[PriceStats], stats)
+
+@router.get("/my-transactions/export")
+def export_my_transactions(
+    db: Session = Depends(deps.get_db),
+    filters: MarketFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream the current user's purchases as NDJSON or CSV. Price bounds
+    apply to the final price, the other filters to the purchased listing.
+    """
+    filter_dict = {}
+    if filters.status:
+        filter_dict["status"] = filters.status
+    if filters.is_negotiable is not None:
+        filter_dict["is_negotiable"] = filters.is_negotiable
+    stmt = crud_market.market.select_transactions_by_buyer(
+        buyer_id=current_user.id,
+        filters=filter_dict,
+        location=filters.location,
+        min_price=filters.min_price,
+        max_price=filters.max_price,
+    )
+    db.close()
+    return export.stream_export(
+        stmt, fmt=output.format, filename="transactions", user_id=current_user.id
     )
-    return transactions 
\ No newline at end of file
@@ -0,0 +1,37 @@
+from typing import Any
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.api.routing import AppRoute
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.image_pool import image_pool
+from app.core.principal_cache import principal_cache
+from app.core.response_cache import response_cache
+from app.db.pool import pool_status
+from app.db.session import async_engine, async_replicas, engine, replicas
+
+router = APIRouter(route_class=AppRoute)
+
+# Shared by both stacks, so authenticates through the one in use
+get_superuser = (
+    deps.get_current_active_superuser_async if settings.DB_ASYNC
+    else deps.get_current_active_superuser
+)
+
+@router.get("/", dependencies=[Depends(get_superuser)])
+def get_metrics() -> Any:
+    """
+    Live connection pool, replica, cache and admission statistics for this
+    worker process. Superusers only: they name replicas and their errors.
+    """
+    return {
+        "db_pool": pool_status(engine),
+        "async_db_pool": pool_status(async_engine),
+        "replicas": replicas.stats(),
+        "async_replicas": async_replicas.stats(),
+        "principal_cache": principal_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "image_pool": image_pool.stats(),
+        "admission": admission.stats(),
+    }
@@ -1,9 +1,15 @@
+from functools import partial
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.api import deps
-from app.crud import rental_listing, rental_booking
+from app.api import bulk, deps, export
+from app.api.routing import AppRoute, Projected
+from app.core.response_cache import response_cache
+from app.crud import horse, rental_listing, rental_booking
+from app.crud.crud_rental import BookingConflict
 from app.models.user import User
 from app.schemas.rental import (
     RentalListing,
@@ -13,21 +19,61 @@ from app.schemas.rental import (
     RentalBookingCreate,
     RentalBookingUpdate,
 )
+from app.schemas.bulk import BulkImportResult
+from app.schemas.query import (
+    ExportParams,
+    FieldsParams,
+    GeoParams,
+    PaginationParams,
+    RentalFilterParams,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=AppRoute)
 
 @router.get("/listings", response_model=List[RentalListing])
 def list_listings(
+    request: Request,
     db: Session = Depends(deps.get_db),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
+    filters: RentalFilterParams = Depends(),
+    near: GeoParams = Depends(),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Retrieve all available rental listings.
+    Retrieve available rental listings, optionally only those free for a
+    date range or within radius_km of lat/lon (nearest first).
     """
-    listings = rental_listing.get_available_listings(db, skip=skip, limit=limit)
-    return listings
+    fieldset = fields.resolve(RentalListing)
+    cached = response_cache.lookup(request, "rental")
+    if cached.response is not None:
+        return cached.response
+
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+
+    listings = rental_listing.get_available_listings(
+        db,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+        circle=near.circle,
+    )
+    next_cursor = None
+    if near.circle is None:
+        next_cursor = rental_listing.next_cursor(listings, limit=pagination.limit)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return cached.store(List[fieldset.model], listings, headers=headers)
 
 @router.post("/listings", response_model=RentalListing)
 def create_listing(
@@ -44,20 +90,82 @@ def create_listing(
     )
     return listing
 
+@router.post("/listings/bulk", response_model=BulkImportResult)
+async def bulk_import_listings(
+    request: Request,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Import rental listings for your horses from an NDJSON or CSV body.
+    """
+    def insert_chunk(rows):
+        owned = horse.owned_ids(
+            db, owner_id=current_user.id, ids=[listing.horse_id for _, listing in rows]
+        )
+        rows, rejected = bulk.split_owned(rows, owned)
+        ids = rental_listing.create_many_with_owner(
+            db, objs_in=[listing for _, listing in rows], owner_id=current_user.id
+        )
+        return ids, rejected
+
+    return await bulk.import_rows(request, RentalListingCreate, partial(run_in_threadpool, insert_chunk))
+
 @router.get("/my-listings", response_model=List[RentalListing])
 def list_my_listings(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
 ) -> Any:
     """
     Retrieve rental listings created by current user.
     """
+    fieldset = fields.resolve(RentalListing)
     listings = rental_listing.get_by_owner(
-        db=db, owner_id=current_user.id, skip=skip, limit=limit
+        db=db,
+        owner_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = rental_listing.next_cursor(listings, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(listings, List[fieldset.model])
+
+@router.get("/listings/export")
+def export_listings(
+    db: Session = Depends(deps.get_db),
+    filters: RentalFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream available rental listings as NDJSON or CSV, with the same
+    filters as the listing endpoint.
+    """
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+    stmt = rental_listing.select_available(
+        dialect=db.get_bind().dialect.name,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+    )
+    # The export streams on its own session; don't hold this one meanwhile
+    db.close()
+    return export.stream_export(
+        stmt, fmt=output.format, filename="rental-listings", user_id=current_user.id
     )
-    return listings
 
 @router.get("/listings/{listing_id}", response_model=RentalListing)
 def get_listing(
@@ -90,7 +198,12 @@ def update_listing(
         raise HTTPException(status_code=404, detail="Rental listing not found")
     if listing.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    listing = rental_listing.update(db=db, db_obj=listing, obj_in=listing_in)
+    try:
+        listing = rental_listing.update(db=db, db_obj=listing, obj_in=listing_in)
+    except StaleDataError:
+        raise HTTPException(
+            status_code=409, detail="Listing changed meanwhile, reload it and try again"
+        )
     return listing
 
 @router.post("/bookings", response_model=RentalBooking)
@@ -108,25 +221,70 @@ def create_booking(
         raise HTTPException(status_code=404, detail="Rental listing not found")
     if listing.owner_id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot book your own listing")
-    booking = rental_booking.create_with_renter(
-        db=db, obj_in=booking_in, renter_id=current_user.id
-    )
+    try:
+        booking = rental_booking.create_with_renter(
+            db=db, obj_in=booking_in, renter_id=current_user.id
+        )
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return booking
 
 @router.get("/my-bookings", response_model=List[RentalBooking])
 def list_my_bookings(
+    response: Response,
     db: Session = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
-    skip: int = 0,
-    limit: int = 100,
+    pagination: PaginationParams = Depends(),
+    fields: FieldsParams = Depends(),
 ) -> Any:
     """
     Retrieve bookings made by current user.
     """
+    fieldset = fields.resolve(RentalBooking)
     bookings = rental_booking.get_by_renter(
-        db=db, renter_id=current_user.id, skip=skip, limit=limit
+        db=db,
+        renter_id=current_user.id,
+        skip=pagination.skip,
+        limit=pagination.limit,
+        cursor=pagination.cursor,
+        fields=fieldset.tree,
+    )
+    next_cursor = rental_booking.next_cursor(bookings, limit=pagination.limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return Projected(bookings, List[fieldset.model])
+
+@router.get("/my-bookings/export")
+def export_my_bookings(
+    db: Session = Depends(deps.get_db),
+    filters: RentalFilterParams = Depends(),
+    output: ExportParams = Depends(),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream the current user's bookings as NDJSON or CSV; `available_from`
+    and `available_to` select bookings overlapping that period.
+    """
+    filter_dict = {}
+    if filters.min_price_per_day is not None or filters.max_price_per_day is not None:
+        filter_dict["price_per_day"] = {
+            "min": filters.min_price_per_day,
+            "max": filters.max_price_per_day
+        }
+    stmt = rental_booking.select_by_renter(
+        renter_id=current_user.id,
+        filters=filter_dict,
+        available_from=filters.available_from,
+        available_to=filters.available_to,
+        duration_type=filters.duration_type,
+        location=filters.location,
+    )
+    db.close()
+    return export.stream_export(
+        stmt, fmt=output.format, filename="bookings", user_id=current_user.id
     )
-    return bookings
 
 @router.put("/bookings/{booking_id}", response_model=RentalBooking)
 def update_booking(
@@ -144,5 +302,10 @@ def update_booking(
         raise HTTPException(status_code=404, detail="Booking not found")
     if booking.renter_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    booking = rental_booking.update(db=db, db_obj=booking, obj_in=booking_in)
+    try:
+        booking = rental_booking.update(db=db, db_obj=booking, obj_in=booking_in)
+    except BookingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return booking 
\ No newline at end of file
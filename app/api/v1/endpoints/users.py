@@ -4,12 +4,13 @@ from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
 from app.api import deps
-from app.crud import user as crud_user
+from app.api.routing import AppRoute
+from app.crud import crud_user
 from app.models.user import User
 from app.schemas.user import User as UserSchema
 from app.schemas.user import UserUpdate
 
-router = APIRouter()
+router = APIRouter(route_class=AppRoute)
 
 @router.get("/me", response_model=UserSchema)
 def read_user_me(
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.core.password_pool import password_pool
+from app.core.security import create_access_token
+from app.db.session import async_engine, async_replicas, engine, replicas
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+_FIRST_ACTIVE_USER = select(User.id).where(User.is_active.is_(True)).order_by(User.id).limit(1)
+
+
+def _open_connections(engine: Engine, count: int) -> Optional[int]:
+    # Fill the pool, and find a user to send the warm-up requests as
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+        return connections[0].execute(_FIRST_ACTIVE_USER).scalar()
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _open_async_connections(engine: AsyncEngine, count: int) -> Optional[int]:
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await engine.connect())
+        return (await connections[0].execute(_FIRST_ACTIVE_USER)).scalar()
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def _get(app: FastAPI, url: str, headers: List[Tuple[bytes, bytes]]) -> int:
+    # One GET through the whole ASGI stack, without a socket
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"warm-up"), *headers],
+        "client": ("127.0.0.1", 0),
+        "server": ("warm-up", 80),
+    }
+    status = 0
+    received = False
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal received
+        if received:
+            # Never disconnects; listeners get cancelled with the response
+            await asyncio.Future()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def warm_up(app: FastAPI) -> Dict[str, float]:
+    """
+    Do what would otherwise slow down this worker's first requests: open
+    its DB pool connections (replicas' too), build the OpenAPI schema, start the password
+    hashing processes and serve each of WARMUP_PATHS once in-process (as
+    the first active user, so they get past authentication), which
+    compiles their SQL and response serializers. Returns each step's
+    duration in ms; a failing step is logged and skipped.
+    """
+    user_id: Optional[int] = None
+
+    async def open_pool() -> None:
+        nonlocal user_id
+        if async_engine is not None:
+            user_id = await _open_async_connections(async_engine, settings.DB_POOL_SIZE)
+        else:
+            user_id = await run_in_threadpool(_open_connections, engine, settings.DB_POOL_SIZE)
+
+    async def open_replica_pools() -> None:
+        # A replica that is down doesn't fail the step; requests skip it
+        count = settings.DB_POOL_SIZE
+        opened = await asyncio.gather(
+            *(_open_async_connections(AsyncEngine(r.engine), count) for r in async_replicas.replicas),
+            *(run_in_threadpool(_open_connections, r.engine, count) for r in replicas.replicas),
+            return_exceptions=True,
+        )
+        for replica, result in zip(async_replicas.replicas + replicas.replicas, opened):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up of replica %s failed: %r", replica.engine.url, result)
+
+    async def build_openapi() -> None:
+        # Already built if the app was preloaded by app.serve
+        if app.openapi_schema is None:
+            await run_in_threadpool(app.openapi)
+
+    async def serve_paths() -> None:
+        headers = []
+        if user_id is not None:
+            headers.append((b"authorization", f"Bearer {create_access_token(user_id)}".encode()))
+        for url in settings.WARMUP_PATHS:
+            status = await _get(app, url, headers)
+            if status >= 400:
+                logger.warning("Warm-up request %s got %d", url, status)
+
+    steps = {
+        "db_pool": open_pool,
+        "replica_pools": open_replica_pools,
+        "openapi": build_openapi,
+        "password_pool": lambda: run_in_threadpool(password_pool.warm_up),
+        "requests": serve_paths,
+    }
+    timings: Dict[str, float] = {}
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            await step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings
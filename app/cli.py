@@ -0,0 +1,96 @@
+"""
+Maintenance commands.
+
+    python -m app.cli rebuild-price-stats
+    python -m app.cli sync-sqlite-replicas
+    python -m app.cli grant-superuser admin@example.com
+
+`rebuild-price-stats` recomputes the market price statistics from all
+recorded transactions, e.g. after changing PRICE_STATS_RELATIVE_ACCURACY
+or PRICE_STATS_AGE_BANDS.
+
+`sync-sqlite-replicas` copies a SQLite primary database over each SQLite
+file in DATABASE_REPLICA_URLS, standing in for replication when trying
+read replicas locally; run it whenever the replicas should catch up.
+
+`grant-superuser` lets the user with the given email see operational
+endpoints such as /metrics; `--revoke` takes that back.
+"""
+import argparse
+import json
+import sqlite3
+
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.crud import crud_user
+from app.crud.crud_price_stats import price_stats
+from app.db.session import SessionLocal
+
+
+def rebuild_price_stats() -> None:
+    db = SessionLocal()
+    try:
+        counted = price_stats.rebuild(db)
+    finally:
+        db.close()
+    print(json.dumps({"sales": counted}))
+
+
+def _sqlite_file(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        raise SystemExit(f"Not a SQLite database file: {url}")
+    # URI filenames (file:replica.db?mode=ro) name the file without options
+    return parsed.database.removeprefix("file:")
+
+
+def sync_sqlite_replicas() -> None:
+    primary = sqlite3.connect(_sqlite_file(settings.SQLALCHEMY_DATABASE_URL))
+    synced = []
+    try:
+        for url in settings.DATABASE_REPLICA_URLS:
+            replica = sqlite3.connect(_sqlite_file(url))
+            try:
+                # A consistent snapshot, even while the primary is written to
+                primary.backup(replica)
+            finally:
+                replica.close()
+            synced.append(make_url(url).render_as_string(hide_password=True))
+    finally:
+        primary.close()
+    print(json.dumps({"replicas": synced}))
+
+
+def grant_superuser(args: argparse.Namespace) -> None:
+    if not args.email:
+        raise SystemExit("grant-superuser needs the user's email")
+    db = SessionLocal()
+    try:
+        user = crud_user.user.get_by_email(db, email=args.email)
+        if user is None:
+            raise SystemExit(f"No user with email {args.email}")
+        crud_user.user.update(db, db_obj=user, obj_in={"is_superuser": not args.revoke})
+    finally:
+        db.close()
+    print(json.dumps({"email": args.email, "is_superuser": not args.revoke}))
+
+
+COMMANDS = {
+    "rebuild-price-stats": lambda args: rebuild_price_stats(),
+    "sync-sqlite-replicas": lambda args: sync_sqlite_replicas(),
+    "grant-superuser": grant_superuser,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("email", nargs="?", help="grant-superuser: the user's email")
+    parser.add_argument("--revoke", action="store_true", help="grant-superuser: take it back")
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Optional
+
+import anyio.to_thread
+
+from app.core.config import settings
+from app.core.sketch import QuantileSketch
+
+# Pool name in ADMISSION_ROUTES for routes that are never limited
+UNLIMITED = "none"
+# Queue wait percentiles reported per pool
+WAIT_PERCENTILES = (50, 95, 99)
+
+
+class Overloaded(Exception):
+    """
+    Raised instead of admitting a request whose pool is saturated: its
+    queue is full or it waited too long. The API turns it into a 503 with
+    Retry-After.
+    """
+
+    def __init__(self, pool: str, reason: str):
+        super().__init__(f"Admission pool '{pool}' {reason}")
+        self.pool = pool
+        self.reason = reason
+
+
+class AdmissionPool:
+    """
+    Lets at most `limit` requests run at once; others wait in FIFO order.
+    Arrivals that find `queue` requests already waiting are shed at once,
+    and waiters still queued after `max_wait_ms` are shed then, so a surge
+    fails fast instead of growing everyone's latency without bound.
+
+    Used from the event loop only, so it needs no locking.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, max_wait_ms: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.max_wait = max_wait_ms / 1000
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._waits = QuantileSketch(0.02)
+        self._max_wait_ms = 0.0
+
+    def _record_wait(self, ms: float) -> None:
+        self.admitted += 1
+        # The sketch only holds positive values
+        self._waits.add(max(ms, 0.001))
+        self._max_wait_ms = max(self._max_wait_ms, ms)
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            return
+        self._waiters.remove(waiter)
+        self.shed_timeout += 1
+        waiter.set_exception(Overloaded(self.name, "queue wait timed out"))
+
+    async def acquire(self) -> float:
+        """
+        Wait for a slot; returns the milliseconds waited.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self._record_wait(0.0)
+            return 0.0
+        if len(self._waiters) >= self.queue:
+            self.shed_queue_full += 1
+            raise Overloaded(self.name, "queue is full")
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(self.max_wait, self._expire, waiter)
+        started = time.perf_counter()
+        try:
+            # release() hands its slot over by resolving the future
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as the client went away
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            timer.cancel()
+        waited = (time.perf_counter() - started) * 1000
+        self._record_wait(waited)
+        return waited
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        wait_ms = {
+            f"p{p}": round(self._waits.quantile(p / 100) or 0.0, 3) for p in WAIT_PERCENTILES
+        }
+        wait_ms["max"] = round(self._max_wait_ms, 3)
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "queue_wait_ms": wait_ms,
+        }
+
+
+class AdmissionControl:
+    """
+    The admission pools of this worker process (ADMISSION_POOLS) and which
+    route uses which: as listed in ADMISSION_ROUTES, otherwise "browse"
+    for GET and HEAD and "write" for other methods.
+    """
+
+    def __init__(self, pools: Dict[str, Dict[str, float]], routes: Dict[str, str], enabled: bool):
+        self.enabled = enabled
+        self.pools = {
+            name: AdmissionPool(
+                name,
+                limit=int(config["limit"]),
+                queue=int(config["queue"]),
+                max_wait_ms=config["max_wait_ms"],
+            )
+            for name, config in pools.items()
+        }
+        self.routes = routes
+
+    def pool_for(self, methods: Iterable[str], path: str) -> Optional[AdmissionPool]:
+        """
+        The pool of a route with `methods` at `path` (as declared, e.g.
+        /api/v1/horses/{horse_id}); None if it isn't limited.
+        """
+        if not self.enabled:
+            return None
+        methods = sorted(methods)
+        relative = path[len(settings.API_V1_STR):] if path.startswith(settings.API_V1_STR) else path
+        for method in methods:
+            name = self.routes.get(f"{method} {relative}")
+            if name is not None:
+                return self.pools.get(name) if name != UNLIMITED else None
+        reads = {"GET", "HEAD"}
+        return self.pools.get("browse" if reads.issuperset(methods) else "write")
+
+    def size_threadpool(self) -> None:
+        """
+        Give the threadpool at least a thread per admitted request, so
+        admitted sync endpoints never queue for one out of sight.
+        """
+        if not self.enabled:
+            return
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        limiter.total_tokens = max(
+            limiter.total_tokens, sum(pool.limit for pool in self.pools.values())
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {}
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+
+admission = AdmissionControl(
+    settings.ADMISSION_POOLS,
+    settings.ADMISSION_ROUTES,
+    enabled=settings.ADMISSION_CONTROL_ENABLED,
+)
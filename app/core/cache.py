@@ -0,0 +1,97 @@
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from multiprocessing.sharedctypes import Array
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries also expire `ttl` seconds after
+    they were stored. Counts hits and misses for `stats()`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class SharedGenerations:
+    """
+    Generation counters for cache keys, bumped on every write that makes
+    entries under the key stale. Kept in shared memory allocated at import,
+    like `StickyWrites`, so the workers app.serve forks from its preloaded
+    parent all see each other's bumps at once.
+
+    Keys share slots, ints by value and strings by checksum, modulo their
+    number; a collision only bumps another key along with the one written.
+    """
+
+    def __init__(self, slots: int):
+        self._generations = Array("q", slots)
+        # CLOCK_MONOTONIC is system-wide, so comparable across processes
+        self._bumped_at = Array("d", slots, lock=False)
+
+    def _slot(self, key: Any) -> int:
+        if isinstance(key, int):
+            return key % len(self._generations)
+        return zlib.crc32(str(key).encode()) % len(self._generations)
+
+    def get(self, key: Any) -> int:
+        return self._generations[self._slot(key)]
+
+    def bumped_at(self, key: Any) -> float:
+        return self._bumped_at[self._slot(key)]
+
+    def bump(self, *keys: Any) -> None:
+        with self._generations.get_lock():
+            for key in keys:
+                slot = self._slot(key)
+                self._generations[slot] += 1
+                self._bumped_at[slot] = time.monotonic()
@@ -1,7 +1,19 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 import secrets
 
+def async_url(url: str) -> str:
+    """
+    `url` with the async driver of its dialect (asyncpg or aiosqlite).
+    """
+    scheme, _, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    return url
+
 class Settings(BaseSettings):
     # Base
     PROJECT_NAME: str = "Horse Board API"
@@ -15,6 +27,19 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = "5432"
     POSTGRES_DB: str = "horse_board"
     DATABASE_URL: Optional[str] = None
+    # Serve the API with async endpoints on an async engine (asyncpg/aiosqlite)
+    DB_ASYNC: bool = False
+    # Connection pool, per engine and per worker process: each worker may
+    # hold up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections, which has to fit
+    # in Postgres max_connections across all workers.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a free connection before failing the request
+    DB_POOL_TIMEOUT: float = 30
+    # Reconnect connections older than this many seconds; -1 never does
+    DB_POOL_RECYCLE: int = 1800
+    # Test connections with a cheap round trip on checkout
+    DB_POOL_PRE_PING: bool = True
 
     @property
     def SQLALCHEMY_DATABASE_URL(self) -> str:
@@ -22,10 +47,157 @@ class Settings(BaseSettings):
             return self.DATABASE_URL
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def SQLALCHEMY_ASYNC_DATABASE_URL(self) -> str:
+        return async_url(self.SQLALCHEMY_DATABASE_URL)
+
+    # Read replicas of the primary above. GET and HEAD requests read from
+    # them (round robin) while everything else, and every write, uses the
+    # primary. Locally any copy works, e.g. a second SQLite file kept in
+    # sync with `python -m app.cli sync-sqlite-replicas`.
+    DATABASE_REPLICA_URLS: List[str] = []
+    # After writing, a user reads from the primary for this long, so they
+    # see their own writes; keep it above the usual replication lag
+    REPLICA_STICKY_SECONDS: float = 5
+    # A replica that can't be connected to, or (on Postgres) is more than
+    # REPLICA_MAX_LAG_SECONDS behind, is left out for REPLICA_RETRY_SECONDS.
+    # Lag is measured at most every REPLICA_CHECK_SECONDS per replica.
+    REPLICA_MAX_LAG_SECONDS: float = 10
+    REPLICA_CHECK_SECONDS: float = 5
+    REPLICA_RETRY_SECONDS: float = 30
+
     # JWT
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     ALGORITHM: str = "HS256"
+    # Password hashing runs in its own process pool; 0 workers hashes inline.
+    # Requests beyond workers + max pending get an immediate 503.
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # Authenticated users are cached per process; 0 disables the cache
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60
+    # Serialized responses of public read endpoints, per process. Writes
+    # invalidate them in all app.serve workers at once; the TTL bounds how
+    # long processes outside it may serve a page after a write; 0 size
+    # disables caching (ETag/304 handling stays on).
+    RESPONSE_CACHE_SIZE: int = 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 30
+    # Cache-Control max-age sent to clients; 0 makes them revalidate via ETag
+    RESPONSE_CACHE_MAX_AGE: int = 0
+    # Admission control, per worker process: requests wait for one of
+    # `limit` slots of their route's pool and get a 503 with Retry-After
+    # instead when `queue` requests are already waiting or after waiting
+    # `max_wait_ms`. Separate pools keep a login or booking surge from
+    # queueing browse traffic behind it.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_POOLS: Dict[str, Dict[str, float]] = {
+        "login": {"limit": 4, "queue": 32, "max_wait_ms": 2000},
+        "write": {"limit": 8, "queue": 32, "max_wait_ms": 1000},
+        "browse": {"limit": 24, "queue": 64, "max_wait_ms": 500},
+    }
+    # Pool of a route by "METHOD path", the path as declared under
+    # API_V1_STR; "none" exempts a route. Other routes use "browse" for GET
+    # and HEAD and "write" otherwise.
+    ADMISSION_ROUTES: Dict[str, str] = {
+        "POST /auth/login": "login",
+        "POST /auth/register": "login",
+        "GET /metrics/": "none",
+        "GET /health/live": "none",
+        "GET /health/ready": "none",
+    }
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    # python -m app.serve: worker processes (0 for one per CPU), forked
+    # from a parent that has already imported the app and built its schema
+    SERVE_HOST: str = "0.0.0.0"
+    SERVE_PORT: int = 8000
+    SERVE_WORKERS: int = 0
+    # On SIGTERM a worker keeps serving but fails readiness for this long,
+    # so load balancers stop sending it requests, then stops accepting and
+    # gives requests in flight SERVE_GRACEFUL_TIMEOUT seconds to finish
+    SERVE_DRAIN_SECONDS: float = 5
+    SERVE_GRACEFUL_TIMEOUT: int = 30
+    # Workers accept connections once warmed up: DB pool filled, password
+    # hashing processes started and these GETs served once in-process, as
+    # the first active user
+    WARMUP_ENABLED: bool = True
+    WARMUP_PATHS: List[str] = [
+        "/api/v1/horses/?limit=20",
+        "/api/v1/horses/facets",
+        "/api/v1/market/listings?limit=20",
+        "/api/v1/market/listings/facets",
+        "/api/v1/market/price-stats",
+        "/api/v1/rental/listings?limit=20",
+    ]
+    # Bulk imports validate and commit this many rows at a time
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+    # Row errors listed in a bulk import response (all are counted)
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    # Longest NDJSON line or CSV record, and largest body, a bulk import
+    # reads; beyond either it stops with 413
+    BULK_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    BULK_IMPORT_MAX_BODY_BYTES: int = 256 * 1024 * 1024
+    # Most IDs a `?ids=` batch request may ask for
+    BATCH_MAX_IDS: int = 100
+    # Rows fetched from the server-side cursor per write in streaming exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Upper bounds of the price buckets in market facets; a last bucket
+    # holds everything above
+    FACET_PRICE_BUCKETS: List[float] = [1000, 5000, 10000, 25000, 50000, 100000]
+    # Values listed per facet, most frequent first
+    FACET_MAX_VALUES: int = 20
+    # Times a booking is priced again when its listing changed between
+    # pricing and booking, before answering 409
+    BOOKING_RETRIES: int = 3
+    # Largest radius_km of a listing radius search
+    GEO_MAX_RADIUS_KM: float = 500
+    # Uploaded images and their variants, stored by content hash
+    MEDIA_ROOT: str = "media"
+    IMAGE_UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    # Larger images are refused when rendering (decompression bombs)
+    IMAGE_MAX_PIXELS: int = 50_000_000
+    # Longest side of the thumbnail and large variants, each stored as WebP
+    # and JPEG. Variants already rendered keep their size: delete
+    # MEDIA_ROOT/variants to have them rendered again on request.
+    IMAGE_THUMBNAIL_SIZE: int = 320
+    IMAGE_LARGE_SIZE: int = 1600
+    IMAGE_QUALITY: int = 80
+    # Variants are rendered in their own process pool; 0 workers renders
+    # inline. Uploads beyond workers + max pending are rendered on first
+    # request instead.
+    IMAGE_WORKERS: int = 2
+    IMAGE_MAX_PENDING: int = 64
+    # Let the front proxy send image files: with e.g. "/_media/" responses
+    # carry `X-Accel-Redirect: /_media/<path under MEDIA_ROOT>` (nginx
+    # `internal` location) and no body
+    MEDIA_ACCEL_REDIRECT: Optional[str] = None
+    # Relative error of the sale price percentiles in market price stats;
+    # run `python -m app.cli rebuild-price-stats` after changing it
+    PRICE_STATS_RELATIVE_ACCURACY: float = 0.01
+    # Rows each price stats group is spread over: a sale updates (and locks)
+    # only the one its transaction id picks, so concurrent sales seldom wait
+    # for each other, and reads merge them all. Safe to change at any time.
+    PRICE_STATS_SHARDS: int = 16
+    # Lower bounds of the horse age bands price stats are grouped by
+    PRICE_STATS_AGE_BANDS: List[int] = [3, 6, 10, 15, 20]
+    # Encode response models in one TypeAdapter validate-and-dump pass per
+    # route instead of FastAPI's default path, and other JSON with orjson
+    FAST_SERIALIZATION: bool = True
+    # Per-request timing: a Server-Timing header plus one JSON line per
+    # request on the `app.requests` logger
+    REQUEST_METRICS_ENABLED: bool = True
+    # Slowest statements listed in the log line, and how much of each
+    REQUEST_SLOW_STATEMENTS: int = 3
+    REQUEST_STATEMENT_MAX_LENGTH: int = 300
+    # Requests at least this slow are logged at WARNING instead of INFO
+    REQUEST_SLOW_MS: float = 1000
+    # Sampling profiler, off by default: profile this fraction of requests
+    # and write a flame graph (.folded) for those over the threshold
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_THRESHOLD_MS: float = 500
+    PROFILE_INTERVAL_MS: float = 5
+    PROFILE_DIR: str = "profiles"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,79 @@
+import time
+from typing import Any, Dict, Optional, Sequence
+
+STARTING = "starting"
+READY = "ready"
+DRAINING = "draining"
+# How states are stored in the array shared by app.serve's workers
+STATE_CODES = {STARTING: 0, READY: 1, DRAINING: 2}
+
+
+class WorkerHealth:
+    """
+    Lifecycle of this worker process as load balancers should see it:
+    starting until warm-up is done, then ready, then draining once it has
+    been asked to shut down. Only the event loop changes it.
+
+    Workers forked by app.serve share one listening socket, so a probe
+    reaches whichever accepts it. Each reports its own state, since one
+    that is warming up doesn't accept yet and one that is draining must
+    fail its probes even while the others pass; their states are shared
+    in an array only so that status() can count the ready ones.
+    """
+
+    def __init__(self):
+        self._workers: Optional[Sequence[int]] = None
+        self._slot = 0
+        self.start()
+
+    def share(self, workers: Sequence[int], slot: int) -> None:
+        self._workers = workers
+        self._slot = slot
+        self._set(self.state)
+
+    def _set(self, state: str) -> None:
+        self.state = state
+        if self._workers is not None:
+            self._workers[self._slot] = STATE_CODES[state]
+
+    def start(self) -> None:
+        self._set(STARTING)
+        self.started = time.monotonic()
+        self.ready_after_ms: Optional[float] = None
+        self.warm_up_ms: Dict[str, float] = {}
+
+    @property
+    def workers_ready(self) -> int:
+        if self._workers is None:
+            return int(self.state == READY)
+        return sum(code == STATE_CODES[READY] for code in self._workers)
+
+    @property
+    def is_ready(self) -> bool:
+        return self.state == READY
+
+    @property
+    def draining(self) -> bool:
+        return self.state == DRAINING
+
+    def ready(self, warm_up_ms: Dict[str, float]) -> None:
+        if self.state != STARTING:
+            return
+        self._set(READY)
+        self.ready_after_ms = round((time.monotonic() - self.started) * 1000, 1)
+        self.warm_up_ms = warm_up_ms
+
+    def drain(self) -> None:
+        self._set(DRAINING)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "workers_ready": self.workers_ready,
+            "workers": 1 if self._workers is None else len(self._workers),
+            "ready_after_ms": self.ready_after_ms,
+            "warm_up_ms": self.warm_up_ms,
+        }
+
+
+health = WorkerHealth()
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.image_variants import BadImage, render_variants, verify_image
+from app.core.media import VARIANT_SIZES, MediaStore, media_store
+from app.core.workers import exit_with_parent
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePoolBusy(Exception):
+    """
+    Raised instead of queueing when every rendering slot is taken.
+    """
+
+
+class ImagePool:
+    """
+    Renders the variants of stored images (see `render_variants`) in a
+    dedicated process pool, off the request path and off the CPU of the
+    worker serving requests.
+
+    Uploads are decoded here too (see `verify_image`) before they are
+    stored. Requests to render an image already being rendered share its
+    future, and images that turn out not to decode are marked failed in
+    the store. At most `workers + max_pending` images are admitted at
+    once; beyond that `render` and `verify` raise `ImagePoolBusy`. With
+    `workers=0` the work runs inline in the calling thread.
+    """
+
+    def __init__(self, store: MediaStore, workers: int, max_pending: int):
+        self.store = store
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._rendering: Dict[str, Future] = {}
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Called with the lock held
+        if self._executor is None:
+            # spawn: children must not inherit the parent's threads, sockets
+            # or DB connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=exit_with_parent,
+                initargs=(os.getpid(),),
+            )
+        return self._executor
+
+    def _admit(self) -> None:
+        # Called with the lock held; takes a slot, or raises ImagePoolBusy
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise ImagePoolBusy("Image rendering is saturated")
+
+    @staticmethod
+    def _inline(fn: Callable[..., Any], *args: Any) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _done(self, digest: str, future: Future) -> None:
+        with self._lock:
+            self._rendering.pop(digest, None)
+        self._slots.release()
+        if future.cancelled() or future.exception() is None:
+            return
+        logger.warning("Rendering variants of image %s failed: %r", digest, future.exception())
+        if isinstance(future.exception(), BadImage):
+            self.store.mark_failed(digest)
+
+    def render(self, digest: str) -> Future:
+        """
+        Render the variants of stored image `digest`; the future resolves
+        to the file names written.
+        """
+        args = (
+            self.store.original_path(digest),
+            self.store.variant_dir(digest),
+            VARIANT_SIZES,
+            settings.IMAGE_QUALITY,
+            settings.IMAGE_MAX_PIXELS,
+        )
+        with self._lock:
+            future = self._rendering.get(digest)
+            if future is not None:
+                return future
+            self._admit()
+            if self.workers > 0:
+                try:
+                    future = self._get_executor().submit(render_variants, *args)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                self._rendering[digest] = future
+        if self.workers <= 0:
+            future = self._inline(render_variants, *args)
+        future.add_done_callback(lambda done: self._done(digest, done))
+        return future
+
+    def verify(self, path: str) -> Future:
+        """
+        Decode the upload at `path`; the future fails with BadImage if it
+        isn't an accepted image.
+        """
+        args = (path, settings.IMAGE_MAX_PIXELS, max(VARIANT_SIZES.values()))
+        with self._lock:
+            self._admit()
+            if self.workers > 0:
+                try:
+                    future = self._get_executor().submit(verify_image, *args)
+                except BaseException:
+                    self._slots.release()
+                    raise
+        if self.workers <= 0:
+            future = self._inline(verify_image, *args)
+        future.add_done_callback(lambda done: self._slots.release())
+        return future
+
+    async def verify_async(self, path: str) -> None:
+        await asyncio.wrap_future(self.verify(path))
+
+    def render_later(self, digest: str) -> None:
+        """
+        Start rendering the variants of a new upload unless they exist;
+        when the pool is saturated the first request for one renders them.
+        """
+        if self.store.has_variants(digest):
+            return
+        try:
+            self.render(digest)
+        except ImagePoolBusy:
+            logger.info("Image pool saturated, rendering %s on first request", digest)
+
+    async def render_async(self, digest: str) -> None:
+        await asyncio.wrap_future(self.render(digest))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rendering = len(self._rendering)
+        return {"workers": self.workers, "rendering": rendering, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                # Waits for the worker processes to exit, so they can't
+                # outlive a worker that leaves via os._exit (app.serve)
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+image_pool = ImagePool(
+    media_store,
+    workers=settings.IMAGE_WORKERS,
+    max_pending=settings.IMAGE_MAX_PENDING,
+)
@@ -0,0 +1,107 @@
+import os
+import struct
+import tempfile
+import warnings
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from PIL import Image, ImageOps
+
+# Formats accepted for upload, as Pillow names them
+FORMATS = {"JPEG", "PNG", "GIF", "WEBP"}
+# What Pillow raises for files it can't decode, or that are too large
+_DECODE_ERRORS = (
+    OSError, SyntaxError, ValueError, EOFError, IndexError, struct.error,
+    Image.DecompressionBombError, Image.DecompressionBombWarning,
+)
+
+# Encoder settings per variant format; neither keeps EXIF (GPS) metadata
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+
+
+class BadImage(Exception):
+    """
+    Raised when a file doesn't decode as an accepted image within the
+    pixel limit; unlike other failures, trying again won't help.
+    """
+
+
+@contextmanager
+def _opened(source: str, max_pixels: int) -> Iterator[Image.Image]:
+    # Decoding errors in the block become BadImage
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(source) as image:
+                yield image
+    except FileNotFoundError:
+        raise
+    except _DECODE_ERRORS as e:
+        raise BadImage(f"{type(e).__name__}: {e}") from e
+
+
+def verify_image(source: str, max_pixels: int, largest: int) -> str:
+    """
+    Check that the file at `source` is a whole JPEG, PNG, GIF or WebP
+    image of at most `max_pixels`: its structure with Pillow's verify(),
+    then its pixel data by decoding it, at `largest` pixels a side where
+    the format allows. Runs in the image process pool before an upload is
+    stored; returns the format or raises BadImage.
+    """
+    with _opened(source, max_pixels) as image:
+        if image.format not in FORMATS:
+            raise BadImage(f"{image.format} images are not accepted")
+        image.verify()
+    # verify() leaves the image unusable
+    with _opened(source, max_pixels) as image:
+        image.draft("RGB", (largest, largest))
+        image.load()
+        return image.format
+
+
+def _save(image: Image.Image, path: str, fmt: str, quality: int) -> None:
+    if fmt == "jpg" and image.mode != "RGB":
+        image = image.convert("RGB")
+    # Written next to the target and renamed, so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, quality=quality, **_SAVE_OPTIONS[fmt])
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def render_variants(
+    source: str, directory: str, sizes: Dict[str, int], quality: int, max_pixels: int
+) -> List[str]:
+    """
+    Resize the image at `source` to fit each of `sizes` (variant name ->
+    longest side, never enlarging) and write every variant as WebP and
+    JPEG into `directory`. Runs in the image process pool; returns the
+    file names written, raises BadImage if the image doesn't decode.
+    """
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    with _opened(source, max_pixels) as image:
+        largest = max(sizes.values())
+        # Lets JPEG decode at a fraction of the full resolution
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if alpha else "RGB")
+    # Largest first, each resized from the previous one
+    for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+        image = image.copy()
+        image.thumbnail((size, size), Image.LANCZOS)
+        for fmt in _SAVE_OPTIONS:
+            _save(image, os.path.join(directory, f"{name}.{fmt}"), fmt, quality)
+            written.append(f"{name}.{fmt}")
+    return written
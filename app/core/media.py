@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import tempfile
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+# Where the images endpoints serve variants from
+IMAGES_PATH = f"{settings.API_V1_STR}/images"
+# Variant name -> longest side in pixels
+VARIANT_SIZES: Dict[str, int] = {
+    "thumb": settings.IMAGE_THUMBNAIL_SIZE,
+    "large": settings.IMAGE_LARGE_SIZE,
+}
+VARIANT_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+# Leading bytes of the formats accepted for upload
+_SIGNATURES = (
+    (0, b"\xff\xd8\xff"),  # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),
+    (0, b"GIF87a"),
+    (0, b"GIF89a"),
+    (8, b"WEBP"),  # after "RIFF" and the chunk size
+)
+_SNIFF_BYTES = 12
+# Marker among the variants of an image that couldn't be rendered
+_FAILED = "failed"
+
+
+class UnsupportedImage(Exception):
+    pass
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def image_url(digest: str, variant: str, fmt: str = "webp") -> str:
+    return f"{IMAGES_PATH}/{digest}/{variant}.{fmt}"
+
+
+def _is_image(head: bytes) -> bool:
+    return any(head[offset:offset + len(sig)] == sig for offset, sig in _SIGNATURES)
+
+
+class Upload:
+    """
+    An upload being written to a temporary file in the store at `path`,
+    hashed as it goes. `close` finishes it, so the file can be checked;
+    `commit` moves it to its content address.
+    """
+
+    def __init__(self, store: "MediaStore"):
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._head = b""
+        fd, self.path = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+            raise ImageTooLarge(f"Images are limited to {settings.IMAGE_UPLOAD_MAX_BYTES} bytes")
+        if len(self._head) < _SNIFF_BYTES:
+            self._head += data[:_SNIFF_BYTES - len(self._head)]
+            if len(self._head) == _SNIFF_BYTES and not _is_image(self._head):
+                raise UnsupportedImage("Upload a JPEG, PNG, GIF or WebP image")
+        self._hash.update(data)
+        self._file.write(data)
+
+    def close(self) -> None:
+        if not _is_image(self._head):
+            raise UnsupportedImage("Upload a JPEG, PNG, GIF or WebP image")
+        self._file.close()
+
+    def commit(self) -> str:
+        """
+        Store the upload under its SHA-256 and return that; an identical
+        upload stored before is kept and this one dropped.
+        """
+        self.close()
+        digest = self._hash.hexdigest()
+        path = self.store.original_path(digest)
+        if os.path.exists(path):
+            os.unlink(self.path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.path, path)
+        return digest
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class MediaStore:
+    """
+    Uploaded images on local disk by content: originals at
+    `originals/<ab>/<sha256>` and their variants at
+    `variants/<ab>/<sha256>/<variant>.<format>`, `ab` being the first two
+    hex digits. Files are never modified once in place, so they can be
+    cached forever. An empty `failed` file among an image's variants marks
+    one that doesn't decode, so that it isn't tried again.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    @property
+    def tmp_dir(self) -> str:
+        path = os.path.join(self.root, "tmp")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def original_path(self, digest: str) -> str:
+        return os.path.join(self.root, "originals", digest[:2], digest)
+
+    def variant_dir(self, digest: str) -> str:
+        return os.path.join(self.root, "variants", digest[:2], digest)
+
+    def variant_path(self, digest: str, name: str) -> Optional[str]:
+        """
+        Path of variant file `name` (e.g. "thumb.webp") of an image, or
+        None if that can't name one.
+        """
+        variant, _, fmt = name.partition(".")
+        if not _DIGEST.fullmatch(digest) or variant not in VARIANT_SIZES or fmt not in VARIANT_TYPES:
+            return None
+        return os.path.join(self.variant_dir(digest), name)
+
+    def has_variants(self, digest: str) -> bool:
+        return all(
+            os.path.exists(self.variant_path(digest, f"{variant}.{fmt}"))
+            for variant in VARIANT_SIZES
+            for fmt in VARIANT_TYPES
+        )
+
+    def has_failed(self, digest: str) -> bool:
+        return os.path.exists(os.path.join(self.variant_dir(digest), _FAILED))
+
+    def mark_failed(self, digest: str) -> None:
+        os.makedirs(self.variant_dir(digest), exist_ok=True)
+        open(os.path.join(self.variant_dir(digest), _FAILED), "a").close()
+
+    def new_upload(self) -> Upload:
+        return Upload(self)
+
+
+media_store = MediaStore(settings.MEDIA_ROOT)
@@ -0,0 +1,62 @@
+import base64
+import binascii
+import enum
+import json
+from datetime import date, datetime
+from typing import Any, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, enum.Enum):
+        # SQLAlchemy Enum columns accept member names as bind values
+        return value.name
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        # Only what _encode_value produces; anything else would reach the
+        # sort column comparison
+        if len(value) == 1 and isinstance(value.get("dt"), str):
+            return datetime.fromisoformat(value["dt"])
+        if len(value) == 1 and isinstance(value.get("d"), str):
+            return date.fromisoformat(value["d"])
+        raise ValueError("Unknown cursor value")
+    if value is not None and not isinstance(value, (str, int, float)):
+        raise ValueError("Cursor value is not a scalar")
+    return value
+
+
+def encode_cursor(key: str, value: Any, id: Any) -> str:
+    """
+    Build an opaque cursor pointing just after the row with the given sort
+    key value and primary key.
+    """
+    payload = json.dumps([key, _encode_value(value), id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any, Any]:
+    """
+    Return the `(key, value, id)` triple stored in a cursor produced by
+    `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed pagination cursor")
+    if not isinstance(key, str) or isinstance(id, bool) or not isinstance(id, (int, str)):
+        raise InvalidCursor("Malformed pagination cursor")
+    try:
+        return key, _decode_value(value), id
+    except ValueError:
+        raise InvalidCursor("Malformed pagination cursor")
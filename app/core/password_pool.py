@@ -0,0 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from app.core import security
+from app.core.config import settings
+from app.core.workers import exit_with_parent
+
+
+def _started() -> int:
+    # Runs in a worker process, which has imported app.core.security by then
+    return os.getpid()
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised instead of queueing when every hashing slot is taken; the API
+    turns it into a 503 with Retry-After.
+    """
+
+
+class PasswordHashPool:
+    """
+    Runs bcrypt in a dedicated process pool so password hashing doesn't eat
+    the CPU of the worker serving every other endpoint.
+
+    At most `workers + max_pending` hashes are admitted at once; anything
+    beyond that fails immediately with `PasswordHasherBusy` rather than
+    building an unbounded backlog. With `workers=0` hashing runs inline in
+    the calling thread (handy for tests and one-off scripts).
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: children must not inherit the parent's threads, sockets
+                # or DB connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=exit_with_parent,
+                    initargs=(os.getpid(),),
+                )
+            return self._executor
+
+    def _submit(self, fn: Callable, *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing is saturated")
+        try:
+            if self.workers > 0:
+                future = self._get_executor().submit(fn, *args)
+            else:
+                future = Future()
+                try:
+                    future.set_result(fn(*args))
+                except Exception as e:
+                    future.set_exception(e)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        return self._submit(security.get_password_hash, password).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(
+            security.verify_password, password, hashed_password
+        ).result()
+
+    def verify_and_update(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return self._submit(
+            security.verify_and_update_password, password, hashed_password
+        ).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(
+            self._submit(security.get_password_hash, password)
+        )
+
+    async def verify_and_update_async(
+        self, password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await asyncio.wrap_future(
+            self._submit(security.verify_and_update_password, password, hashed_password)
+        )
+
+    def warm_up(self) -> None:
+        """
+        Start the worker processes now instead of on the first logins.
+        """
+        if self.workers == 0:
+            return
+        executor = self._get_executor()
+        for future in [executor.submit(_started) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                # Waits for the worker processes to exit, so they can't
+                # outlive a worker that leaves via os._exit (app.serve)
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
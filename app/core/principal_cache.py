@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import SharedGenerations, TTLCache
+from app.core.config import settings
+from app.models.user import User
+
+
+class PrincipalCache:
+    """
+    Caches the authenticated user row per (user id, token) so that
+    `get_current_user` doesn't hit the database on every request.
+
+    Only column values are stored. Each hit builds a fresh detached `User`,
+    so requests never share an ORM instance and a hit can still be attached
+    to the request's session (e.g. by `update_user_me`) without a SELECT.
+    Writing the user row through `crud.user` bumps the user's generation,
+    which is part of the key and shared by all app.serve workers, so a
+    deactivated user or a changed password stops authenticating from cache
+    in every worker at once. Processes that don't share that memory pick
+    the write up after the TTL.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, slots: int = 65536):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = SharedGenerations(slots)
+
+    @staticmethod
+    def _key(user_id: int, generation: int, token: str) -> tuple:
+        return user_id, generation, hashlib.sha256(token.encode()).hexdigest()
+
+    def generation(self, user_id: Any) -> int:
+        """
+        The user's current generation; read it before loading the user row
+        to `set` afterwards, so a write in between leaves the entry unused.
+        """
+        return self._generations.get(int(user_id))
+
+    def get(self, user_id: Any, token: str) -> Optional[User]:
+        user_id = int(user_id)
+        values = self._cache.get(self._key(user_id, self.generation(user_id), token))
+        if values is None:
+            return None
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    def set(self, user_id: Any, token: str, user: User, generation: int) -> None:
+        values = {
+            column.key: getattr(user, column.key)
+            for column in User.__table__.columns
+        }
+        self._cache.set(self._key(int(user_id), generation, token), values)
+
+    def invalidate(self, user_id: Any) -> None:
+        user_id = int(user_id)
+        self._generations.bump(user_id)
+        self._cache.discard_where(lambda key: key[0] == user_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
@@ -0,0 +1,97 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Set
+
+from app.core.config import settings
+
+
+class _Profile:
+    def __init__(self, threads: Set[int]):
+        # Shared with the request, which adds and removes worker threads
+        self.threads = threads
+        self.samples: Counter = Counter()
+
+
+def _stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of the threads working on profiled requests
+    every `interval` seconds from a background thread, so nothing is traced
+    and unprofiled requests pay nothing. Stacks are dumped in the collapsed
+    ("folded") format read by flamegraph.pl, speedscope and most other
+    flame graph viewers.
+
+    The event loop thread is shared by all in-flight requests, so samples
+    taken there may include work of concurrent requests.
+    """
+
+    def __init__(self, interval: float, directory: str):
+        self.interval = interval
+        self.directory = directory
+        self._active: Set[_Profile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, threads: Set[int]) -> _Profile:
+        profile = _Profile(threads)
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        return profile
+
+    def stop(self, profile: _Profile) -> Counter:
+        with self._lock:
+            self._active.discard(profile)
+        return profile.samples
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active)
+            if not profiles:
+                continue
+            frames = sys._current_frames()
+            for profile in profiles:
+                for thread_id in list(profile.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.samples[_stack(frame)] += 1
+
+    def dump(self, samples: Counter, method: str, path: str, duration_ms: float) -> str:
+        """
+        Write `samples` as a .folded file named after the request and
+        return its path.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        filename = os.path.join(
+            self.directory, f"{stamp}-{method}-{slug}-{duration_ms:.0f}ms.folded"
+        )
+        with open(filename, "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return filename
+
+
+profiler = SamplingProfiler(
+    interval=settings.PROFILE_INTERVAL_MS / 1000, directory=settings.PROFILE_DIR
+)
@@ -0,0 +1,231 @@
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.profiler import profiler
+
+logger = logging.getLogger("app.requests")
+
+_current: ContextVar[Optional["RequestMetrics"]] = ContextVar("request_metrics", default=None)
+
+
+def current() -> Optional["RequestMetrics"]:
+    """
+    Metrics of the request being handled, or None outside of one (or with
+    REQUEST_METRICS_ENABLED off).
+    """
+    return _current.get()
+
+
+class RequestMetrics:
+    """
+    Where one request spent its time: SQL statements (count, total time,
+    the slowest few, lazy relationship loads), named spans such as `auth`,
+    the endpoint itself, response serialization and how long a sync
+    endpoint waited for a threadpool worker.
+
+    Sync endpoints and dependencies run on worker threads that share this
+    object through the context variable, hence the lock.
+    """
+
+    def __init__(self, slow_statements: int):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.lazy_loads = 0
+        self.spans: Dict[str, float] = {}
+        self.endpoint_finished: Optional[float] = None
+        # Threads currently working on this request, for the profiler
+        self.threads: Set[int] = {threading.get_ident()}
+        self._slowest: List[Tuple[float, int, str]] = []
+        self._slow_statements = slow_statements
+        self._lock = threading.Lock()
+
+    def record_query(self, ms: float, statement: str) -> None:
+        with self._lock:
+            self.queries += 1
+            self.db_ms += ms
+            if self._slow_statements:
+                entry = (ms, self.queries, statement)
+                if len(self._slowest) < self._slow_statements:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+    def record_lazy_load(self) -> None:
+        with self._lock:
+            self.lazy_loads += 1
+
+    def add_span(self, name: str, ms: float) -> None:
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + ms
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def slowest(self) -> List[Dict[str, Any]]:
+        return [
+            {"ms": round(ms, 3), "statement": statement}
+            for ms, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"']
+        entries += [f"{name};dur={ms:.1f}" for name, ms in self.spans.items()]
+        entries.append(f"app;dur={self.elapsed_ms():.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "duration_ms": round(self.elapsed_ms(), 3),
+            "db": {
+                "queries": self.queries,
+                "ms": round(self.db_ms, 3),
+                "lazy_loads": self.lazy_loads,
+                "slowest": self.slowest(),
+            },
+            "spans_ms": {name: round(ms, 3) for name, ms in self.spans.items()},
+        }
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to the current request's `name` span.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_span(name, (time.perf_counter() - started) * 1000)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    stack = conn.info.get("query_started")
+    if not stack:
+        return
+    ms = (time.perf_counter() - stack.pop()) * 1000
+    metrics.record_query(ms, " ".join(statement.split())[: settings.REQUEST_STATEMENT_MAX_LENGTH])
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if _current.get() is None or connection is None:
+        return
+    stack = connection.info.get("query_started")
+    if stack:
+        stack.pop()
+
+
+def _do_orm_execute(orm_execute_state):
+    metrics = _current.get()
+    if (
+        metrics is not None
+        and orm_execute_state.is_select
+        and orm_execute_state.lazy_loaded_from is not None
+    ):
+        metrics.record_lazy_load()
+
+
+_hooks_installed = False
+
+
+def install_sqlalchemy_hooks() -> None:
+    """
+    Listen on every Engine (the async engine's sync core included) and every
+    Session; the listeners do nothing outside of a measured request.
+    """
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+    _hooks_installed = True
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures each HTTP request: adds a `Server-Timing` header to the
+    response and logs one JSON line to the `app.requests` logger when it
+    finishes (WARNING above REQUEST_SLOW_MS, INFO otherwise). With
+    PROFILE_SAMPLE_RATE set, a sample of requests is also profiled and
+    those slower than PROFILE_THRESHOLD_MS get a flame graph written to
+    PROFILE_DIR.
+
+    Streaming responses send their headers first, so their Server-Timing
+    only covers the work before the body; the log line covers all of it.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        install_sqlalchemy_hooks()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics(settings.REQUEST_SLOW_STATEMENTS)
+        token = _current.set(metrics)
+        profile = None
+        if settings.PROFILE_SAMPLE_RATE and random.random() < settings.PROFILE_SAMPLE_RATE:
+            profile = profiler.start(metrics.threads)
+        status = 500
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", metrics.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            duration_ms = metrics.elapsed_ms()
+            profile_path = None
+            if profile is not None:
+                samples = profiler.stop(profile)
+                if duration_ms >= settings.PROFILE_THRESHOLD_MS and samples:
+                    profile_path = profiler.dump(samples, scope["method"], scope["path"], duration_ms)
+            level = logging.WARNING if duration_ms >= settings.REQUEST_SLOW_MS else logging.INFO
+            if logger.isEnabledFor(level):
+                route = scope.get("route")
+                record = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": getattr(route, "path", None),
+                    "status": status,
+                    **metrics.as_dict(),
+                }
+                if profile_path is not None:
+                    record["profile"] = profile_path
+                logger.log(level, json.dumps(record), extra={"request_metrics": record})
@@ -0,0 +1,140 @@
+import hashlib
+import time
+from functools import lru_cache
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.core.cache import SharedGenerations, TTLCache
+from app.core.config import settings
+from app.db.replicas import sticky_writes
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+@lru_cache(maxsize=256)
+def _adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = (tag.strip() for tag in header.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CacheLookup:
+    """
+    The result of `ResponseCache.lookup`: `response` is the ready answer on a
+    hit, otherwise the endpoint computes its result and hands it to `store`.
+    """
+
+    def __init__(
+        self,
+        cache: "ResponseCache",
+        request: Request,
+        key: Hashable,
+        hit: Optional[CachedResponse],
+        keep: bool = True,
+    ):
+        self._cache = cache
+        self._request = request
+        self._key = key
+        self._keep = keep
+        self.response = cache.respond(request, hit) if hit is not None else None
+
+    def store(
+        self, response_type: Any, data: Any, headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """
+        Serialize `data` as `response_type` (the route's response model),
+        cache it and return the response, a 304 if the client already has it.
+        """
+        adapter = _adapter(response_type)
+        body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        entry = CachedResponse(body, etag, dict(headers or {}))
+        if self._keep:
+            self._cache._entries.set(self._key, entry)
+        return self._cache.respond(self._request, entry)
+
+
+class ResponseCache:
+    """
+    Per-process cache of serialized JSON responses for read endpoints whose
+    body doesn't depend on the caller, keyed by namespace, path and
+    normalized query string. Every response carries a strong ETag, and a
+    matching If-None-Match is answered with 304 and no body.
+
+    Writes call `invalidate(namespace)`, which bumps the namespace's
+    generation; the generation is part of the key, so older entries are
+    never served again, and a response computed while a write was in
+    flight lands under the old generation. Generations are
+    `SharedGenerations`, so a write in any of the workers app.serve forks
+    from its preloaded parent invalidates the entries of all of them at
+    once: no worker serves a response older than the last committed write. Processes that don't share that memory (other
+    hosts, or servers started without a preloaded parent) only notice once
+    `ttl` expires, which still bounds staleness between them.
+
+    With read replicas, responses computed within `settle` seconds of an
+    invalidation may come from a replica that hasn't caught up yet, so they
+    are served but not kept; users who just wrote skip the cache entirely
+    while their reads go to the primary.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, max_age: int = 0, settle: float = 0, slots: int = 256
+    ):
+        self.max_age = max_age
+        self.settle = settle
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = SharedGenerations(slots)
+
+    def _key(self, request: Request, namespace: str) -> Tuple[Any, ...]:
+        query = tuple(sorted(request.query_params.multi_items()))
+        generation = self._generations.get(namespace)
+        return (namespace, generation, request.url.path, query)
+
+    def lookup(self, request: Request, namespace: str) -> CacheLookup:
+        key = self._key(request, namespace)
+        if sticky_writes.recent(getattr(request.state, "user_id", None)):
+            return CacheLookup(self, request, key, None)
+        settled = time.monotonic() - self._generations.bumped_at(namespace) >= self.settle
+        return CacheLookup(self, request, key, self._entries.get(key), keep=settled)
+
+    def respond(self, request: Request, entry: CachedResponse) -> Response:
+        headers = {
+            **entry.headers,
+            "ETag": entry.etag,
+            "Cache-Control": f"private, max-age={self.max_age}",
+        }
+        if _etag_matches(request, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+    def invalidate(self, *namespaces: str) -> None:
+        self._generations.bump(*namespaces)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._entries.stats()
+
+
+response_cache = ResponseCache(
+    maxsize=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    max_age=settings.RESPONSE_CACHE_MAX_AGE,
+    settle=settings.REPLICA_STICKY_SECONDS if settings.DATABASE_REPLICA_URLS else 0,
+)
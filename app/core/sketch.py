@@ -0,0 +1,62 @@
+import math
+from typing import Dict, Optional
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch (the DDSketch scheme): a positive value v
+    is counted in bucket ceil(log_γ v) with γ = (1 + α) / (1 - α), so every
+    quantile it reports is within relative error α of a value actually
+    added. Its size only grows with the logarithm of the value range (a few
+    hundred buckets for prices at α = 1%), not with the number of values,
+    and two sketches merge exactly by adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float, buckets: Optional[Dict[int, int]] = None):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = dict(buckets or {})
+        self.count = sum(self.buckets.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= 0:
+            raise ValueError("QuantileSketch only holds positive values")
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate of the `q` quantile (0 <= q <= 1), None while empty.
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                break
+        # Midpoint (in relative terms) of the bucket (γ^(i-1), γ^i]
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, int]:
+        # JSON object keys are strings
+        return {str(index): count for index, count in self.buckets.items()}
+
+    @classmethod
+    def from_dict(cls, relative_accuracy: float, data: Optional[Dict[str, int]]) -> "QuantileSketch":
+        return cls(
+            relative_accuracy,
+            {int(index): count for index, count in (data or {}).items()},
+        )
@@ -0,0 +1,19 @@
+import os
+import threading
+import time
+
+
+def exit_with_parent(parent: int) -> None:
+    """
+    Initializer for process pool workers: exit once `parent`, the process
+    that started the pool, is gone. Otherwise workers outlive a parent
+    killed without shutting its pool down, e.g. by the OOM killer, and
+    app.serve leaks a set on every restart.
+    """
+
+    def watch() -> None:
+        while os.getppid() == parent:
+            time.sleep(1)
+        os._exit(0)
+
+    threading.Thread(target=watch, name="exit-with-parent", daemon=True).start()
@@ -1,4 +1,5 @@
 from .crud_user import user
 from .crud_horse import horse
 from .crud_market import market
-from .crud_rental import rental_listing, rental_booking 
\ No newline at end of file
+from .crud_rental import rental_listing, rental_booking
+from .crud_price_stats import price_stats
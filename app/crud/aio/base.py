@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Sequence, Union
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.aio.batching import AsyncBatchLoader
+from app.crud.base import CRUDBase, CreateSchemaType, ModelType, UpdateSchemaType
+from app.crud.batching import order_by_ids
+from app.crud.loading import load_options
+from app.schemas.fields import FieldTree
+
+class AsyncCRUDBase(CRUDBase[ModelType, CreateSchemaType, UpdateSchemaType]):
+    """
+    AsyncSession counterpart of `CRUDBase`. Query building (filters, search,
+    keyset pagination, eager-load profiles) is shared with the sync class;
+    only execution differs. Objects handed back always have the relationships
+    their response schema nests loaded, since lazy loads aren't possible
+    under asyncio.
+    """
+
+    def _select(
+        self, model: Any = None, schema: Any = None, fields: Optional[FieldTree] = None
+    ) -> Any:
+        model = model if model is not None else self.model
+        if schema is None and model is self.model:
+            schema = self.schema
+        stmt = select(model)
+        if schema is not None:
+            stmt = stmt.options(*load_options(model, schema, fields))
+        return stmt
+
+    async def _all(self, db: AsyncSession, stmt: Any) -> List[Any]:
+        return list((await db.execute(stmt)).scalars().all())
+
+    async def _first(self, db: AsyncSession, stmt: Any) -> Optional[Any]:
+        return (await db.execute(stmt.limit(1))).scalars().first()
+
+    async def _reload(self, db: AsyncSession, db_obj: ModelType) -> ModelType:
+        # Re-select with the loading profile so freshly written rows come back
+        # with their nested relationships populated
+        stmt = (
+            self._select()
+            .filter(self.model.id == db_obj.id)
+            .execution_options(populate_existing=True)
+        )
+        return await self._first(db, stmt)
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        if self.batch_gets:
+            return await AsyncBatchLoader.of(db, self).load(db, id)
+        return await self._first(db, self._select().filter(self.model.id == id))
+
+    async def get_many(
+        self, db: AsyncSession, ids: Sequence[Any], *, fields: Optional[FieldTree] = None
+    ) -> List[ModelType]:
+        if not ids:
+            return []
+        rows = await self._all(db, self._select(fields=fields).filter(self.model.id.in_(ids)))
+        return order_by_ids(rows, ids)
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        sort_by: Optional[str] = None,
+        order: Optional[str] = "asc",
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[ModelType]:
+        stmt, relevance = self._search(
+            self._select(fields=fields),
+            dialect=db.get_bind().dialect.name,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        stmt = self._filter(stmt, filters=filters)
+        stmt = self._paginate(
+            stmt,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort_by=sort_by,
+            order=order,
+            relevance=relevance,
+        )
+        return await self._all(db, stmt)
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def create_many(
+        self, db: AsyncSession, *, objs_in: List[Dict[str, Any]], model: Any = None
+    ) -> List[int]:
+        model = model if model is not None else self.model
+        if not objs_in:
+            return []
+        stmt, ordered = self._insert_many(model, db.get_bind().dialect.name)
+        try:
+            ids = (await db.scalars(stmt, objs_in)).all()
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        self._invalidate_cache()
+        return list(ids) if ordered else sorted(ids)
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        columns = self.model.__table__.columns.keys()
+        for field in columns:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def remove(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await db.get(self.model, id)
+        await db.delete(obj)
+        await db.commit()
+        self._invalidate_cache()
+        return obj
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.batching import BatchLoader
+
+
+class AsyncBatchLoader(BatchLoader):
+    """
+    `BatchLoader` on an AsyncSession, which also coalesces: the ids that
+    concurrently running coroutines (e.g. under `asyncio.gather`) ask for
+    are fetched together, by one query issued once they all have asked,
+    instead of one query each, which one AsyncSession couldn't run
+    concurrently anyway.
+    """
+
+    def __init__(self, crud: Any):
+        super().__init__(crud)
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._dispatch_task: Optional[asyncio.Task] = None
+
+    async def load_many(self, db: AsyncSession, ids: Sequence[Any]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(db, id) for id in ids)))
+
+    async def load(self, db: AsyncSession, id: Any) -> Optional[Any]:
+        if id in self.loaded:
+            return self.loaded[id]
+        future = self._pending.get(id)
+        if future is None:
+            if not self._pending:
+                # Runs once the coroutines scheduled alongside have had
+                # their turn to add their ids
+                self._dispatch_task = asyncio.ensure_future(self._dispatch(db))
+            future = self._pending[id] = asyncio.get_running_loop().create_future()
+        # A cancelled caller mustn't cancel the others waiting for the id
+        return await asyncio.shield(future)
+
+    async def _dispatch(self, db: AsyncSession) -> None:
+        pending, self._pending = self._pending, {}
+        try:
+            rows = await self.crud.get_many(db, list(pending))
+        except asyncio.CancelledError:
+            for future in pending.values():
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.loaded.update(dict.fromkeys(pending))
+        for row in rows:
+            self.loaded[row.id] = row
+        for id, future in pending.items():
+            if not future.done():
+                future.set_result(self.loaded[id])
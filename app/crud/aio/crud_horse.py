@@ -0,0 +1,113 @@
+from typing import Any, Dict, Iterable, List, Optional, Set
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.aio.base import AsyncCRUDBase
+from app.crud.crud_horse import CRUDHorse
+from app.db.facets import facet_counts
+from app.models.horse import Horse, HorseImage
+from app.schemas.horse import Horse as HorseSchema
+from app.schemas.horse import HorseCreate, HorseUpdate, HorseImageCreate, HorseImageBulkCreate
+from app.schemas.fields import FieldTree
+
+class AsyncCRUDHorse(AsyncCRUDBase[Horse, HorseCreate, HorseUpdate]):
+    cache_namespaces = ("horses", "market", "rental")
+    batch_gets = True
+
+    select_facets = CRUDHorse.select_facets
+
+    async def create_with_owner(
+        self, db: AsyncSession, *, obj_in: HorseCreate, owner_id: int
+    ) -> Horse:
+        obj_in_data = obj_in.dict()
+        db_obj = Horse(**obj_in_data, owner_id=owner_id)
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def create_many_with_owner(
+        self, db: AsyncSession, *, objs_in: List[HorseCreate], owner_id: int
+    ) -> List[int]:
+        return await self.create_many(
+            db, objs_in=[{**obj_in.dict(), "owner_id": owner_id} for obj_in in objs_in]
+        )
+
+    async def owned_ids(
+        self, db: AsyncSession, *, owner_id: int, ids: Iterable[int]
+    ) -> Set[int]:
+        return set(
+            await db.scalars(
+                select(Horse.id).filter(Horse.owner_id == owner_id, Horse.id.in_(set(ids)))
+            )
+        )
+
+    async def get_facets(
+        self,
+        db: AsyncSession,
+        *,
+        filters: Optional[Dict] = None,
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        stmt, facets = self.select_facets(
+            dialect=db.get_bind().dialect.name,
+            filters=filters,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        return facet_counts((await db.execute(stmt)).all(), facets)
+
+    async def get_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[Horse]:
+        stmt = self._select(fields=fields).filter(Horse.owner_id == owner_id)
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor)
+        )
+
+    async def add_image(
+        self,
+        db: AsyncSession,
+        *,
+        horse_id: int,
+        image: HorseImageCreate,
+        content_hash: Optional[str] = None,
+    ) -> HorseImage:
+        db_obj = HorseImage(**image.dict(), horse_id=horse_id, content_hash=content_hash)
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        # Loads thumbnail_url, which the database computes
+        await db.refresh(db_obj)
+        return db_obj
+
+    async def add_images(
+        self, db: AsyncSession, *, images: List[HorseImageBulkCreate]
+    ) -> List[int]:
+        return await self.create_many(
+            db, objs_in=[image.dict() for image in images], model=HorseImage
+        )
+
+    async def get_images(self, db: AsyncSession, *, horse_id: int) -> List[HorseImage]:
+        return await self._all(
+            db, select(HorseImage).filter(HorseImage.horse_id == horse_id)
+        )
+
+    async def get_primary_image(
+        self, db: AsyncSession, *, horse_id: int
+    ) -> Optional[HorseImage]:
+        return await self._first(
+            db,
+            select(HorseImage).filter(
+                HorseImage.horse_id == horse_id, HorseImage.is_primary == True
+            ),
+        )
+
+horse = AsyncCRUDHorse(Horse, HorseSchema)
@@ -0,0 +1,137 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.crud.aio.base import AsyncCRUDBase
+from app.crud.aio.crud_price_stats import price_stats
+from app.crud.crud_market import CRUDMarketListing, ListingUnavailable, claim_listing
+from app.db.facets import facet_counts
+from app.db.geo import Circle
+from app.models.market import MarketListing, Transaction, ListingStatus
+from app.schemas.market import MarketListing as MarketListingSchema
+from app.schemas.market import Transaction as TransactionSchema
+from app.schemas.market import MarketListingCreate, MarketListingUpdate, TransactionCreate
+from app.schemas.fields import FieldTree
+
+class AsyncCRUDMarketListing(
+    AsyncCRUDBase[MarketListing, MarketListingCreate, MarketListingUpdate]
+):
+    cache_namespaces = ("market",)
+
+    # Export statements don't touch the session; share the sync builders
+    select_listings = CRUDMarketListing.select_listings
+    select_transactions_by_buyer = CRUDMarketListing.select_transactions_by_buyer
+    select_facets = CRUDMarketListing.select_facets
+
+    async def create_with_seller(
+        self, db: AsyncSession, *, obj_in: MarketListingCreate, seller_id: int
+    ) -> MarketListing:
+        obj_in_data = obj_in.dict()
+        db_obj = MarketListing(**obj_in_data, seller_id=seller_id)
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def create_many_with_seller(
+        self, db: AsyncSession, *, objs_in: List[MarketListingCreate], seller_id: int
+    ) -> List[int]:
+        return await self.create_many(
+            db, objs_in=[{**obj_in.dict(), "seller_id": seller_id} for obj_in in objs_in]
+        )
+
+    async def get_by_seller(
+        self,
+        db: AsyncSession,
+        *,
+        seller_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[MarketListing]:
+        stmt = self._select(fields=fields).filter(MarketListing.seller_id == seller_id)
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor)
+        )
+
+    async def get_active_listings(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        circle: Optional[Circle] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[MarketListing]:
+        stmt, nearest = self._nearby(
+            self._select(fields=fields).filter(MarketListing.status == ListingStatus.ACTIVE),
+            circle,
+        )
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor, relevance=nearest)
+        )
+
+    async def get_facets(
+        self, db: AsyncSession, *, filters: Optional[Dict] = None, location: Optional[str] = None
+    ) -> Dict[str, Any]:
+        stmt, facets = self.select_facets(filters=filters, location=location)
+        return facet_counts((await db.execute(stmt)).all(), facets)
+
+    async def create_transaction(
+        self, db: AsyncSession, *, obj_in: TransactionCreate
+    ) -> Transaction:
+        """
+        Sell the listing and record the transaction, or raise
+        ListingUnavailable if it is no longer active.
+        """
+        # Claim the listing first, which holds it until commit
+        if not (await db.execute(claim_listing(obj_in.listing_id))).rowcount:
+            await db.rollback()
+            raise ListingUnavailable("Listing is no longer for sale")
+        db_obj = Transaction(**obj_in.dict())
+        db.add(db_obj)
+        # Assigns its id, which picks the price stats shard
+        await db.flush()
+
+        listing = await self._first(
+            db,
+            select(MarketListing)
+            .options(joinedload(MarketListing.horse))
+            .filter(MarketListing.id == obj_in.listing_id),
+        )
+        await price_stats.record_sale(
+            db,
+            sale_id=db_obj.id,
+            price=db_obj.final_price,
+            breed=listing.horse.breed,
+            location=listing.location,
+            age=listing.horse.age,
+        )
+
+        await db.commit()
+        self._invalidate_cache()
+        return db_obj
+
+    async def get_transactions_by_buyer(
+        self,
+        db: AsyncSession,
+        *,
+        buyer_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[Transaction]:
+        stmt = self._select(Transaction, TransactionSchema, fields).filter(
+            Transaction.buyer_id == buyer_id
+        )
+        return await self._all(
+            db,
+            self._paginate(
+                stmt, model=Transaction, skip=skip, limit=limit, cursor=cursor
+            ),
+        )
+
+market = AsyncCRUDMarketListing(MarketListing, MarketListingSchema)
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.crud_price_stats import (
+    CRUDPriceStatistics,
+    Group,
+    merge_shards,
+    price_groups,
+    summarize,
+)
+from app.models.horse import HorseBreed
+from app.models.market import PriceStatistic
+
+class AsyncCRUDPriceStatistics(CRUDPriceStatistics):
+    """
+    AsyncSession counterpart of `CRUDPriceStatistics`; rebuilds go through
+    the sync class (`python -m app.cli rebuild-price-stats`).
+    """
+
+    async def _rows(
+        self, db: AsyncSession, groups: Sequence[Group], shard: int
+    ) -> Dict[Group, PriceStatistic]:
+        stmt = self._select(groups, shard).with_for_update()
+        return {(row.dimension, row.key): row for row in await db.scalars(stmt)}
+
+    async def record_sale(
+        self,
+        db: AsyncSession,
+        *,
+        sale_id: int,
+        price: float,
+        breed: Optional[HorseBreed],
+        location: Optional[str],
+        age: Optional[int],
+    ) -> None:
+        groups = price_groups(breed, location, age)
+        shard = self._shard(sale_id)
+        rows = await self._rows(db, groups, shard)
+        missing = [group for group in groups if group not in rows]
+        if missing:
+            await db.execute(self._insert_missing(db.get_bind().dialect.name, missing, shard))
+            rows = await self._rows(db, groups, shard)
+        self._count_sale(rows, groups, price)
+
+    async def get_stats(
+        self,
+        db: AsyncSession,
+        *,
+        breed: Optional[HorseBreed] = None,
+        location: Optional[str] = None,
+        age: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        groups = price_groups(breed, location, age)
+        summaries = merge_shards(await db.scalars(self._select(groups)))
+        return [summarize(group, summaries.get(group)) for group in groups]
+
+price_stats = AsyncCRUDPriceStatistics()
@@ -0,0 +1,217 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.crud.aio.base import AsyncCRUDBase
+from app.crud.crud_rental import (
+    CRUDRentalBooking,
+    CRUDRentalListing,
+    BookingConflict,
+    booking_period,
+    booking_price,
+    filter_available,
+    insert_booking,
+    is_overlap_violation,
+    update_booking,
+)
+from app.db.geo import Circle
+from app.models.rental import (
+    RentalListing,
+    RentalBooking,
+    RentalDuration,
+    RentalStatus,
+    BookingStatus,
+)
+from app.schemas.rental import (
+    RentalListing as RentalListingSchema,
+    RentalBooking as RentalBookingSchema,
+    RentalListingCreate,
+    RentalListingUpdate,
+    RentalBookingCreate,
+    RentalBookingUpdate,
+)
+from app.schemas.fields import FieldTree
+
+class AsyncCRUDRentalListing(
+    AsyncCRUDBase[RentalListing, RentalListingCreate, RentalListingUpdate]
+):
+    cache_namespaces = ("rental",)
+
+    # Export statements don't touch the session; share the sync builders
+    select_available = CRUDRentalListing.select_available
+
+    async def create_with_owner(
+        self, db: AsyncSession, *, obj_in: RentalListingCreate, owner_id: int
+    ) -> RentalListing:
+        obj_in_data = obj_in.dict()
+        db_obj = RentalListing(**obj_in_data, owner_id=owner_id)
+        db.add(db_obj)
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def create_many_with_owner(
+        self, db: AsyncSession, *, objs_in: List[RentalListingCreate], owner_id: int
+    ) -> List[int]:
+        return await self.create_many(
+            db, objs_in=[{**obj_in.dict(), "owner_id": owner_id} for obj_in in objs_in]
+        )
+
+    async def get_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[RentalListing]:
+        stmt = self._select(fields=fields).filter(RentalListing.owner_id == owner_id)
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor)
+        )
+
+    async def get_available_listings(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        available_from: Optional[datetime] = None,
+        available_to: Optional[datetime] = None,
+        duration_type: Optional[RentalDuration] = None,
+        location: Optional[str] = None,
+        circle: Optional[Circle] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[RentalListing]:
+        stmt, nearest = self._nearby(
+            self._select(fields=fields).filter(RentalListing.status == RentalStatus.AVAILABLE),
+            circle,
+        )
+        stmt = filter_available(
+            self._filter(stmt, filters=filters),
+            dialect=db.get_bind().dialect.name,
+            available_from=available_from,
+            available_to=available_to,
+            duration_type=duration_type,
+            location=location,
+        )
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor, relevance=nearest)
+        )
+
+class AsyncCRUDRentalBooking(
+    AsyncCRUDBase[RentalBooking, RentalBookingCreate, RentalBookingUpdate]
+):
+    cache_namespaces = ("rental",)
+
+    select_by_renter = CRUDRentalBooking.select_by_renter
+
+    async def create_with_renter(
+        self, db: AsyncSession, *, obj_in: RentalBookingCreate, renter_id: int
+    ) -> RentalBooking:
+        if obj_in.end_date <= obj_in.start_date:
+            raise ValueError("Booking must end after it starts")
+
+        for _ in range(settings.BOOKING_RETRIES + 1):
+            # Get the rental listing to calculate total price
+            listing = await self._first(
+                db, select(RentalListing).filter(RentalListing.id == obj_in.rental_listing_id)
+            )
+            if not listing:
+                raise ValueError("Rental listing not found")
+            version = listing.version
+
+            total_price = booking_price(listing, obj_in.duration_type)
+
+            # Create booking unless the dates are already taken
+            values = {
+                **obj_in.dict(),
+                "renter_id": renter_id,
+                "total_price": total_price,
+                "status": BookingStatus.PENDING,
+            }
+            try:
+                result = await db.execute(
+                    insert_booking(db.get_bind().dialect.name, values, version)
+                )
+                booking_id = result.scalar()
+            except IntegrityError as e:
+                await db.rollback()
+                if is_overlap_violation(e):
+                    raise BookingConflict("Listing is already booked for these dates") from e
+                raise
+            if booking_id is not None:
+                await db.commit()
+                self._invalidate_cache()
+                return await self.get(db, booking_id)
+            await db.rollback()
+            # Only a listing changed since it was read is worth pricing again
+            current = await db.scalar(
+                select(RentalListing.version).filter(RentalListing.id == obj_in.rental_listing_id)
+            )
+            if current == version:
+                raise BookingConflict("Listing is already booked for these dates")
+        raise BookingConflict("Listing kept changing while booking it, try again")
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: RentalBooking,
+        obj_in: Union[RentalBookingUpdate, Dict[str, Any]]
+    ) -> RentalBooking:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        period = booking_period(db_obj, update_data)
+        try:
+            result = await db.execute(
+                update_booking(db.get_bind().dialect.name, db_obj, update_data, period)
+            )
+        except IntegrityError as e:
+            await db.rollback()
+            if is_overlap_violation(e):
+                raise BookingConflict("Listing is already booked for these dates") from e
+            raise
+        if not result.rowcount:
+            await db.rollback()
+            raise BookingConflict("Listing is already booked for these dates")
+        await db.commit()
+        self._invalidate_cache()
+        return await self._reload(db, db_obj)
+
+    async def get_by_renter(
+        self,
+        db: AsyncSession,
+        *,
+        renter_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[RentalBooking]:
+        stmt = self._select(fields=fields).filter(RentalBooking.renter_id == renter_id)
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor)
+        )
+
+    async def get_by_listing(
+        self,
+        db: AsyncSession,
+        *,
+        listing_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> List[RentalBooking]:
+        stmt = self._select().filter(RentalBooking.rental_listing_id == listing_id)
+        return await self._all(
+            db, self._paginate(stmt, skip=skip, limit=limit, cursor=cursor)
+        )
+
+rental_listing = AsyncCRUDRentalListing(RentalListing, RentalListingSchema)
+rental_booking = AsyncCRUDRentalBooking(RentalBooking, RentalBookingSchema)
@@ -0,0 +1,82 @@
+from typing import Any, Dict, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.password_pool import password_pool
+from app.core.principal_cache import principal_cache
+from app.crud.aio.base import AsyncCRUDBase
+from app.models.user import User
+from app.schemas.user import User as UserSchema
+from app.schemas.user import UserCreate, UserUpdate
+
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    # Listing pages embed the seller/owner
+    cache_namespaces = ("market", "rental")
+    batch_gets = True
+
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        return await self._first(db, select(User).filter(User.email == email))
+
+    async def get_by_username(self, db: AsyncSession, *, username: str) -> Optional[User]:
+        return await self._first(db, select(User).filter(User.username == username))
+
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        hashed_password = await password_pool.hash_async(obj_in.password)
+        db_obj = User(
+            email=obj_in.email,
+            username=obj_in.username,
+            hashed_password=hashed_password,
+            full_name=obj_in.full_name,
+            phone_number=obj_in.phone_number,
+        )
+        db.add(db_obj)
+        await db.commit()
+        return db_obj
+
+    async def update(
+        self, db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if update_data.get("password"):
+            hashed_password = await password_pool.hash_async(update_data["password"])
+            del update_data["password"]
+            update_data["hashed_password"] = hashed_password
+        user = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        principal_cache.invalidate(user.id)
+        return user
+
+    async def remove(self, db: AsyncSession, *, id: int) -> User:
+        user = await super().remove(db, id=id)
+        principal_cache.invalidate(id)
+        return user
+
+    async def authenticate(
+        self, db: AsyncSession, *, email: str, password: str
+    ) -> Optional[User]:
+        user = await self.get_by_email(db, email=email)
+        if not user:
+            return None
+        valid, new_hash = await password_pool.verify_and_update_async(
+            password, user.hashed_password
+        )
+        if not valid:
+            return None
+        if new_hash:
+            # Hashed under an older work factor; upgrade it transparently
+            user.hashed_password = new_hash
+            await db.commit()
+            principal_cache.invalidate(user.id)
+        return user
+
+    def is_active(self, user: User) -> bool:
+        return user.is_active
+
+    def is_verified(self, user: User) -> bool:
+        return user.is_verified
+
+    def is_superuser(self, user: User) -> bool:
+        return bool(user.is_superuser)
+
+user = AsyncCRUDUser(User, UserSchema)
@@ -1,8 +1,15 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, desc, asc
+from sqlalchemy.orm import Session, undefer
+from sqlalchemy import or_, and_, desc, asc, insert
+from app.core.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.core.response_cache import response_cache
+from app.crud.batching import BatchLoader, order_by_ids
+from app.crud.loading import load_options
+from app.db.geo import Circle, within
+from app.db.search import apply_search
+from app.schemas.fields import FieldTree
 from app.models.base import Base
 
 # Explicitly define generic type variables
@@ -11,43 +18,156 @@ CreateSchemaType = TypeVar("CreateSchemaType")  # Type for creation schemas
 UpdateSchemaType = TypeVar("UpdateSchemaType")  # Type for update schemas
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+    # Response cache namespaces whose pages embed this model; writes
+    # through this CRUD object invalidate them
+    cache_namespaces: Tuple[str, ...] = ()
+    # Whether `get` goes through the session's BatchLoader, so a request
+    # that gets the same row repeatedly queries it once
+    batch_gets = False
+
+    def __init__(self, model: Type[ModelType], schema: Optional[Type[BaseModel]] = None):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
         **Parameters**
         * `model`: A SQLAlchemy model class
-        * `schema`: A Pydantic model (schema) class
+        * `schema`: A Pydantic model (schema) class, the response model rows
+          are serialized with; its nested models decide what is eager-loaded
         """
         self.model = model
+        self.schema = schema
 
-    def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
-
-    def get_multi(
+    def _query(
         self,
         db: Session,
+        model: Any = None,
+        schema: Any = None,
+        fields: Optional[FieldTree] = None,
+    ) -> Any:
+        model = model if model is not None else self.model
+        if schema is None and model is self.model:
+            schema = self.schema
+        query = db.query(model)
+        if schema is not None:
+            query = query.options(*load_options(model, schema, fields))
+        return query
+
+    def _invalidate_cache(self) -> None:
+        response_cache.invalidate(*self.cache_namespaces)
+
+    def _sort_key(self, model: Any, sort_by: Optional[str]) -> str:
+        if sort_by and sort_by in model.__table__.columns:
+            return sort_by
+        return "id"
+
+    def _paginate(
+        self,
+        query: Any,
         *,
+        model: Any = None,
         skip: int = 0,
         limit: int = 100,
-        filters: Optional[Dict] = None,
+        cursor: Optional[str] = None,
         sort_by: Optional[str] = None,
         order: Optional[str] = "asc",
-        search_query: Optional[str] = None,
-        search_fields: Optional[List[str]] = None
-    ) -> List[ModelType]:
-        query = db.query(self.model)
+        relevance: Any = None,
+    ) -> Any:
+        """
+        Order `query` by `(sort_by, id)` and page it. Without a cursor this is
+        plain offset paging; with one, rows are selected by keyset so deep
+        pages cost the same as the first one and `skip` is ignored.
+
+        A `relevance` ordering (from search) takes precedence when no
+        `sort_by` is given; ranked results are paged with `skip` only.
+        """
+        model = model if model is not None else self.model
+        if relevance is not None and not sort_by:
+            if cursor is not None:
+                raise InvalidCursor("Results ranked by relevance or distance are paged with skip")
+            return query.order_by(relevance, asc(model.id)).offset(skip).limit(limit)
+        key = self._sort_key(model, sort_by)
+        descending = order == "desc"
+        pk = model.id
+        pk_order = desc(pk) if descending else asc(pk)
+        if key == "id":
+            query = query.order_by(pk_order)
+        else:
+            column = getattr(model, key)
+            # next_cursor reads the sort column, which a `fields=` selection
+            # may have left out
+            query = query.options(undefer(column))
+            sort_column = desc(column) if descending else asc(column)
+            query = query.order_by(sort_column.nulls_last(), pk_order)
+
+        if cursor is None:
+            return query.offset(skip).limit(limit)
+
+        cursor_key, value, last_id = decode_cursor(cursor)
+        if cursor_key != key:
+            raise InvalidCursor("Pagination cursor does not match the sort order")
+        after = pk < last_id if descending else pk > last_id
+        if key == "id":
+            query = query.filter(after)
+        elif value is None:
+            # NULLs sort last, so only the remaining NULL rows are left
+            query = query.filter(column.is_(None), after)
+        else:
+            beyond = column < value if descending else column > value
+            query = query.filter(
+                or_(beyond, and_(column == value, after), column.is_(None))
+            )
+        return query.limit(limit)
+
+    def next_cursor(
+        self,
+        items: List[Any],
+        *,
+        limit: int,
+        sort_by: Optional[str] = None,
+        model: Any = None,
+    ) -> Optional[str]:
+        """
+        Cursor for the page following `items`, or None when it was the last one.
+        """
+        if not items or len(items) < limit:
+            return None
+        model = model if model is not None else self.model
+        key = self._sort_key(model, sort_by)
+        last = items[-1]
+        return encode_cursor(key, getattr(last, key), last.id)
+
+    def ranks_by_relevance(
+        self, search_query: Optional[str], sort_by: Optional[str] = None
+    ) -> bool:
+        """
+        Whether get_multi orders results by search relevance (and so hands
+        out no keyset cursor).
+        """
+        return bool(search_query) and not sort_by
 
-        # Apply search if provided
+    def _search(
+        self,
+        query: Any,
+        *,
+        dialect: str,
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+    ) -> Any:
+        # Returns the narrowed query and a relevance ordering, if any
         if search_query and search_fields:
-            search_filters = []
-            for field in search_fields:
-                if hasattr(self.model, field):
-                    search_filters.append(
-                        getattr(self.model, field).ilike(f"%{search_query}%")
-                    )
-            if search_filters:
-                query = query.filter(or_(*search_filters))
+            return apply_search(
+                query, self.model, dialect, search_query, search_fields
+            )
+        return query, None
 
+    def _nearby(self, query: Any, circle: Optional[Circle] = None) -> Tuple[Any, Any]:
+        # Returns the query narrowed to `circle` and a nearest-first
+        # ordering, if a circle was given
+        if circle is None:
+            return query, None
+        condition, nearest = within(self.model, circle)
+        return query.filter(condition), nearest
+
+    def _filter(self, query: Any, *, filters: Optional[Dict] = None) -> Any:
         # Apply filters if provided
         if filters:
             filter_conditions = []
@@ -55,11 +175,11 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 if value is not None:
                     if isinstance(value, dict):
                         # Handle range filters
-                        if "min" in value and hasattr(self.model, key):
+                        if value.get("min") is not None and hasattr(self.model, key):
                             filter_conditions.append(
                                 getattr(self.model, key) >= value["min"]
                             )
-                        if "max" in value and hasattr(self.model, key):
+                        if value.get("max") is not None and hasattr(self.model, key):
                             filter_conditions.append(
                                 getattr(self.model, key) <= value["max"]
                             )
@@ -67,26 +187,96 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                         filter_conditions.append(getattr(self.model, key) == value)
             if filter_conditions:
                 query = query.filter(and_(*filter_conditions))
+        return query
+
+    def get(self, db: Session, id: Any) -> Optional[ModelType]:
+        if self.batch_gets:
+            return BatchLoader.of(db, self).load(db, id)
+        return self._query(db).filter(self.model.id == id).first()
 
-        # Apply sorting if provided
-        if sort_by and hasattr(self.model, sort_by):
-            sort_column = getattr(self.model, sort_by)
-            if order == "desc":
-                sort_column = desc(sort_column)
-            else:
-                sort_column = asc(sort_column)
-            query = query.order_by(sort_column)
+    def get_many(
+        self, db: Session, ids: Sequence[Any], *, fields: Optional[FieldTree] = None
+    ) -> List[ModelType]:
+        """
+        The rows with the given ids, with one `IN` query, in the order of
+        `ids`; ids without a row are left out and repeated ones listed once.
+        """
+        if not ids:
+            return []
+        rows = self._query(db, fields=fields).filter(self.model.id.in_(ids)).all()
+        return order_by_ids(rows, ids)
+
+    def get_multi(
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        sort_by: Optional[str] = None,
+        order: Optional[str] = "asc",
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+        fields: Optional[FieldTree] = None,
+    ) -> List[ModelType]:
+        query, relevance = self._search(
+            self._query(db, fields=fields),
+            dialect=db.get_bind().dialect.name,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        query = self._filter(query, filters=filters)
 
-        return query.offset(skip).limit(limit).all()
+        # Apply sorting and pagination
+        query = self._paginate(
+            query,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort_by=sort_by,
+            order=order,
+            relevance=relevance,
+        )
+        return query.all()
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
+    def create_many(
+        self, db: Session, *, objs_in: List[Dict[str, Any]], model: Any = None
+    ) -> List[int]:
+        """
+        Insert `objs_in` in one transaction and return their ids in order.
+        Rows are sent as multi-row INSERT ... RETURNING statements, a page
+        of rows per round trip, and no ORM objects are built.
+        """
+        model = model if model is not None else self.model
+        if not objs_in:
+            return []
+        stmt, ordered = self._insert_many(model, db.get_bind().dialect.name)
+        try:
+            ids = db.scalars(stmt, objs_in).all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        self._invalidate_cache()
+        return list(ids) if ordered else sorted(ids)
+
+    def _insert_many(self, model: Any, dialect: str) -> Tuple[Any, bool]:
+        # SQLite can only keep RETURNING rows in parameter order by sending
+        # one row per statement. Its rowids are handed out in increasing
+        # order within the write transaction, so batch and sort instead.
+        ordered = dialect != "sqlite"
+        return insert(model).returning(model.id, sort_by_parameter_order=ordered), ordered
+
     def update(
         self,
         db: Session,
@@ -104,6 +294,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
@@ -111,4 +302,5 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
+        self._invalidate_cache()
         return obj 
\ No newline at end of file
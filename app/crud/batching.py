@@ -0,0 +1,53 @@
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Session.info key of the session's loaders, by CRUD object
+BATCH_LOADERS = "batch_loaders"
+
+
+def order_by_ids(rows: Sequence[Any], ids: Sequence[Any]) -> List[Any]:
+    """
+    `rows` in the order of `ids`, each once; ids without a row are skipped.
+    """
+    by_id = {row.id: row for row in rows}
+    return [by_id[id] for id in dict.fromkeys(ids) if id in by_id]
+
+
+class BatchLoader:
+    """
+    Loads the rows of one CRUD object by id for the length of a session,
+    i.e. of a request, DataLoader style: each id is queried at most once,
+    and `load_many` fetches all ids not loaded yet with a single `IN`
+    query. Ids without a row are remembered as missing too. Forgotten on
+    commit and rollback, after which rows may differ.
+    """
+
+    def __init__(self, crud: Any):
+        self.crud = crud
+        self.loaded: Dict[Any, Any] = {}
+
+    @classmethod
+    def of(cls, db: Any, crud: Any) -> "BatchLoader":
+        loaders = db.info.setdefault(BATCH_LOADERS, {})
+        if crud not in loaders:
+            loaders[crud] = cls(crud)
+        return loaders[crud]
+
+    def load_many(self, db: Session, ids: Sequence[Any]) -> List[Optional[Any]]:
+        missing = [id for id in dict.fromkeys(ids) if id not in self.loaded]
+        if missing:
+            self.loaded.update(dict.fromkeys(missing))
+            for row in self.crud.get_many(db, missing):
+                self.loaded[row.id] = row
+        return [self.loaded[id] for id in ids]
+
+    def load(self, db: Session, id: Any) -> Optional[Any]:
+        return self.load_many(db, [id])[0]
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _forget_loaded(session: Session) -> None:
+    session.info.pop(BATCH_LOADERS, None)
@@ -1,10 +1,17 @@
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.crud.base import CRUDBase
+from app.db.facets import Facet, column_facet, facet_counts, facet_statement
 from app.models.horse import Horse, HorseImage
-from app.schemas.horse import HorseCreate, HorseUpdate, HorseImageCreate
+from app.schemas.horse import Horse as HorseSchema
+from app.schemas.horse import HorseCreate, HorseUpdate, HorseImageCreate, HorseImageBulkCreate
+from app.schemas.fields import FieldTree
 
 class CRUDHorse(CRUDBase[Horse, HorseCreate, HorseUpdate]):
+    cache_namespaces = ("horses", "market", "rental")
+    batch_gets = True
+
     def create_with_owner(
         self, db: Session, *, obj_in: HorseCreate, owner_id: int
     ) -> Horse:
@@ -12,29 +19,100 @@ class CRUDHorse(CRUDBase[Horse, HorseCreate, HorseUpdate]):
         db_obj = Horse(**obj_in_data, owner_id=owner_id)
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
+    def create_many_with_owner(
+        self, db: Session, *, objs_in: List[HorseCreate], owner_id: int
+    ) -> List[int]:
+        return self.create_many(
+            db, objs_in=[{**obj_in.dict(), "owner_id": owner_id} for obj_in in objs_in]
+        )
+
+    def owned_ids(self, db: Session, *, owner_id: int, ids: Iterable[int]) -> Set[int]:
+        """
+        The subset of `ids` that are horses of `owner_id`.
+        """
+        return set(
+            db.scalars(
+                select(Horse.id).filter(Horse.owner_id == owner_id, Horse.id.in_(set(ids)))
+            )
+        )
+
+    def select_facets(
+        self,
+        *,
+        dialect: str,
+        filters: Optional[Dict] = None,
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+    ) -> Tuple[Any, List[Facet]]:
+        """
+        Statement counting the horses get_multi would page through with the
+        same filters and search, in total and by breed and gender (see
+        `facet_statement`), and its facets.
+        """
+        facets = [column_facet("breed", Horse.breed), column_facet("gender", Horse.gender)]
+        query, _ = self._search(
+            select(Horse.id),
+            dialect=dialect,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        return facet_statement(self._filter(query, filters=filters), facets), facets
+
+    def get_facets(
+        self,
+        db: Session,
+        *,
+        filters: Optional[Dict] = None,
+        search_query: Optional[str] = None,
+        search_fields: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        stmt, facets = self.select_facets(
+            dialect=db.get_bind().dialect.name,
+            filters=filters,
+            search_query=search_query,
+            search_fields=search_fields,
+        )
+        return facet_counts(db.execute(stmt).all(), facets)
+
     def get_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[Horse]:
-        return (
-            db.query(self.model)
-            .filter(Horse.owner_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = self._query(db, fields=fields).filter(Horse.owner_id == owner_id)
+        return self._paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def add_image(
-        self, db: Session, *, horse_id: int, image: HorseImageCreate
+        self,
+        db: Session,
+        *,
+        horse_id: int,
+        image: HorseImageCreate,
+        content_hash: Optional[str] = None,
     ) -> HorseImage:
-        db_obj = HorseImage(**image.dict(), horse_id=horse_id)
+        db_obj = HorseImage(**image.dict(), horse_id=horse_id, content_hash=content_hash)
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
+    def add_images(
+        self, db: Session, *, images: List[HorseImageBulkCreate]
+    ) -> List[int]:
+        return self.create_many(
+            db, objs_in=[image.dict() for image in images], model=HorseImage
+        )
+
     def get_images(self, db: Session, *, horse_id: int) -> List[HorseImage]:
         return db.query(HorseImage).filter(HorseImage.horse_id == horse_id).all()
 
@@ -45,4 +123,4 @@ class CRUDHorse(CRUDBase[Horse, HorseCreate, HorseUpdate]):
             .first()
         )
 
-horse = CRUDHorse(Horse) 
\ No newline at end of file
+horse = CRUDHorse(Horse, HorseSchema) 
\ No newline at end of file
@@ -1,10 +1,40 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
 from app.crud.base import CRUDBase
+from app.crud.crud_price_stats import price_stats
+from app.db.geo import Circle
+from app.db.facets import Facet, bucket_facet, column_facet, facet_counts, facet_statement
+from app.models.horse import Horse
 from app.models.market import MarketListing, Transaction, ListingStatus
+from app.schemas.market import MarketListing as MarketListingSchema
+from app.schemas.market import Transaction as TransactionSchema
 from app.schemas.market import MarketListingCreate, MarketListingUpdate, TransactionCreate
+from app.schemas.fields import FieldTree
+
+class ListingUnavailable(Exception):
+    """
+    The listing was sold or withdrawn before the purchase went through.
+    """
+
+def claim_listing(listing_id: int) -> Any:
+    """
+    `UPDATE ... SET status = 'SOLD' WHERE id = ? AND status = 'ACTIVE'`:
+    of any number of concurrent buyers exactly one matches the row, the
+    others (on Postgres after waiting for its row lock, on SQLite for the
+    write lock) find it sold and update nothing. Bumps the version, so
+    edits of the listing read before the sale fail.
+    """
+    return (
+        update(MarketListing)
+        .where(MarketListing.id == listing_id, MarketListing.status == ListingStatus.ACTIVE)
+        .values(status=ListingStatus.SOLD, version=MarketListing.version + 1)
+    )
 
 class CRUDMarketListing(CRUDBase[MarketListing, MarketListingCreate, MarketListingUpdate]):
+    cache_namespaces = ("market",)
+
     def create_with_seller(
         self, db: Session, *, obj_in: MarketListingCreate, seller_id: int
     ) -> MarketListing:
@@ -12,55 +42,166 @@ class CRUDMarketListing(CRUDBase[MarketListing, MarketListingCreate, MarketListi
         db_obj = MarketListing(**obj_in_data, seller_id=seller_id)
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
+    def create_many_with_seller(
+        self, db: Session, *, objs_in: List[MarketListingCreate], seller_id: int
+    ) -> List[int]:
+        return self.create_many(
+            db, objs_in=[{**obj_in.dict(), "seller_id": seller_id} for obj_in in objs_in]
+        )
+
     def get_by_seller(
-        self, db: Session, *, seller_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        seller_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[MarketListing]:
-        return (
-            db.query(self.model)
-            .filter(MarketListing.seller_id == seller_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = self._query(db, fields=fields).filter(MarketListing.seller_id == seller_id)
+        return self._paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
     def get_active_listings(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        circle: Optional[Circle] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[MarketListing]:
-        return (
-            db.query(self.model)
-            .filter(MarketListing.status == ListingStatus.ACTIVE)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        """
+        Active listings, nearest first when limited to a `circle`.
+        """
+        query, nearest = self._nearby(
+            self._query(db, fields=fields).filter(MarketListing.status == ListingStatus.ACTIVE),
+            circle,
+        )
+        return self._paginate(
+            query, skip=skip, limit=limit, cursor=cursor, relevance=nearest
+        ).all()
+
+    def select_listings(
+        self, *, filters: Optional[Dict] = None, location: Optional[str] = None
+    ) -> Any:
+        """
+        Flat SELECT of listing columns for export, in id order.
+        """
+        stmt = self._filter(select(*MarketListing.__table__.c), filters=filters)
+        if location:
+            stmt = stmt.filter(MarketListing.location.ilike(f"%{location}%"))
+        return stmt.order_by(MarketListing.id)
+
+    def select_facets(
+        self, *, filters: Optional[Dict] = None, location: Optional[str] = None
+    ) -> Tuple[Any, List[Facet]]:
+        """
+        Statement counting the listings matching `filters` and `location`,
+        in total and by horse breed and gender, location, price bucket and
+        negotiability (see `facet_statement`), and its facets.
+        """
+        facets = [
+            column_facet("breed", Horse.breed),
+            column_facet("gender", Horse.gender),
+            column_facet("location", MarketListing.location),
+            bucket_facet("price", MarketListing.price, settings.FACET_PRICE_BUCKETS),
+            column_facet("is_negotiable", MarketListing.is_negotiable),
+        ]
+        stmt = self._filter(
+            select(MarketListing.id).join(Horse, Horse.id == MarketListing.horse_id),
+            filters=filters,
         )
+        if location:
+            stmt = stmt.filter(MarketListing.location.ilike(f"%{location}%"))
+        return facet_statement(stmt, facets), facets
+
+    def get_facets(
+        self, db: Session, *, filters: Optional[Dict] = None, location: Optional[str] = None
+    ) -> Dict[str, Any]:
+        stmt, facets = self.select_facets(filters=filters, location=location)
+        return facet_counts(db.execute(stmt).all(), facets)
+
+    def select_transactions_by_buyer(
+        self,
+        *,
+        buyer_id: int,
+        filters: Optional[Dict] = None,
+        location: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> Any:
+        """
+        Flat SELECT of the buyer's transactions for export, in id order.
+        `min_price`/`max_price` bound the final price; `filters` and
+        `location` apply to the purchased listing.
+        """
+        stmt = select(*Transaction.__table__.c).filter(Transaction.buyer_id == buyer_id)
+        if min_price is not None:
+            stmt = stmt.filter(Transaction.final_price >= min_price)
+        if max_price is not None:
+            stmt = stmt.filter(Transaction.final_price <= max_price)
+        if filters or location:
+            stmt = stmt.join(MarketListing, MarketListing.id == Transaction.listing_id)
+            stmt = self._filter(stmt, filters=filters)
+            if location:
+                stmt = stmt.filter(MarketListing.location.ilike(f"%{location}%"))
+        return stmt.order_by(Transaction.id)
 
     def create_transaction(
         self, db: Session, *, obj_in: TransactionCreate
     ) -> Transaction:
+        """
+        Sell the listing and record the transaction, or raise
+        ListingUnavailable if it is no longer active.
+        """
+        # Claim the listing first, which holds it until commit
+        if not db.execute(claim_listing(obj_in.listing_id)).rowcount:
+            db.rollback()
+            raise ListingUnavailable("Listing is no longer for sale")
         db_obj = Transaction(**obj_in.dict())
         db.add(db_obj)
-        
-        # Update listing status
-        listing = db.query(MarketListing).filter(MarketListing.id == obj_in.listing_id).first()
-        if listing:
-            listing.status = ListingStatus.SOLD
-        
+        # Assigns its id, which picks the price stats shard
+        db.flush()
+
+        listing = (
+            db.query(MarketListing)
+            .options(joinedload(MarketListing.horse))
+            .filter(MarketListing.id == obj_in.listing_id)
+            .first()
+        )
+        price_stats.record_sale(
+            db,
+            sale_id=db_obj.id,
+            price=db_obj.final_price,
+            breed=listing.horse.breed,
+            location=listing.location,
+            age=listing.horse.age,
+        )
+
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
     def get_transactions_by_buyer(
-        self, db: Session, *, buyer_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        buyer_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[Transaction]:
-        return (
-            db.query(Transaction)
-            .filter(Transaction.buyer_id == buyer_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = self._query(db, Transaction, TransactionSchema, fields).filter(Transaction.buyer_id == buyer_id)
+        return self._paginate(
+            query, model=Transaction, skip=skip, limit=limit, cursor=cursor
+        ).all()
 
-market = CRUDMarketListing(MarketListing) 
\ No newline at end of file
+market = CRUDMarketListing(MarketListing, MarketListingSchema) 
\ No newline at end of file
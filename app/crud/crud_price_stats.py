@@ -0,0 +1,250 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import and_, delete, insert, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.sketch import QuantileSketch
+from app.models.horse import Horse, HorseBreed
+from app.models.market import MarketListing, PriceStatistic, Transaction
+
+Group = Tuple[str, str]  # (dimension, key)
+
+# Percentiles reported for every group
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def age_band(age: int) -> str:
+    lower = 0
+    for upper in settings.PRICE_STATS_AGE_BANDS:
+        if age < upper:
+            return f"{lower}-{upper - 1}"
+        lower = upper
+    return f"{lower}+"
+
+
+def price_groups(
+    breed: Optional[HorseBreed], location: Optional[str], age: Optional[int]
+) -> List[Group]:
+    """
+    The groups a sale of a horse with these attributes counts towards:
+    all sales, and its breed, location (case-insensitively) and age band.
+    """
+    groups = [("all", "")]
+    if breed is not None:
+        groups.append(("breed", breed.value))
+    if location and location.strip():
+        groups.append(("location", location.strip().casefold()))
+    if age is not None:
+        groups.append(("age_band", age_band(age)))
+    return groups
+
+
+class _Summary:
+    # The statistics of one group while they're being updated
+    def __init__(self, row: Optional[PriceStatistic] = None):
+        self.count = row.count if row is not None else 0
+        self.total = row.total if row is not None else 0.0
+        self.min_price = row.min_price if row is not None else None
+        self.max_price = row.max_price if row is not None else None
+        self.sketch = QuantileSketch.from_dict(
+            settings.PRICE_STATS_RELATIVE_ACCURACY, row.sketch if row is not None else None
+        )
+
+    def merge(self, row: PriceStatistic) -> None:
+        # Another shard of the same group
+        other = _Summary(row)
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min_price = other.min_price if self.min_price is None else min(self.min_price, other.min_price)
+        self.max_price = other.max_price if self.max_price is None else max(self.max_price, other.max_price)
+        self.sketch.merge(other.sketch)
+
+    def add(self, price: float) -> None:
+        self.count += 1
+        self.total += price
+        self.min_price = price if self.min_price is None else min(self.min_price, price)
+        self.max_price = price if self.max_price is None else max(self.max_price, price)
+        self.sketch.add(price)
+
+    def values(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min_price": self.min_price,
+            "max_price": self.max_price,
+            "sketch": self.sketch.to_dict(),
+        }
+
+
+def merge_shards(rows: Iterable[PriceStatistic]) -> Dict[Group, _Summary]:
+    """
+    The statistics of each group the rows are shards of.
+    """
+    summaries: Dict[Group, _Summary] = {}
+    for row in rows:
+        group = (row.dimension, row.key)
+        if group in summaries:
+            summaries[group].merge(row)
+        else:
+            summaries[group] = _Summary(row)
+    return summaries
+
+
+def summarize(group: Group, summary: Optional[_Summary]) -> Dict[str, Any]:
+    """
+    What the API reports for `group`: count, mean, min, max and
+    percentiles, the latter within PRICE_STATS_RELATIVE_ACCURACY.
+    """
+    dimension, key = group
+    stats: Dict[str, Any] = {"dimension": dimension, "key": key, "count": 0}
+    if summary is None or not summary.count:
+        return stats
+    stats.update(
+        count=summary.count,
+        mean=round(summary.total / summary.count, 2),
+        min=summary.min_price,
+        max=summary.max_price,
+    )
+    for percentile in PERCENTILES:
+        # The sketch only knows values to within its accuracy; keep
+        # estimates inside the exact range
+        value = summary.sketch.quantile(percentile / 100)
+        value = min(max(value, summary.min_price), summary.max_price)
+        stats[f"p{percentile}"] = round(value, 2)
+    return stats
+
+
+class CRUDPriceStatistics:
+    """
+    Sale price statistics per group of sales (see `price_groups`), in up
+    to PRICE_STATS_SHARDS `price_statistics` rows each. `record_sale`
+    updates one of them in the transaction that records a sale, so reading
+    them costs the same whatever the number of transactions, and sales
+    only contend for a group's row when they land in the same shard;
+    `rebuild` recomputes them all.
+    """
+
+    def _select(self, groups: Sequence[Group], shard: Optional[int] = None) -> Any:
+        # All shards of the groups unless one is given
+        stmt = select(PriceStatistic).filter(
+            or_(*(
+                and_(PriceStatistic.dimension == dimension, PriceStatistic.key == key)
+                for dimension, key in groups
+            ))
+        )
+        if shard is not None:
+            stmt = stmt.filter(PriceStatistic.shard == shard)
+        return stmt
+
+    def _shard(self, sale_id: int) -> int:
+        return sale_id % settings.PRICE_STATS_SHARDS
+
+    def _insert_missing(self, dialect: str, groups: Sequence[Group], shard: int) -> Any:
+        # Rows for groups without a sale in the shard yet; a concurrent
+        # first sale of the same group and shard may insert it too, which
+        # is fine
+        empty = _Summary().values()
+        values = [
+            {"dimension": dimension, "key": key, "shard": shard, **empty}
+            for dimension, key in groups
+        ]
+        if dialect == "postgresql":
+            return postgresql.insert(PriceStatistic).values(values).on_conflict_do_nothing()
+        if dialect == "sqlite":
+            return sqlite.insert(PriceStatistic).values(values).on_conflict_do_nothing()
+        return insert(PriceStatistic).values(values)
+
+    def _rows(self, db: Session, groups: Sequence[Group], shard: int) -> Dict[Group, PriceStatistic]:
+        # The groups' rows in one shard, locked
+        stmt = self._select(groups, shard).with_for_update()
+        return {(row.dimension, row.key): row for row in db.scalars(stmt)}
+
+    def _count_sale(self, rows: Dict[Group, PriceStatistic], groups: Sequence[Group], price: float) -> None:
+        for group in groups:
+            row = rows[group]
+            summary = _Summary(row)
+            summary.add(price)
+            for name, value in summary.values().items():
+                setattr(row, name, value)
+
+    def record_sale(
+        self,
+        db: Session,
+        *,
+        sale_id: int,
+        price: float,
+        breed: Optional[HorseBreed],
+        location: Optional[str],
+        age: Optional[int],
+    ) -> None:
+        """
+        Count sale `sale_id` (its transaction's id) towards the statistics
+        of its groups, in the shard the id picks. Those rows stay locked
+        until the caller commits, so concurrent sales in the same shard
+        can't overwrite each other's updates; sales in other shards don't
+        wait for them.
+        """
+        groups = price_groups(breed, location, age)
+        shard = self._shard(sale_id)
+        rows = self._rows(db, groups, shard)
+        missing = [group for group in groups if group not in rows]
+        if missing:
+            db.execute(self._insert_missing(db.get_bind().dialect.name, missing, shard))
+            rows = self._rows(db, groups, shard)
+        self._count_sale(rows, groups, price)
+
+    def get_stats(
+        self,
+        db: Session,
+        *,
+        breed: Optional[HorseBreed] = None,
+        location: Optional[str] = None,
+        age: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Statistics of all sales and of those of the given breed, location
+        and age band, in that order.
+        """
+        groups = price_groups(breed, location, age)
+        summaries = merge_shards(db.scalars(self._select(groups)))
+        return [summarize(group, summaries.get(group)) for group in groups]
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Recompute every group from the transactions table, into shard 0,
+        and commit; returns the number of sales counted. Sales recorded
+        meanwhile wait for it to finish.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text(f"LOCK TABLE {PriceStatistic.__tablename__} IN EXCLUSIVE MODE"))
+        # On SQLite this takes the write lock before the scan
+        db.execute(delete(PriceStatistic))
+        sales = (
+            select(Transaction.final_price, Horse.breed, MarketListing.location, Horse.age)
+            .join(MarketListing, MarketListing.id == Transaction.listing_id)
+            .join(Horse, Horse.id == MarketListing.horse_id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        summaries: Dict[Group, _Summary] = {}
+        counted = 0
+        for price, breed, location, age in db.execute(sales):
+            for group in price_groups(breed, location, age):
+                if group not in summaries:
+                    summaries[group] = _Summary()
+                summaries[group].add(price)
+            counted += 1
+        if summaries:
+            db.execute(
+                insert(PriceStatistic),
+                [
+                    {"dimension": dimension, "key": key, **summary.values()}
+                    for (dimension, key), summary in summaries.items()
+                ],
+            )
+        db.commit()
+        return counted
+
+
+price_stats = CRUDPriceStatistics()
@@ -1,15 +1,180 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import and_, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
 from app.crud.base import CRUDBase
-from app.models.rental import RentalListing, RentalBooking, RentalStatus, BookingStatus
+from app.db.geo import Circle
+from app.models.rental import (
+    RentalListing,
+    RentalBooking,
+    RentalDuration,
+    RentalStatus,
+    BookingStatus,
+    BLOCKING_BOOKING_STATUSES,
+    BOOKING_OVERLAP_CONSTRAINT,
+)
 from app.schemas.rental import (
+    RentalListing as RentalListingSchema,
+    RentalBooking as RentalBookingSchema,
     RentalListingCreate,
     RentalListingUpdate,
     RentalBookingCreate,
     RentalBookingUpdate,
 )
+from app.schemas.fields import FieldTree
+
+def booking_price(listing: RentalListing, duration_type: RentalDuration) -> float:
+    if duration_type.value == "Hourly" and listing.price_per_hour:
+        return listing.price_per_hour
+    elif duration_type.value == "Daily" and listing.price_per_day:
+        return listing.price_per_day
+    elif duration_type.value == "Weekly" and listing.price_per_week:
+        return listing.price_per_week
+    elif duration_type.value == "Monthly" and listing.price_per_month:
+        return listing.price_per_month
+    raise ValueError(f"Price not available for {duration_type.value} rentals")
+
+class BookingConflict(Exception):
+    """
+    The requested dates overlap another active booking of the listing.
+    """
+
+def overlapping_bookings(
+    dialect: str,
+    listing_id: Any,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    exclude_id: Optional[int] = None,
+    bookings: Any = RentalBooking,
+) -> Any:
+    """
+    Condition matching active `bookings` (the model or an alias of it) of
+    `listing_id` (a value or a column, for correlated use) that overlap
+    `[start, end)`. A missing bound is open-ended.
+
+    On Postgres this is written as a `tsrange &&` test so it is answered by
+    the GiST exclusion constraint's index; elsewhere it is a plain range
+    comparison served by `ix_rental_bookings_listing_period`.
+    """
+    conditions = [
+        bookings.rental_listing_id == listing_id,
+        bookings.status.in_(BLOCKING_BOOKING_STATUSES),
+    ]
+    if dialect == "postgresql":
+        booked = func.tsrange(bookings.start_date, bookings.end_date)
+        conditions.append(booked.op("&&")(func.tsrange(start, end)))
+    else:
+        if end is not None:
+            conditions.append(bookings.start_date < end)
+        if start is not None:
+            conditions.append(bookings.end_date > start)
+    if exclude_id is not None:
+        conditions.append(bookings.id != exclude_id)
+    return and_(*conditions)
+
+def insert_booking(dialect: str, values: Dict[str, Any], listing_version: int) -> Any:
+    """
+    `INSERT ... SELECT ... WHERE NOT EXISTS (<overlap>) RETURNING id`: the
+    check and the write are one statement, so it returns no row instead of
+    racing a concurrent booking for the same dates. Nor does it insert once
+    the listing has moved past `listing_version`, i.e. when the booking was
+    priced from a listing that has changed since.
+    """
+    columns = RentalBooking.__table__.c
+    row = select(
+        *(literal(value, columns[key].type).label(key) for key, value in values.items())
+    ).where(
+        exists().where(
+            RentalListing.id == values["rental_listing_id"],
+            RentalListing.version == listing_version,
+        ),
+        ~exists().where(
+            overlapping_bookings(
+                dialect, values["rental_listing_id"], values["start_date"], values["end_date"]
+            )
+        )
+    )
+    return insert(RentalBooking).from_select(list(values), row).returning(RentalBooking.id)
+
+def update_booking(
+    dialect: str,
+    db_obj: RentalBooking,
+    update_data: Dict[str, Any],
+    period: Tuple[datetime, datetime, BookingStatus],
+) -> Any:
+    """
+    `UPDATE ... WHERE id = ? AND NOT EXISTS (<overlap>)` when the booking
+    will block its dates, so like `insert_booking` the check and the write
+    are one statement and it updates no row instead of racing a concurrent
+    change to the same dates.
+    """
+    start, end, status = period
+    values = {
+        key: value for key, value in update_data.items()
+        if key in RentalBooking.__table__.c
+    }
+    stmt = update(RentalBooking).where(RentalBooking.id == db_obj.id).values(**values)
+    if status in BLOCKING_BOOKING_STATUSES:
+        # Aliased, or the subquery would correlate to the updated row
+        others = aliased(RentalBooking)
+        stmt = stmt.where(
+            ~exists().where(
+                overlapping_bookings(
+                    dialect, db_obj.rental_listing_id, start, end,
+                    exclude_id=db_obj.id, bookings=others,
+                )
+            )
+        )
+    # The row is refreshed after the commit instead
+    return stmt.execution_options(synchronize_session=False)
+
+def is_overlap_violation(exc: IntegrityError) -> bool:
+    return BOOKING_OVERLAP_CONSTRAINT in str(exc.orig)
+
+def booking_period(
+    db_obj: RentalBooking, update_data: Dict[str, Any]
+) -> Tuple[datetime, datetime, BookingStatus]:
+    """
+    The `(start, end, status)` a booking will have once `update_data` is
+    applied; raises ValueError for an empty or inverted range.
+    """
+    start = update_data.get("start_date") or db_obj.start_date
+    end = update_data.get("end_date") or db_obj.end_date
+    status = update_data.get("status") or db_obj.status
+    if end <= start:
+        raise ValueError("Booking must end after it starts")
+    return start, end, status
+
+def filter_available(
+    query: Any,
+    *,
+    dialect: str,
+    available_from: Optional[datetime] = None,
+    available_to: Optional[datetime] = None,
+    duration_type: Optional[RentalDuration] = None,
+    location: Optional[str] = None,
+) -> Any:
+    """
+    Restrict a listing query to listings with no active booking overlapping
+    `[available_from, available_to)` that offer `duration_type`.
+    """
+    if available_from is not None or available_to is not None:
+        query = query.filter(
+            ~exists().where(
+                overlapping_bookings(dialect, RentalListing.id, available_from, available_to)
+            )
+        )
+    if duration_type is not None:
+        query = query.filter(RentalListing.available_durations.contains(duration_type.value))
+    if location:
+        query = query.filter(RentalListing.location.ilike(f"%{location}%"))
+    return query
 
 class CRUDRentalListing(CRUDBase[RentalListing, RentalListingCreate, RentalListingUpdate]):
+    cache_namespaces = ("rental",)
+
     def create_with_owner(
         self, db: Session, *, obj_in: RentalListingCreate, owner_id: int
     ) -> RentalListing:
@@ -17,91 +182,218 @@ class CRUDRentalListing(CRUDBase[RentalListing, RentalListingCreate, RentalListi
         db_obj = RentalListing(**obj_in_data, owner_id=owner_id)
         db.add(db_obj)
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
+    def create_many_with_owner(
+        self, db: Session, *, objs_in: List[RentalListingCreate], owner_id: int
+    ) -> List[int]:
+        return self.create_many(
+            db, objs_in=[{**obj_in.dict(), "owner_id": owner_id} for obj_in in objs_in]
+        )
+
     def get_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[RentalListing]:
-        return (
-            db.query(self.model)
-            .filter(RentalListing.owner_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        query = self._query(db, fields=fields).filter(RentalListing.owner_id == owner_id)
+        return self._paginate(query, skip=skip, limit=limit, cursor=cursor).all()
+
+    def select_available(
+        self,
+        *,
+        dialect: str,
+        filters: Optional[Dict] = None,
+        available_from: Optional[datetime] = None,
+        available_to: Optional[datetime] = None,
+        duration_type: Optional[RentalDuration] = None,
+        location: Optional[str] = None,
+    ) -> Any:
+        """
+        Flat SELECT for export of the listings `get_available_listings`
+        returns, in id order.
+        """
+        stmt = select(*RentalListing.__table__.c).filter(
+            RentalListing.status == RentalStatus.AVAILABLE
+        )
+        stmt = filter_available(
+            self._filter(stmt, filters=filters),
+            dialect=dialect,
+            available_from=available_from,
+            available_to=available_to,
+            duration_type=duration_type,
+            location=location,
         )
+        return stmt.order_by(RentalListing.id)
 
     def get_available_listings(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[Dict] = None,
+        available_from: Optional[datetime] = None,
+        available_to: Optional[datetime] = None,
+        duration_type: Optional[RentalDuration] = None,
+        location: Optional[str] = None,
+        circle: Optional[Circle] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[RentalListing]:
-        return (
-            db.query(self.model)
-            .filter(RentalListing.status == RentalStatus.AVAILABLE)
-            .offset(skip)
-            .limit(limit)
-            .all()
+        """
+        Available listings, nearest first when limited to a `circle`.
+        """
+        query, nearest = self._nearby(
+            self._query(db, fields=fields).filter(RentalListing.status == RentalStatus.AVAILABLE),
+            circle,
         )
+        query = filter_available(
+            self._filter(query, filters=filters),
+            dialect=db.get_bind().dialect.name,
+            available_from=available_from,
+            available_to=available_to,
+            duration_type=duration_type,
+            location=location,
+        )
+        return self._paginate(
+            query, skip=skip, limit=limit, cursor=cursor, relevance=nearest
+        ).all()
 
 class CRUDRentalBooking(CRUDBase[RentalBooking, RentalBookingCreate, RentalBookingUpdate]):
+    cache_namespaces = ("rental",)
+
     def create_with_renter(
         self, db: Session, *, obj_in: RentalBookingCreate, renter_id: int
     ) -> RentalBooking:
-        # Get the rental listing to calculate total price
-        listing = db.query(RentalListing).filter(RentalListing.id == obj_in.rental_listing_id).first()
-        if not listing:
-            raise ValueError("Rental listing not found")
-
-        # Calculate total price based on duration type
-        duration_type = obj_in.duration_type
-        if duration_type.value == "Hourly" and listing.price_per_hour:
-            total_price = listing.price_per_hour
-        elif duration_type.value == "Daily" and listing.price_per_day:
-            total_price = listing.price_per_day
-        elif duration_type.value == "Weekly" and listing.price_per_week:
-            total_price = listing.price_per_week
-        elif duration_type.value == "Monthly" and listing.price_per_month:
-            total_price = listing.price_per_month
-        else:
-            raise ValueError(f"Price not available for {duration_type.value} rentals")
-
-        # Create booking
-        obj_in_data = obj_in.dict()
-        db_obj = RentalBooking(
-            **obj_in_data,
-            renter_id=renter_id,
-            total_price=total_price,
-            status=BookingStatus.PENDING
-        )
-        db.add(db_obj)
-        
-        # Update listing status
-        listing.status = RentalStatus.BOOKED
-        
+        if obj_in.end_date <= obj_in.start_date:
+            raise ValueError("Booking must end after it starts")
+
+        for _ in range(settings.BOOKING_RETRIES + 1):
+            # Get the rental listing to calculate total price
+            listing = db.query(RentalListing).filter(RentalListing.id == obj_in.rental_listing_id).first()
+            if not listing:
+                raise ValueError("Rental listing not found")
+            version = listing.version
+
+            # Calculate total price based on duration type
+            total_price = booking_price(listing, obj_in.duration_type)
+
+            # Create booking unless the dates are already taken
+            values = {
+                **obj_in.dict(),
+                "renter_id": renter_id,
+                "total_price": total_price,
+                "status": BookingStatus.PENDING,
+            }
+            try:
+                booking_id = db.execute(
+                    insert_booking(db.get_bind().dialect.name, values, version)
+                ).scalar()
+            except IntegrityError as e:
+                db.rollback()
+                if is_overlap_violation(e):
+                    raise BookingConflict("Listing is already booked for these dates") from e
+                raise
+            if booking_id is not None:
+                db.commit()
+                self._invalidate_cache()
+                return self.get(db, booking_id)
+            db.rollback()
+            # Only a listing changed since it was read is worth pricing again
+            current = db.scalar(
+                select(RentalListing.version).filter(RentalListing.id == obj_in.rental_listing_id)
+            )
+            if current == version:
+                raise BookingConflict("Listing is already booked for these dates")
+        raise BookingConflict("Listing kept changing while booking it, try again")
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: RentalBooking,
+        obj_in: Union[RentalBookingUpdate, Dict[str, Any]]
+    ) -> RentalBooking:
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        period = booking_period(db_obj, update_data)
+        try:
+            updated = db.execute(
+                update_booking(db.get_bind().dialect.name, db_obj, update_data, period)
+            ).rowcount
+        except IntegrityError as e:
+            db.rollback()
+            if is_overlap_violation(e):
+                raise BookingConflict("Listing is already booked for these dates") from e
+            raise
+        if not updated:
+            db.rollback()
+            raise BookingConflict("Listing is already booked for these dates")
         db.commit()
+        self._invalidate_cache()
         db.refresh(db_obj)
         return db_obj
 
     def get_by_renter(
-        self, db: Session, *, renter_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        renter_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        fields: Optional[FieldTree] = None,
     ) -> List[RentalBooking]:
-        return (
-            db.query(self.model)
-            .filter(RentalBooking.renter_id == renter_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = self._query(db, fields=fields).filter(RentalBooking.renter_id == renter_id)
+        return self._paginate(query, skip=skip, limit=limit, cursor=cursor).all()
+
+    def select_by_renter(
+        self,
+        *,
+        renter_id: int,
+        filters: Optional[Dict] = None,
+        available_from: Optional[datetime] = None,
+        available_to: Optional[datetime] = None,
+        duration_type: Optional[RentalDuration] = None,
+        location: Optional[str] = None,
+    ) -> Any:
+        """
+        Flat SELECT of the renter's bookings for export, in id order: those
+        overlapping `[available_from, available_to)` when given. `filters`
+        and `location` apply to the booked listing.
+        """
+        stmt = select(*RentalBooking.__table__.c).filter(RentalBooking.renter_id == renter_id)
+        if available_from is not None:
+            stmt = stmt.filter(RentalBooking.end_date > available_from)
+        if available_to is not None:
+            stmt = stmt.filter(RentalBooking.start_date < available_to)
+        if duration_type is not None:
+            stmt = stmt.filter(RentalBooking.duration_type == duration_type)
+        if filters or location:
+            stmt = stmt.join(RentalListing, RentalListing.id == RentalBooking.rental_listing_id)
+            stmt = rental_listing._filter(stmt, filters=filters)
+            if location:
+                stmt = stmt.filter(RentalListing.location.ilike(f"%{location}%"))
+        return stmt.order_by(RentalBooking.id)
 
     def get_by_listing(
-        self, db: Session, *, listing_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        listing_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
     ) -> List[RentalBooking]:
-        return (
-            db.query(self.model)
-            .filter(RentalBooking.rental_listing_id == listing_id)
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        query = self._query(db).filter(RentalBooking.rental_listing_id == listing_id)
+        return self._paginate(query, skip=skip, limit=limit, cursor=cursor).all()
 
-rental_listing = CRUDRentalListing(RentalListing)
-rental_booking = CRUDRentalBooking(RentalBooking) 
\ No newline at end of file
+rental_listing = CRUDRentalListing(RentalListing, RentalListingSchema)
+rental_booking = CRUDRentalBooking(RentalBooking, RentalBookingSchema) 
\ No newline at end of file
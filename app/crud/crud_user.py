@@ -1,11 +1,17 @@
 from typing import Any, Dict, Optional, Union
 from sqlalchemy.orm import Session
-from app.core.security import get_password_hash, verify_password
+from app.core.password_pool import password_pool
+from app.core.principal_cache import principal_cache
 from app.crud.base import CRUDBase
 from app.models.user import User
+from app.schemas.user import User as UserSchema
 from app.schemas.user import UserCreate, UserUpdate
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    # Listing pages embed the seller/owner
+    cache_namespaces = ("market", "rental")
+    batch_gets = True
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
@@ -16,7 +22,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db_obj = User(
             email=obj_in.email,
             username=obj_in.username,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=password_pool.hash(obj_in.password),
             full_name=obj_in.full_name,
             phone_number=obj_in.phone_number,
         )
@@ -33,17 +39,33 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.dict(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data["password"])
+            hashed_password = password_pool.hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        principal_cache.invalidate(user.id)
+        return user
+
+    def remove(self, db: Session, *, id: int) -> User:
+        user = super().remove(db, id=id)
+        principal_cache.invalidate(id)
+        return user
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = password_pool.verify_and_update(
+            password, user.hashed_password
+        )
+        if not valid:
             return None
+        if new_hash:
+            # Hashed under an older work factor; upgrade it transparently
+            user.hashed_password = new_hash
+            db.add(user)
+            db.commit()
+            principal_cache.invalidate(user.id)
         return user
 
     def is_active(self, user: User) -> bool:
@@ -52,4 +74,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def is_verified(self, user: User) -> bool:
         return user.is_verified
 
-user = CRUDUser(User) 
\ No newline at end of file
+    def is_superuser(self, user: User) -> bool:
+        return bool(user.is_superuser)
+
+user = CRUDUser(User, UserSchema) 
\ No newline at end of file
@@ -0,0 +1,72 @@
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from app.schemas.fields import FieldTree, nested_schema
+
+
+def _columns(model: Any, fields: Optional[FieldTree]) -> Optional[List[Any]]:
+    # Column attributes to load for a `fields=` selection, the primary key
+    # always among them; None loads them all
+    if fields is None:
+        return None
+    mapper = inspect(model)
+    names = [column.key for column in mapper.primary_key]
+    names += [name for name, _ in fields if name in mapper.column_attrs and name not in names]
+    return [getattr(model, name) for name in names]
+
+
+def _relationship_options(
+    model: Any, schema: Type[BaseModel], fields: Optional[FieldTree] = None
+) -> Tuple[Any, ...]:
+    relationships = inspect(model).relationships
+    selected = None if fields is None else dict(fields)
+    options = []
+    for name, field in schema.model_fields.items():
+        if name not in relationships:
+            continue
+        if selected is not None and name not in selected:
+            continue
+        nested = nested_schema(field.annotation)
+        if nested is None:
+            continue
+        rel = relationships[name]
+        attr = getattr(model, name)
+        nested_fields = None if selected is None else selected[name]
+        # Collections get one extra SELECT ... IN per level; many-to-one
+        # targets ride along in the parent query as a LEFT OUTER JOIN.
+        loader = selectinload(attr) if rel.uselist else joinedload(attr)
+        columns = _columns(rel.mapper.class_, nested_fields)
+        if columns is not None:
+            loader = loader.load_only(*columns)
+        children = _relationship_options(rel.mapper.class_, nested, nested_fields)
+        if children:
+            loader = loader.options(*children)
+        options.append(loader)
+    return tuple(options)
+
+
+@lru_cache(maxsize=256)
+def load_options(
+    model: Any, schema: Type[BaseModel], fields: Optional[FieldTree] = None
+) -> Tuple[Any, ...]:
+    """
+    Loader options that eagerly fetch every relationship `schema` nests,
+    recursively, so serializing the result never triggers a lazy load.
+
+    E.g. for `schemas.RentalBooking` this joins `rental_listing`,
+    `rental_listing.horse`, `rental_listing.owner` and `renter` into the
+    main query and fetches `rental_listing.horse.images` with one
+    `SELECT ... IN`, whatever the page size.
+
+    With a `fields=` selection only the selected relationships are loaded
+    and every entity only its selected columns (plus its primary key).
+    """
+    options = _relationship_options(model, schema, fields)
+    columns = _columns(model, fields)
+    if columns is not None:
+        options = (load_only(*columns),) + options
+    return options
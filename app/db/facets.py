@@ -0,0 +1,110 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import Boolean, Enum, String, case, cast, func, literal, null, select, union_all
+
+from app.core.config import settings
+
+
+class Facet(NamedTuple):
+    name: str
+    # String-typed SQL expression to group by, so all facets share the
+    # result columns of one UNION
+    expression: Any
+    # Turns a grouped value back into what the API reports
+    decode: Optional[Callable[[str], Any]] = None
+    # (min, max) bounds per value, for range facets such as price buckets
+    bounds: Optional[Dict[str, tuple]] = None
+
+
+def column_facet(name: str, column: Any) -> Facet:
+    """
+    Facet over the distinct values of `column`; enums are reported by
+    value and booleans as true/false.
+    """
+    type_ = column.type
+    if isinstance(type_, Boolean):
+        expression = case((column.is_(True), "true"), (column.is_(False), "false"))
+        return Facet(name, expression, lambda value: value == "true")
+    if isinstance(type_, Enum) and type_.enum_class is not None:
+        # Enums are stored by member name
+        enum_class = type_.enum_class
+        return Facet(name, cast(column, String), lambda value: enum_class[value].value)
+    return Facet(name, cast(column, String))
+
+
+def bucket_facet(name: str, column: Any, edges: Sequence[float]) -> Facet:
+    """
+    Facet counting `column` into the ranges `[0, edges[0])`,
+    `[edges[0], edges[1])`, ... and `[edges[-1], ∞)`, labelled e.g.
+    `1000-5000` and `100000+`.
+    """
+    whens = []
+    bounds: Dict[str, tuple] = {}
+    lower: float = 0
+    for upper in edges:
+        label = f"{lower:g}-{upper:g}"
+        whens.append((column < upper, label))
+        bounds[label] = (lower, upper)
+        lower = upper
+    label = f"{lower:g}+"
+    bounds[label] = (lower, None)
+    return Facet(name, case(*whens, else_=label), bounds=bounds)
+
+
+def facet_statement(base: Any, facets: Sequence[Facet]) -> Any:
+    """
+    One statement counting the rows of `base` (a filtered SELECT) in total
+    and per value of each facet: `base` becomes a CTE, scanned once by
+    Postgres, and each count is a GROUP BY over it, UNION ALL-ed together
+    as `(facet, value, count)` rows. The total row has a NULL facet.
+    """
+    filtered = base.add_columns(
+        *(facet.expression.label(f"facet_{i}") for i, facet in enumerate(facets))
+    ).cte("filtered")
+    parts = [
+        select(
+            cast(null(), String).label("facet"),
+            cast(null(), String).label("value"),
+            func.count().label("count"),
+        ).select_from(filtered)
+    ]
+    for i, facet in enumerate(facets):
+        value = filtered.c[f"facet_{i}"]
+        parts.append(
+            select(literal(facet.name), value, func.count()).group_by(value)
+        )
+    return union_all(*parts)
+
+
+def facet_counts(rows: Sequence[Any], facets: Sequence[Facet]) -> Dict[str, Any]:
+    """
+    Shape the rows of `facet_statement` as `{"total": n, "facets": {name:
+    [{"value", "count", ...}, ...]}}`, most frequent values first and at
+    most FACET_MAX_VALUES per facet; range facets keep all their ranges, in
+    order.
+    """
+    by_name = {facet.name: facet for facet in facets}
+    total = 0
+    values: Dict[str, List[Dict[str, Any]]] = {facet.name: [] for facet in facets}
+    for name, value, count in rows:
+        if name is None:
+            total = count
+            continue
+        facet = by_name[name]
+        entry: Dict[str, Any] = {
+            "value": facet.decode(value) if facet.decode and value is not None else value,
+            "count": count,
+        }
+        if facet.bounds is not None and value is not None:
+            entry["min"], entry["max"] = facet.bounds[value]
+        values[name].append(entry)
+    for facet in facets:
+        entries = values[facet.name]
+        if facet.bounds is not None:
+            # Ranges stay in order
+            order = list(facet.bounds)
+            entries.sort(key=lambda entry: order.index(entry["value"]))
+        else:
+            entries.sort(key=lambda entry: (-entry["count"], str(entry["value"])))
+            del entries[settings.FACET_MAX_VALUES:]
+    return {"total": total, "facets": values}
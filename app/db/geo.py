@@ -0,0 +1,81 @@
+import math
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+# Rows are indexed by the grid cell their coordinates fall in, cells being
+# CELL_DEGREES of latitude by CELL_DEGREES of longitude (~11 km north-south)
+CELL_DEGREES = 0.1
+_ROWS = round(180 / CELL_DEGREES)
+_COLUMNS = round(360 / CELL_DEGREES)
+# Length of one degree of latitude (mean Earth radius 6371 km)
+KM_PER_DEGREE = 6371.0 * math.pi / 180
+
+
+class Circle(NamedTuple):
+    lat: float
+    lon: float
+    radius_km: float
+
+
+def _row(lat: float) -> int:
+    return min(max(int((lat + 90) / CELL_DEGREES), 0), _ROWS - 1)
+
+
+def _column(lon: float) -> int:
+    return min(max(int((lon + 180) / CELL_DEGREES), 0), _COLUMNS - 1)
+
+
+def geo_cell(lat: Optional[float], lon: Optional[float]) -> Optional[int]:
+    """
+    Grid cell of a point, numbered row by row from the south-west so that
+    the cells of one row are consecutive integers; None without a point.
+    """
+    if lat is None or lon is None:
+        return None
+    return _row(lat) * _COLUMNS + _column(lon)
+
+
+def cell_ranges(circle: Circle) -> List[Tuple[int, int]]:
+    """
+    `(first, last)` cell numbers covering `circle`'s bounding box, one
+    range per grid row, so an index on the cell column answers each with
+    one range scan. Boxes don't wrap around the antimeridian.
+    """
+    dlat = circle.radius_km / KM_PER_DEGREE
+    # Widest in longitude at its poleward edge
+    cos_lat = math.cos(math.radians(min(abs(circle.lat) + dlat, 90.0)))
+    dlon = dlat / cos_lat if cos_lat > 1e-9 else 360.0
+    if dlon >= 180:
+        first, last = 0, _COLUMNS - 1
+    else:
+        first, last = _column(circle.lon - dlon), _column(circle.lon + dlon)
+    return [
+        (row * _COLUMNS + first, row * _COLUMNS + last)
+        for row in range(_row(circle.lat - dlat), _row(circle.lat + dlat) + 1)
+    ]
+
+
+def _squared_distance(model: Any, circle: Circle) -> Any:
+    # Squared distance from the centre in degrees of latitude, by the
+    # equirectangular approximation with the cosine of the mean latitude
+    # linearized around the centre: plain arithmetic, which every database
+    # evaluates, and within 0.5% of the great-circle distance for radii up
+    # to a few hundred km
+    lat0 = math.radians(circle.lat)
+    dlat = model.latitude - circle.lat
+    scale = math.cos(lat0) - math.sin(lat0) * math.pi / 360 * dlat
+    dlon = (model.longitude - circle.lon) * scale
+    return dlat * dlat + dlon * dlon
+
+
+def within(model: Any, circle: Circle) -> Tuple[Any, Any]:
+    """
+    Condition selecting the rows of `model` (a model with `latitude`,
+    `longitude` and an indexed `geo_cell`) within `circle`, and an
+    ordering putting the nearest first.
+    """
+    squared = _squared_distance(model, circle)
+    radius = circle.radius_km / KM_PER_DEGREE
+    cells = or_(*(model.geo_cell.between(first, last) for first, last in cell_ranges(circle)))
+    return and_(cells, squared <= radius * radius), squared.asc()
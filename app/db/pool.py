@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS: Tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolStats:
+    """
+    Thread-safe counters for connection checkouts: how long callers waited
+    for a connection (histogram), how often the pool had to open overflow
+    connections beyond `pool_size`, and how often a checkout timed out.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = WAIT_BUCKETS_MS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.overflow_events = 0
+            self.timeouts = 0
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+            self._counts = [0] * (len(self.buckets) + 1)
+
+    def record(self, wait_ms: float, *, overflowed: bool, timed_out: bool) -> None:
+        slot = next(
+            (i for i, bound in enumerate(self.buckets) if wait_ms <= bound),
+            len(self.buckets),
+        )
+        with self._lock:
+            self._counts[slot] += 1
+            self.wait_sum_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if overflowed:
+                self.overflow_events += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            # Cumulative counts keyed by upper bound, Prometheus style
+            histogram, running = {}, 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts):
+                running += count
+                histogram["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+            return {
+                "checkouts": self.checkouts,
+                "overflow_events": self.overflow_events,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "count": running,
+                    "sum": round(self.wait_sum_ms, 3),
+                    "max": round(self.wait_max_ms, 3),
+                    "buckets": histogram,
+                },
+            }
+
+
+class _InstrumentedPool:
+    """
+    Times every checkout from the underlying queue (`_do_get`), which is
+    where callers block once all `pool_size + max_overflow` connections are
+    in use.
+    """
+
+    stats: PoolStats
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self) -> Any:
+        overflow = self.overflow()
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(
+                (time.perf_counter() - start) * 1000, overflowed=False, timed_out=True
+            )
+            raise
+        self.stats.record(
+            (time.perf_counter() - start) * 1000,
+            overflowed=self.overflow() > max(overflow, 0),
+            timed_out=False,
+        )
+        return connection
+
+    def recreate(self) -> Any:
+        # engine.dispose() swaps in a fresh pool; keep the history
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def status_dict(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout": self.timeout(),
+            **self.stats.snapshot(),
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine: Any) -> Optional[Dict[str, Any]]:
+    """
+    Live statistics of `engine`'s pool (a sync Engine or AsyncEngine), or
+    None when it isn't an instrumented queue pool (e.g. in-memory SQLite).
+    """
+    if engine is None:
+        return None
+    pool = engine.pool
+    if not isinstance(pool, _InstrumentedPool):
+        return None
+    return pool.status_dict()
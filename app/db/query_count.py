@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """
+    Records every statement a Session executes while active, including
+    lazy and `selectinload` relationship loads. `db` may also be a
+    sessionmaker or a Session class, to count across all their sessions,
+    e.g. the ones a request's dependencies open.
+    """
+
+    def __init__(self, db: Any):
+        self.db = db
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, orm_execute_state) -> None:
+        self.statements.append(str(orm_execute_state.statement))
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.db, "do_orm_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.db, "do_orm_execute", self._on_execute)
+
+
+@contextmanager
+def assert_max_queries(db: Any, limit: int) -> Iterator[QueryCounter]:
+    """
+    Fail if the wrapped block runs more than `limit` statements on `db`.
+
+        with assert_max_queries(db, 2):
+            bookings = crud.rental_booking.get_by_renter(db, renter_id=1)
+            TypeAdapter(List[schemas.RentalBooking]).validate_python(
+                bookings, from_attributes=True
+            )
+    """
+    with QueryCounter(db) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f"Expected at most {limit} queries, {counter.count} were run:\n"
+            + "\n".join(counter.statements)
+        )
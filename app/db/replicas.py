@@ -0,0 +1,210 @@
+import itertools
+import logging
+import threading
+import time
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+from app.core.config import settings
+from app.db.pool import pool_status
+
+logger = logging.getLogger(__name__)
+
+# Session.info keys: whether the session only serves reads (set for GET
+# and HEAD requests), whose reads they are, and whether it wrote anyway
+READ_ONLY = "read_only"
+USER_ID = "user_id"
+WROTE = "wrote"
+
+# Seconds the replica is behind; 0 when it has replayed all it received
+_POSTGRES_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class StickyWrites:
+    """
+    Until when each user's reads must go to the primary because they just
+    wrote, so replicas that haven't caught up can't hide their own writes.
+
+    Kept in shared memory allocated at import, so the workers app.serve
+    forks from its preloaded parent all see each other's writes. Users
+    share slots by id modulo their number; a collision only sends someone's
+    reads to the primary for a few seconds more.
+    """
+
+    def __init__(self, window: float, slots: int = 65536):
+        self.window = window
+        # CLOCK_MONOTONIC is system-wide, so comparable across processes
+        self._until = RawArray("d", slots) if window > 0 else None
+
+    def wrote(self, user_id: Any) -> None:
+        if self._until is None or user_id is None:
+            return
+        self._until[int(user_id) % len(self._until)] = time.monotonic() + self.window
+
+    def recent(self, user_id: Any) -> bool:
+        if self._until is None or user_id is None:
+            return False
+        return self._until[int(user_id) % len(self._until)] > time.monotonic()
+
+
+class Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.down_until = 0.0
+        self.checked_at = 0.0
+        self.lag: Optional[float] = None
+        self.reads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "healthy": self.down_until <= time.monotonic(),
+            "lag_seconds": self.lag,
+            "reads": self.reads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": pool_status(self.engine),
+        }
+
+
+class ReplicaSet:
+    """
+    The read replicas of one engine (sync engines; the `sync_engine` of
+    async ones). Sessions take them in turn, skipping any that recently
+    failed to connect, dropped a connection or lagged too far behind.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        max_lag: float,
+        check_interval: float,
+        retry_after: float,
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        for replica in self.replicas:
+            event.listen(replica.engine, "handle_error", self._on_error(replica))
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def _on_error(self, replica: Replica) -> Any:
+        def on_error(context: Any) -> None:
+            if context.is_disconnect:
+                self.mark_down(replica, repr(context.original_exception))
+
+        return on_error
+
+    def mark_down(self, replica: Replica, reason: str) -> None:
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_after
+            replica.failures += 1
+            replica.last_error = reason
+        logger.warning(
+            "Replica %s left out for %gs: %s",
+            replica.engine.url.render_as_string(hide_password=True), self.retry_after, reason,
+        )
+
+    def _candidates(self) -> List[Replica]:
+        now = time.monotonic()
+        with self._lock:
+            start = next(self._turn)
+        count = len(self.replicas)
+        ordered = (self.replicas[(start + i) % count] for i in range(count))
+        return [replica for replica in ordered if replica.down_until <= now]
+
+    def _lagging(self, replica: Replica, connection: Any) -> bool:
+        now = time.monotonic()
+        if connection.dialect.name != "postgresql" or now - replica.checked_at < self.check_interval:
+            return False
+        replica.checked_at = now
+        lag = connection.execute(_POSTGRES_LAG).scalar()
+        replica.lag = None if lag is None else round(float(lag), 3)
+        return replica.lag is not None and replica.lag > self.max_lag
+
+    def bind(self, session: Session) -> Optional[Engine]:
+        """
+        Connect `session` to the next healthy replica and return its
+        engine, or None when none is available.
+        """
+        for replica in self._candidates():
+            try:
+                # Connects now, so that a replica that is down is skipped
+                # instead of failing the request
+                connection = session.connection(bind_arguments={"bind": replica.engine})
+                if self._lagging(replica, connection):
+                    self.mark_down(replica, f"{replica.lag}s behind")
+                    continue
+            except DBAPIError as e:
+                self.mark_down(replica, repr(e.orig))
+                continue
+            replica.reads += 1
+            return replica.engine
+        return None
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [replica.stats() for replica in self.replicas]
+
+
+sticky_writes = StickyWrites(
+    settings.REPLICA_STICKY_SECONDS if settings.DATABASE_REPLICA_URLS else 0
+)
+
+# Not decided yet which engine the session reads from
+_UNDECIDED = object()
+
+
+class RoutingSession(Session):
+    """
+    Sends the SELECTs of read-only sessions to a replica, unless their user
+    wrote within REPLICA_STICKY_SECONDS or the session itself has written;
+    all else goes to the primary. A session reads from one replica
+    throughout, so a request sees a single snapshot. Committing a session
+    that wasn't read-only, or that wrote, starts its user's sticky window.
+    """
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica: Any = _UNDECIDED
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Any:
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info[WROTE] = True
+        elif (
+            self.replicas
+            and self.info.get(READ_ONLY)
+            and not self.info.get(WROTE)
+            and isinstance(clause, Select)
+        ):
+            if self._replica is _UNDECIDED:
+                self._replica = (
+                    None if sticky_writes.recent(self.info.get(USER_ID))
+                    else self.replicas.bind(self)
+                )
+            if self._replica is not None:
+                return self._replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _start_sticky_window(session: Session) -> None:
+    if session.info.get(WROTE) or not session.info.get(READ_ONLY):
+        sticky_writes.wrote(session.info.get(USER_ID))
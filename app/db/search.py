@@ -0,0 +1,189 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DDL, Float, Integer, event, func, literal_column, or_, text
+
+# Postgres text search configuration used for both the index and queries
+TEXT_SEARCH_CONFIG = "english"
+
+# FTS5 bm25() weight per Postgres setweight() label
+_BM25_WEIGHTS = {"A": 10.0, "B": 4.0, "C": 2.0, "D": 1.0}
+
+
+class SearchIndex:
+    """
+    Full-text + fuzzy index over some text columns of a table.
+
+    On Postgres the table gets a generated, GIN-indexed `search_vector`
+    tsvector column plus a trigram GIN index on the `fuzzy` column, so
+    queries use `@@` for words and `%` (pg_trgm similarity) for typos;
+    searching only some of the columns matches each of them against its
+    own GIN-indexed weighted tsvector expression instead.
+    On SQLite an external-content FTS5 table with the trigram tokenizer is
+    kept in sync by triggers; typo tolerance comes from OR-ing the query's
+    trigrams and ranking by bm25. Other databases fall back to ILIKE.
+    """
+
+    def __init__(self, model: Any, weights: Dict[str, str], fuzzy: str):
+        self.model = model
+        self.table = model.__table__
+        self.weights = weights
+        self.fields = list(weights)
+        self.fuzzy = fuzzy
+        self.fts_table = f"{self.table.name}_fts"
+
+    def _vector_sql(self, field: str, prefix: str = "") -> str:
+        return (
+            f"setweight(to_tsvector('{TEXT_SEARCH_CONFIG}', "
+            f"coalesce({prefix}{field}, '')), '{self.weights[field]}')"
+        )
+
+    def postgresql_ddl(self) -> List[str]:
+        name = self.table.name
+        vector = " || ".join(self._vector_sql(field) for field in self.fields)
+        return [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            f"ALTER TABLE {name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({vector}) STORED",
+            f"CREATE INDEX IF NOT EXISTS ix_{name}_search_vector "
+            f"ON {name} USING gin (search_vector)",
+            f"CREATE INDEX IF NOT EXISTS ix_{name}_{self.fuzzy}_trgm "
+            f"ON {name} USING gin ({self.fuzzy} gin_trgm_ops)",
+        ] + [
+            f"CREATE INDEX IF NOT EXISTS ix_{name}_{field}_tsvector "
+            f"ON {name} USING gin (({self._vector_sql(field)}))"
+            for field in self.fields
+        ]
+
+    def sqlite_ddl(self) -> List[str]:
+        name, fts = self.table.name, self.fts_table
+        columns = ", ".join(self.fields)
+        new_values = ", ".join(f"new.{field}" for field in self.fields)
+        old_values = ", ".join(f"old.{field}" for field in self.fields)
+        delete = (
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+            f"VALUES ('delete', old.id, {old_values});"
+        )
+        insert = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{columns}, content='{name}', content_rowid='id', tokenize='trigram')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {name} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+    def _postgresql(self, query: Any, q: str, fields: Sequence[str]) -> Tuple[Any, Any]:
+        config = literal_column(f"'{TEXT_SEARCH_CONFIG}'::regconfig")
+        tsquery = func.websearch_to_tsquery(config, q)
+        fuzzy_column = getattr(self.model, self.fuzzy)
+        conditions = []
+        rank = None
+        if any(field != self.fuzzy for field in fields):
+            if set(fields) == set(self.fields):
+                vector = literal_column(f"{self.table.name}.search_vector")
+                conditions.append(vector.op("@@")(tsquery))
+            else:
+                # Some of the columns: each matches through its own GIN
+                # expression index
+                vectors = [
+                    literal_column(f"({self._vector_sql(field, prefix=self.table.name + '.')})")
+                    for field in fields
+                ]
+                conditions.extend(vector.op("@@")(tsquery) for vector in vectors)
+                vector = vectors[0]
+                for other in vectors[1:]:
+                    vector = vector.op("||")(other)
+            rank = func.ts_rank_cd(vector, tsquery)
+        if self.fuzzy in fields:
+            conditions.append(fuzzy_column.op("%")(q))
+            similarity = func.similarity(fuzzy_column, q)
+            rank = similarity if rank is None else rank + similarity
+        return query.filter(or_(*conditions)), rank.desc()
+
+    def _sqlite(
+        self, query: Any, q: str, fields: Sequence[str]
+    ) -> Tuple[Any, Optional[Any]]:
+        # Any shared trigram matches; bm25 puts rows sharing the most first,
+        # which is what makes misspelt words still find their target
+        trigrams = {
+            word[i:i + 3]
+            for word in re.findall(r"\w+", q.lower())
+            for i in range(len(word) - 2)
+        }
+        if not trigrams:
+            # Nothing the trigram tokenizer can match; let the caller fall back
+            return query, None
+        terms = " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(trigrams))
+        match = "{" + " ".join(fields) + "} : (" + terms + ")"
+        weights = ", ".join(str(_BM25_WEIGHTS[self.weights[f]]) for f in self.fields)
+        hits = (
+            text(
+                f"SELECT rowid AS id, bm25({self.fts_table}, {weights}) AS score "
+                f"FROM {self.fts_table} WHERE {self.fts_table} MATCH :match"
+            )
+            .bindparams(match=match)
+            .columns(id=Integer, score=Float)
+            .subquery("search_hits")
+        )
+        query = query.join(hits, hits.c.id == self.model.id)
+        # bm25 scores are negative, lower is a better match
+        return query, hits.c.score.asc()
+
+    def apply(
+        self, query: Any, dialect: str, q: str, fields: Sequence[str]
+    ) -> Tuple[Any, Optional[Any]]:
+        indexed = [field for field in fields if field in self.weights]
+        if not indexed or dialect not in ("postgresql", "sqlite"):
+            return query, None
+        if dialect == "postgresql":
+            return self._postgresql(query, q, indexed)
+        return self._sqlite(query, q, indexed)
+
+
+SEARCH_INDEXES: Dict[Any, SearchIndex] = {}
+
+
+def search_index(model: Any, *, weights: Dict[str, str], fuzzy: str) -> SearchIndex:
+    """
+    Declare a search index for `model` and create it along with the table.
+    """
+    index = SearchIndex(model, weights=weights, fuzzy=fuzzy)
+    for statement in index.postgresql_ddl():
+        event.listen(
+            index.table, "after_create", DDL(statement).execute_if(dialect="postgresql")
+        )
+    for statement in index.sqlite_ddl():
+        event.listen(
+            index.table, "after_create", DDL(statement).execute_if(dialect="sqlite")
+        )
+    SEARCH_INDEXES[model] = index
+    return index
+
+
+def apply_search(
+    query: Any, model: Any, dialect: str, q: str, fields: Sequence[str]
+) -> Tuple[Any, Optional[Any]]:
+    """
+    Restrict `query` to rows of `model` matching `q` in `fields`.
+
+    Returns the query and, when an index served it, a relevance ordering
+    expression (best match first). When an index applies only its columns
+    are searched; otherwise, and on databases without index support, the
+    requested fields are matched with ILIKE.
+    """
+    fields = [field for field in fields if field in model.__table__.columns]
+    if not fields:
+        return query, None
+
+    index = SEARCH_INDEXES.get(model)
+    if index is not None:
+        searched, relevance = index.apply(query, dialect, q, fields)
+        if relevance is not None:
+            return searched, relevance
+
+    return (
+        query.filter(or_(*(getattr(model, field).ilike(f"%{q}%") for field in fields))),
+        None,
+    )
@@ -1,14 +1,90 @@
+from typing import Any, Dict, List
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from fastapi import Request
+from app.core.config import async_url, settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool
+from app.db.replicas import READ_ONLY, ReplicaSet, RoutingSession
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def pool_options(url: str, poolclass: Any) -> Dict[str, Any]:
+    """
+    Engine keyword arguments for the configured connection pool. In-memory
+    SQLite keeps SQLAlchemy's default single-connection pool, since every
+    new connection would be a different, empty database.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URL,
+    **pool_options(settings.SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool),
+)
+
+def replica_set(engines: List[Engine]) -> ReplicaSet:
+    return ReplicaSet(
+        engines,
+        max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.REPLICA_CHECK_SECONDS,
+        retry_after=settings.REPLICA_RETRY_SECONDS,
+    )
+
+replicas = replica_set([
+    create_engine(url, **pool_options(url, InstrumentedQueuePool))
+    for url in settings.DATABASE_REPLICA_URLS
+])
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, replicas=replicas
+)
+
+# The async driver is only imported when async mode is switched on
+async_engine = (
+    create_async_engine(
+        settings.SQLALCHEMY_ASYNC_DATABASE_URL,
+        **pool_options(settings.SQLALCHEMY_ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool),
+    )
+    if settings.DB_ASYNC
+    else None
+)
+# Replica sessions bind to sync engines, so keep the async engines' ones
+async_replicas = replica_set([
+    create_async_engine(url, **pool_options(url, InstrumentedAsyncQueuePool)).sync_engine
+    for url in map(async_url, settings.DATABASE_REPLICA_URLS if settings.DB_ASYNC else [])
+])
+# Relationships can't lazy-load under asyncio, so objects must stay usable
+# after commit; the async CRUD reloads what responses need explicitly.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replicas=async_replicas,
+)
+
+def _read_only(request: Request) -> bool:
+    # May read from a replica, see RoutingSession
+    return request.method in ("GET", "HEAD")
 
 # Dependency
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info[READ_ONLY] = _read_only(request)
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info[READ_ONLY] = _read_only(request)
+        yield db
@@ -1,12 +1,28 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.core.admission import Overloaded, admission
 from app.core.config import settings
-from app.api.v1.endpoints import auth, users, horses, market, rental
+from app.core.health import health
+from app.core.pagination import InvalidCursor
+from app.core.image_pool import image_pool
+from app.core.password_pool import PasswordHasherBusy, password_pool
+from app.core.request_metrics import RequestMetricsMiddleware
+from app.api.v1.endpoints import health as health_endpoints, images, metrics
+from app.api.warmup import warm_up
+from app.db.session import async_engine, async_replicas, engine, replicas
+
+if settings.DB_ASYNC:
+    from app.api.v1.aio import auth, users, horses, market, rental
+else:
+    from app.api.v1.endpoints import auth, users, horses, market, rental
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse if settings.FAST_SERIALIZATION else JSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -16,14 +32,75 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
 
+if settings.REQUEST_METRICS_ENABLED:
+    app.add_middleware(RequestMetricsMiddleware)
+
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many concurrent logins, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(InvalidCursor)
+def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+    )
+
+@app.on_event("startup")
+def size_threadpool():
+    admission.size_threadpool()
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Awaited, since uvicorn accepts connections only once startup is done:
+    # no request reaches a worker that is still warming up
+    health.start()
+    health.ready(await warm_up(app) if settings.WARMUP_ENABLED else {})
+
+@app.on_event("shutdown")
+def stop_serving():
+    health.drain()
+
+@app.on_event("shutdown")
+def shutdown_password_pool():
+    password_pool.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_image_pool():
+    image_pool.shutdown()
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    # Close pooled connections (and aiosqlite's worker threads) on exit
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in replicas.replicas:
+        replica.engine.dispose()
+    for replica in async_replicas.replicas:
+        await AsyncEngine(replica.engine).dispose()
+
 # Include routers
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
 app.include_router(users.router, prefix=f"{settings.API_V1_STR}/users", tags=["users"])
 app.include_router(horses.router, prefix=f"{settings.API_V1_STR}/horses", tags=["horses"])
 app.include_router(market.router, prefix=f"{settings.API_V1_STR}/market", tags=["market"])
 app.include_router(rental.router, prefix=f"{settings.API_V1_STR}/rental", tags=["rental"])
+app.include_router(images.router, prefix=f"{settings.API_V1_STR}/images", tags=["images"])
+app.include_router(metrics.router, prefix=f"{settings.API_V1_STR}/metrics", tags=["metrics"])
+app.include_router(health_endpoints.router, prefix=f"{settings.API_V1_STR}/health", tags=["health"])
 
 @app.get("/")
 def root():
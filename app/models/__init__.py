@@ -1,7 +1,7 @@
 from .base import Base, TimestampMixin
 from .user import User
 from .horse import Horse, HorseImage, HorseBreed, HorseGender
-from .market import MarketListing, Transaction, ListingStatus
+from .market import MarketListing, Transaction, ListingStatus, PriceStatistic
 from .rental import (
     RentalListing,
     RentalBooking,
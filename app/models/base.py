@@ -1,9 +1,28 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy import Column, Integer, DateTime, Float, event, inspect
 from datetime import datetime
+from app.db.geo import geo_cell
 
 Base = declarative_base()
 
 class TimestampMixin:
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+def _inserted_geo_cell(context):
+    # Also runs for bulk inserts, which bypass ORM events
+    params = context.get_current_parameters()
+    return geo_cell(params.get("latitude"), params.get("longitude"))
+
+class GeoMixin:
+    latitude = Column(Float)
+    longitude = Column(Float)
+    # Grid cell of the coordinates, which radius searches look up by (see
+    # app.db.geo); tables index it
+    geo_cell = Column(Integer, default=_inserted_geo_cell)
+
+@event.listens_for(GeoMixin, "before_update", propagate=True)
+def _update_geo_cell(mapper, connection, target):
+    attrs = inspect(target).attrs
+    if attrs.latitude.history.has_changes() or attrs.longitude.history.has_changes():
+        target.geo_cell = geo_cell(target.latitude, target.longitude)
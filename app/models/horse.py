@@ -1,16 +1,49 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, Boolean, Enum, Index
+from sqlalchemy.orm import column_property, relationship
+from sqlalchemy.sql.functions import coalesce
+import enum
 
-from app.models.base import Base
+from app.core.media import IMAGES_PATH
+from app.db.search import search_index
+from app.models.base import Base, TimestampMixin
 
-class Horse(Base):
+class HorseBreed(enum.Enum):
+    ARABIAN = "Arabian"
+    THOROUGHBRED = "Thoroughbred"
+    QUARTER_HORSE = "Quarter Horse"
+    APPALOOSA = "Appaloosa"
+    ANDALUSIAN = "Andalusian"
+    FRIESIAN = "Friesian"
+    MORGAN = "Morgan"
+    MUSTANG = "Mustang"
+    PAINT = "Paint"
+    WARMBLOOD = "Warmblood"
+    OTHER = "Other"
+
+class HorseGender(enum.Enum):
+    STALLION = "Stallion"
+    MARE = "Mare"
+    GELDING = "Gelding"
+    COLT = "Colt"
+    FILLY = "Filly"
+
+class Horse(Base, TimestampMixin):
     __tablename__ = "horses"
+    __table_args__ = (
+        Index("ix_horses_owner", "owner_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
-    breed = Column(String(100))
+    breed = Column(Enum(HorseBreed))
     age = Column(Integer)
+    gender = Column(Enum(HorseGender))
+    color = Column(String(50))
+    height = Column(Float)  # in hands
+    weight = Column(Float)  # in kg
     description = Column(Text)
+    training_level = Column(String(100))
+    health_records = Column(Text)
     owner_id = Column(Integer, ForeignKey("users.id"))
     
     # Relationships
@@ -22,10 +55,25 @@ class Horse(Base):
 
 class HorseImage(Base):
     __tablename__ = "horse_images"
+    __table_args__ = (
+        # Every horse page loads its images with horse_id IN (...)
+        Index("ix_horse_images_horse", "horse_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     horse_id = Column(Integer, ForeignKey("horses.id"))
     image_url = Column(String(255), nullable=False)
+    is_primary = Column(Boolean, default=False)
+    # SHA-256 of an uploaded image in the media store; None for images
+    # added by URL
+    content_hash = Column(String(64))
+    # What list pages show: the small variant of uploads, the URL otherwise
+    thumbnail_url = column_property(
+        coalesce(IMAGES_PATH + "/" + content_hash + "/thumb.webp", image_url)
+    )
     
     # Relationships
-    horse = relationship("Horse", back_populates="images") 
\ No newline at end of file
+    horse = relationship("Horse", back_populates="images")
+
+
+search_index(Horse, weights={"name": "A", "description": "B"}, fuzzy="name")
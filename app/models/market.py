@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, Enum, Text, Boolean, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, Enum, Text, Boolean, String, JSON, UniqueConstraint, Index, text
 from sqlalchemy.orm import relationship
-from .base import Base, TimestampMixin
+from .base import Base, GeoMixin, TimestampMixin
 import enum
 
 class ListingStatus(enum.Enum):
@@ -9,8 +9,23 @@ class ListingStatus(enum.Enum):
     SOLD = "Sold"
     CANCELLED = "Cancelled"
 
-class MarketListing(Base, TimestampMixin):
+class MarketListing(Base, TimestampMixin, GeoMixin):
     __tablename__ = "market_listings"
+    __table_args__ = (
+        # A seller's listings and listings by status, both paged by id
+        Index("ix_market_listings_seller", "seller_id", "id"),
+        Index("ix_market_listings_status", "status", "id"),
+        # Price ranges over the active listings only, which are what
+        # browsing, facets and exports filter by price
+        Index(
+            "ix_market_listings_active_price",
+            "price",
+            postgresql_where=text("status = 'ACTIVE'"),
+            sqlite_where=text("status = 'ACTIVE'"),
+        ),
+        # Radius searches, which only look at active listings
+        Index("ix_market_listings_geo_cell", "status", "geo_cell"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     horse_id = Column(Integer, ForeignKey("horses.id"), nullable=False)
@@ -20,13 +35,21 @@ class MarketListing(Base, TimestampMixin):
     status = Column(Enum(ListingStatus), default=ListingStatus.ACTIVE)
     is_negotiable = Column(Boolean, default=True)
     location = Column(String)
+    # Bumped by every update, which only applies to the version it read, so
+    # concurrent changes (an edit and a sale) fail instead of overwriting
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
-    horse = relationship("Horse", back_populates="market_listing")
+    horse = relationship("Horse", back_populates="market_listings")
     seller = relationship("User", back_populates="market_listings")
 
+    __mapper_args__ = {"version_id_col": version}
+
 class Transaction(Base, TimestampMixin):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_buyer", "buyer_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     listing_id = Column(Integer, ForeignKey("market_listings.id"), nullable=False)
@@ -34,4 +57,25 @@ class Transaction(Base, TimestampMixin):
     final_price = Column(Float, nullable=False)
     payment_status = Column(String)
     payment_method = Column(String)
-    transaction_notes = Column(Text) 
\ No newline at end of file
+    transaction_notes = Column(Text)
+
+class PriceStatistic(Base, TimestampMixin):
+    """
+    Running sale price statistics of one shard of a group of transactions,
+    e.g. all Arabians or all sales in Ocala, updated by every new
+    transaction in the shard; a group's statistics merge its shards.
+    """
+    __tablename__ = "price_statistics"
+    __table_args__ = (
+        UniqueConstraint("dimension", "key", "shard", name="uq_price_statistics_dimension_key_shard"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    dimension = Column(String(20), nullable=False)  # all, breed, location or age_band
+    key = Column(String(255), nullable=False)
+    shard = Column(Integer, nullable=False, default=0)  # see PRICE_STATS_SHARDS
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)  # sum of final prices
+    min_price = Column(Float)
+    max_price = Column(Float)
+    sketch = Column(JSON, nullable=False, default=dict)  # QuantileSketch buckets
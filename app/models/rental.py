@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, Enum, Text, Boolean, DateTime, String
+from sqlalchemy import Column, Integer, Float, ForeignKey, Enum, Text, Boolean, DateTime, String, Index, DDL, event
 from sqlalchemy.orm import relationship
-from .base import Base, TimestampMixin
+from .base import Base, GeoMixin, TimestampMixin
 import enum
 
 class RentalDuration(enum.Enum):
@@ -21,8 +21,21 @@ class BookingStatus(enum.Enum):
     COMPLETED = "Completed"
     CANCELLED = "Cancelled"
 
-class RentalListing(Base, TimestampMixin):
+# Bookings in these states hold their date range on the listing
+BLOCKING_BOOKING_STATUSES = (
+    BookingStatus.PENDING,
+    BookingStatus.CONFIRMED,
+    BookingStatus.ACTIVE,
+)
+BOOKING_OVERLAP_CONSTRAINT = "rental_bookings_no_overlap"
+
+class RentalListing(Base, TimestampMixin, GeoMixin):
     __tablename__ = "rental_listings"
+    __table_args__ = (
+        Index("ix_rental_listings_owner", "owner_id", "id"),
+        # Radius searches, which only look at available listings
+        Index("ix_rental_listings_geo_cell", "status", "geo_cell"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     horse_id = Column(Integer, ForeignKey("horses.id"), nullable=False)
@@ -36,14 +49,25 @@ class RentalListing(Base, TimestampMixin):
     location = Column(String)
     requirements = Column(Text)
     available_durations = Column(String)  # Stored as comma-separated RentalDuration values
+    # Bumped by every update, see MarketListing.version; bookings also
+    # check it to be sure they were priced from the current listing
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     # Relationships
-    horse = relationship("Horse", back_populates="rental_listing")
+    horse = relationship("Horse", back_populates="rental_listings")
     owner = relationship("User", back_populates="rental_listings")
     bookings = relationship("RentalBooking", back_populates="rental_listing")
 
+    __mapper_args__ = {"version_id_col": version}
+
 class RentalBooking(Base, TimestampMixin):
     __tablename__ = "rental_bookings"
+    __table_args__ = (
+        # Serves overlap checks and availability search; bookings are the
+        # half-open range [start_date, end_date)
+        Index("ix_rental_bookings_listing_period", "rental_listing_id", "start_date", "end_date"),
+        Index("ix_rental_bookings_renter", "renter_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     rental_listing_id = Column(Integer, ForeignKey("rental_listings.id"), nullable=False)
@@ -58,4 +82,24 @@ class RentalBooking(Base, TimestampMixin):
     
     # Relationships
     rental_listing = relationship("RentalListing", back_populates="bookings")
-    renter = relationship("User", back_populates="rental_bookings") 
\ No newline at end of file
+    renter = relationship("User", back_populates="rental_bookings")
+
+# On Postgres a GiST exclusion constraint makes overlapping active bookings
+# for the same listing impossible, even between concurrent transactions.
+# Other databases rely on the conditional insert in crud_rental.
+event.listen(
+    RentalBooking.__table__,
+    "after_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql"),
+)
+event.listen(
+    RentalBooking.__table__,
+    "after_create",
+    DDL(
+        f"ALTER TABLE rental_bookings ADD CONSTRAINT {BOOKING_OVERLAP_CONSTRAINT} "
+        "EXCLUDE USING gist (rental_listing_id WITH =, tsrange(start_date, end_date) WITH &&) "
+        "WHERE (status IN ("
+        + ", ".join(f"'{s.name}'" for s in BLOCKING_BOOKING_STATUSES)
+        + "))"
+    ).execute_if(dialect="postgresql"),
+)
@@ -13,6 +13,8 @@ class User(Base, TimestampMixin):
     phone_number = Column(String)
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
+    # May see operational endpoints such as /metrics; granted with app.cli
+    is_superuser = Column(Boolean, default=False)
     
     # Relationships
     horses = relationship("Horse", back_populates="owner")
@@ -1,11 +1,12 @@
 from .user import User, UserCreate, UserUpdate, UserInDB
-from .horse import Horse, HorseCreate, HorseUpdate, HorseImage, HorseImageCreate
+from .horse import Horse, HorseCreate, HorseUpdate, HorseImage, HorseImageCreate, HorseImageBulkCreate, HorseImageUpload
 from .market import (
     MarketListing,
     MarketListingCreate,
     MarketListingUpdate,
     Transaction,
     TransactionCreate,
+    PriceStats,
 )
 from .rental import (
     RentalListing,
@@ -14,4 +15,6 @@ from .rental import (
     RentalBooking,
     RentalBookingCreate,
     RentalBookingUpdate,
-) 
\ No newline at end of file
+)
+from .bulk import BulkImportResult, BulkRowError
+from .facets import FacetCounts, FacetValue
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Any, List, Optional
+
+class BulkRowError(BaseModel):
+    line: int  # 1-based line of the row in the uploaded file
+    message: str
+    errors: Optional[List[Any]] = None  # pydantic validation errors, if any
+
+class BulkImportResult(BaseModel):
+    created: int
+    failed: int
+    # Ids of the created rows, in file order; failed rows are skipped
+    ids: List[int]
+    errors: List[BulkRowError]
+    # True when more rows failed than `errors` lists
+    errors_truncated: bool = False
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Union
+
+class FacetValue(BaseModel):
+    value: Union[bool, str, None]
+    count: int
+    # Bounds of a range facet's bucket (e.g. price); no max for the last one
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class FacetCounts(BaseModel):
+    # Rows matching the filters
+    total: int
+    facets: Dict[str, List[FacetValue]]
@@ -0,0 +1,113 @@
+import copy
+import typing
+from functools import lru_cache
+from typing import Any, Optional, Tuple, Type
+
+from pydantic import BaseModel, create_model
+
+# A `fields=` selection as a hashable tree: (name, subtree) pairs sorted by
+# name, where a subtree of None selects the whole field
+FieldTree = Tuple[Tuple[str, Optional["FieldTree"]], ...]
+
+
+def nested_schema(annotation: Any) -> Optional[Type[BaseModel]]:
+    """
+    The response model nested in a field annotation, unwrapping
+    Optional[...] / List[...], or None for plain values.
+    """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        nested = nested_schema(arg)
+        if nested is not None:
+            return nested
+    return None
+
+
+def _freeze(tree: dict) -> FieldTree:
+    return tuple(
+        (name, None if subtree is None else _freeze(subtree))
+        for name, subtree in sorted(tree.items())
+    )
+
+
+@lru_cache(maxsize=256)
+def parse_fields(schema: Type[BaseModel], spec: Optional[str]) -> Optional[FieldTree]:
+    """
+    Resolve a comma-separated list of field paths such as
+    `price,location,horse.name,horse.images.image_url` against `schema`.
+    A path ending in a nested model selects all of it. Returns None when
+    nothing was asked for and raises ValueError for unknown fields.
+    """
+    paths = [path.strip() for path in (spec or "").split(",") if path.strip()]
+    if not paths:
+        return None
+    tree: dict = {}
+    for path in paths:
+        node: Optional[dict] = tree
+        current: Optional[Type[BaseModel]] = schema
+        parts = path.split(".")
+        for depth, part in enumerate(parts):
+            if current is None or part not in current.model_fields:
+                raise ValueError(f"Unknown field '{path}'")
+            if depth == len(parts) - 1:
+                node[part] = None
+                break
+            if part in node and node[part] is None:
+                # The whole field is already selected
+                break
+            node = node.setdefault(part, {})
+            current = nested_schema(current.model_fields[part].annotation)
+    return _freeze(tree)
+
+
+def _substitute(annotation: Any, old: Type[BaseModel], new: Type[BaseModel]) -> Any:
+    if annotation is old:
+        return new
+    args = typing.get_args(annotation)
+    if not args:
+        return annotation
+    args = tuple(_substitute(arg, old, new) for arg in args)
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return typing.Union[args]
+    return origin[args if len(args) > 1 else args[0]]
+
+
+@lru_cache(maxsize=256)
+def project(schema: Type[BaseModel], fields: Optional[FieldTree]) -> Type[BaseModel]:
+    """
+    A copy of `schema` with only the fields in `fields`, nested models
+    projected likewise; `schema` itself when `fields` is None.
+    """
+    if fields is None:
+        return schema
+    selected = dict(fields)
+    definitions = {}
+    for name, field in schema.model_fields.items():
+        if name not in selected:
+            continue
+        annotation = field.annotation
+        nested = nested_schema(annotation)
+        if nested is not None and selected[name] is not None:
+            annotation = _substitute(annotation, nested, project(nested, selected[name]))
+        # create_model() updates the FieldInfo it's given in place
+        definitions[name] = (annotation, copy.deepcopy(field))
+    return create_model(
+        f"{schema.__name__}Fields", __config__=schema.model_config, **definitions
+    )
+
+
+class FieldSet:
+    """
+    A `fields=` selection resolved against a response schema: `tree` is
+    what the CRUD layer loads, `model` what the response is serialized as.
+    """
+
+    def __init__(self, schema: Type[BaseModel], tree: Optional[FieldTree]):
+        self.schema = schema
+        self.tree = tree
+
+    @property
+    def model(self) -> Type[BaseModel]:
+        return project(self.schema, self.tree)
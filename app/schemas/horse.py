@@ -10,9 +10,17 @@ class HorseImageBase(BaseModel):
 class HorseImageCreate(HorseImageBase):
     pass
 
+class HorseImageBulkCreate(HorseImageCreate):
+    horse_id: int
+
+class HorseImageUpload(BaseModel):
+    # Form fields sent along with an uploaded image
+    is_primary: bool = False
+
 class HorseImage(HorseImageBase):
     id: int
     horse_id: int
+    thumbnail_url: str
 
     class Config:
         from_attributes = True
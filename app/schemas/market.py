@@ -10,6 +10,8 @@ class MarketListingBase(BaseModel):
     description: Optional[str] = None
     is_negotiable: bool = True
     location: str
+    latitude: Optional[Annotated[float, Field(ge=-90, le=90)]] = None
+    longitude: Optional[Annotated[float, Field(ge=-180, le=180)]] = None
 
 class MarketListingCreate(MarketListingBase):
     horse_id: int
@@ -19,6 +21,8 @@ class MarketListingUpdate(BaseModel):
     description: Optional[str] = None
     is_negotiable: Optional[bool] = None
     location: Optional[str] = None
+    latitude: Optional[Annotated[float, Field(ge=-90, le=90)]] = None
+    longitude: Optional[Annotated[float, Field(ge=-180, le=180)]] = None
     status: Optional[ListingStatus] = None
 
 class MarketListing(MarketListingBase):
@@ -52,4 +56,18 @@ class Transaction(TransactionBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PriceStats(BaseModel):
+    dimension: str  # all, breed, location or age_band
+    key: str
+    count: int
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    # Percentiles, estimated within PRICE_STATS_RELATIVE_ACCURACY
+    p10: Optional[float] = None
+    p25: Optional[float] = None
+    p50: Optional[float] = None
+    p75: Optional[float] = None
+    p90: Optional[float] = None
@@ -1,15 +1,62 @@
-from typing import Optional, List
+from datetime import datetime
+from typing import Optional, List, Type
 from pydantic import BaseModel, Field
-from fastapi import Query
+from fastapi import HTTPException, Query
+from app.core.config import settings
+from app.core.pagination import InvalidCursor, decode_cursor
+from app.db.geo import Circle
+from app.schemas.fields import FieldSet, parse_fields
+from app.models.horse import HorseBreed, HorseGender
+from app.models.market import ListingStatus
+from app.models.rental import RentalDuration
 
 class PaginationParams:
     def __init__(
         self,
         skip: int = Query(default=0, ge=0),
-        limit: int = Query(default=100, ge=1, le=100)
+        limit: int = Query(default=100, ge=1, le=100),
+        cursor: Optional[str] = Query(default=None),
     ):
+        if cursor is not None:
+            try:
+                decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise HTTPException(status_code=400, detail=str(e))
         self.skip = skip
         self.limit = limit
+        self.cursor = cursor
+
+class BatchParams:
+    def __init__(
+        self,
+        ids: str = Query(
+            description=f"Comma-separated IDs, at most {settings.BATCH_MAX_IDS}, e.g. `3,14,15`",
+        ),
+    ):
+        try:
+            self.ids = [int(id) for id in ids.split(",") if id.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+        if not self.ids:
+            raise HTTPException(status_code=400, detail="ids must not be empty")
+        if len(self.ids) > settings.BATCH_MAX_IDS:
+            raise HTTPException(
+                status_code=400, detail=f"At most {settings.BATCH_MAX_IDS} ids per request"
+            )
+
+class GeoParams:
+    def __init__(
+        self,
+        lat: Optional[float] = Query(default=None, ge=-90, le=90),
+        lon: Optional[float] = Query(default=None, ge=-180, le=180),
+        radius_km: Optional[float] = Query(default=None, gt=0, le=settings.GEO_MAX_RADIUS_KM),
+    ):
+        given = [value is not None for value in (lat, lon, radius_km)]
+        if any(given) and not all(given):
+            raise HTTPException(
+                status_code=400, detail="lat, lon and radius_km must be given together"
+            )
+        self.circle = Circle(lat, lon, radius_km) if all(given) else None
 
 class SortParams:
     def __init__(
@@ -23,10 +70,10 @@ class SortParams:
 class HorseFilterParams:
     def __init__(
         self,
-        breed: Optional[str] = None,
+        breed: Optional[HorseBreed] = None,
         min_age: Optional[int] = Query(default=None, ge=0),
         max_age: Optional[int] = Query(default=None, le=40),
-        gender: Optional[str] = None,
+        gender: Optional[HorseGender] = None,
         min_height: Optional[float] = Query(default=None, ge=0),
         max_height: Optional[float] = Query(default=None),
         location: Optional[str] = None,
@@ -46,7 +93,7 @@ class MarketFilterParams:
         max_price: Optional[float] = Query(default=None, ge=0),
         location: Optional[str] = None,
         is_negotiable: Optional[bool] = None,
-        status: Optional[str] = None,
+        status: Optional[ListingStatus] = None,
     ):
         self.min_price = min_price
         self.max_price = max_price
@@ -60,10 +107,14 @@ class RentalFilterParams:
         min_price_per_day: Optional[float] = Query(default=None, ge=0),
         max_price_per_day: Optional[float] = Query(default=None, ge=0),
         location: Optional[str] = None,
-        available_from: Optional[str] = None,
-        available_to: Optional[str] = None,
-        duration_type: Optional[str] = None,
+        available_from: Optional[datetime] = None,
+        available_to: Optional[datetime] = None,
+        duration_type: Optional[RentalDuration] = None,
     ):
+        if available_from and available_to and available_to <= available_from:
+            raise HTTPException(
+                status_code=400, detail="available_to must be after available_from"
+            )
         self.min_price_per_day = min_price_per_day
         self.max_price_per_day = max_price_per_day
         self.location = location
@@ -71,6 +122,24 @@ class RentalFilterParams:
         self.available_to = available_to
         self.duration_type = duration_type
 
+class PriceStatsParams:
+    def __init__(
+        self,
+        breed: Optional[HorseBreed] = None,
+        location: Optional[str] = None,
+        age: Optional[int] = Query(default=None, ge=0, le=40),
+    ):
+        self.breed = breed
+        self.location = location
+        self.age = age
+
+class ExportParams:
+    def __init__(
+        self,
+        format: str = Query(default="ndjson", regex="^(ndjson|csv)$"),
+    ):
+        self.format = format
+
 class SearchParams:
     def __init__(
         self,
@@ -78,4 +147,21 @@ class SearchParams:
         search_in: Optional[List[str]] = Query(default=["name", "description"])
     ):
         self.q = q
-        self.search_in = search_in 
\ No newline at end of file
+        self.search_in = search_in
+
+class FieldsParams:
+    def __init__(
+        self,
+        fields: Optional[str] = Query(
+            default=None,
+            description="Comma-separated fields to return, nested ones as dotted "
+            "paths, e.g. `price,location,horse.name,horse.images.image_url`",
+        ),
+    ):
+        self.fields = fields
+
+    def resolve(self, schema: Type[BaseModel]) -> FieldSet:
+        try:
+            return FieldSet(schema, parse_fields(schema, self.fields))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
@@ -12,6 +12,8 @@ class RentalListingBase(BaseModel):
     price_per_month: Optional[Annotated[float, Field(gt=0)]] = None
     description: Optional[str] = None
     location: str
+    latitude: Optional[Annotated[float, Field(ge=-90, le=90)]] = None
+    longitude: Optional[Annotated[float, Field(ge=-180, le=180)]] = None
     requirements: Optional[str] = None
     available_durations: str  # Comma-separated RentalDuration values
 
@@ -25,6 +27,8 @@ class RentalListingUpdate(BaseModel):
     price_per_month: Optional[Annotated[float, Field(gt=0)]] = None
     description: Optional[str] = None
     location: Optional[str] = None
+    latitude: Optional[Annotated[float, Field(ge=-90, le=90)]] = None
+    longitude: Optional[Annotated[float, Field(ge=-180, le=180)]] = None
     requirements: Optional[str] = None
     available_durations: Optional[str] = None
     status: Optional[RentalStatus] = None
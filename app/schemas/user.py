@@ -18,6 +18,9 @@ class UserUpdate(BaseModel):
     password: Optional[Annotated[str, Field(min_length=8)]] = None
 
 class UserInDBBase(UserBase):
+    # Checked when it was stored; re-validating it on every response (each
+    # listing embeds its seller) cost more than serializing the rest
+    email: Annotated[str, Field(json_schema_extra={"format": "email"})]
     id: int
     is_active: bool
     is_verified: bool
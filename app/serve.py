@@ -0,0 +1,173 @@
+"""
+Production server.
+
+    python -m app.serve [--workers N] [--host HOST] [--port PORT]
+
+The parent process imports the app, configures the ORM mappers and builds
+the OpenAPI schema once, then forks SERVE_WORKERS workers that share its
+listening socket and all of that already-initialized memory. Each worker
+warms itself up (see `app.api.warmup`) before it accepts connections, so
+/api/v1/health/ready passes on whichever answers until it drains. Workers
+that die are replaced.
+
+On SIGTERM or SIGINT every worker drains: it fails readiness for
+SERVE_DRAIN_SECONDS while still serving, then stops accepting and waits
+up to SERVE_GRACEFUL_TIMEOUT for requests in flight. A second signal
+skips the drain, a third stops at once. POSIX only, since it forks.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import time
+from multiprocessing.sharedctypes import RawArray
+from types import FrameType
+from typing import Dict, Optional, Tuple
+
+import uvicorn
+from sqlalchemy.orm import configure_mappers
+
+from app.core.config import settings
+from app.core.health import STATE_CODES, STARTING, health
+
+logger = logging.getLogger("uvicorn.error")
+
+# Workers that die sooner than this after starting are restarted only
+# after waiting as long, so a broken deploy doesn't fork in a tight loop
+_MIN_WORKER_LIFETIME = 1.0
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn's server, with a drain before its graceful shutdown.
+    """
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        if self.should_exit:
+            self.force_exit = True
+        elif health.draining or settings.SERVE_DRAIN_SECONDS <= 0:
+            self.should_exit = True
+        else:
+            logger.info("Draining for %gs", settings.SERVE_DRAIN_SECONDS)
+            health.drain()
+            asyncio.get_running_loop().call_later(
+                settings.SERVE_DRAIN_SECONDS, setattr, self, "should_exit", True
+            )
+
+
+def preload():
+    """
+    Import and initialize everything workers would otherwise each do on
+    startup or on their first requests.
+    """
+    from app.main import app
+
+    configure_mappers()
+    app.openapi()
+    return app
+
+
+class Supervisor:
+    """
+    Forks the workers and replaces those that die, until told to stop.
+    """
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        # Worker states, see WorkerHealth; inherited by every fork
+        self.states = RawArray("b", workers)
+        # Slot in `states` and start time of each worker
+        self.pids: Dict[int, Tuple[int, float]] = {}
+        self.stopping = False
+
+    def _spawn(self, slot: int) -> None:
+        self.states[slot] = STATE_CODES[STARTING]
+        pid = os.fork()
+        if pid:
+            self.pids[pid] = (slot, time.monotonic())
+            return
+        code = 1
+        try:
+            health.share(self.states, slot)
+            # Out of the terminal's process group: Ctrl+C reaches the
+            # parent only, which passes it on as a single SIGTERM
+            os.setpgid(0, 0)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, signal.SIG_DFL)
+            from app.db.session import engine, replicas
+
+            # Never use connections the parent may have opened
+            for pooled in [engine, *(replica.engine for replica in replicas.replicas)]:
+                pooled.dispose(close=False)
+            server = DrainingServer(self.config)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else 1
+        except BaseException:
+            logger.exception("Worker %d failed", os.getpid())
+        finally:
+            os._exit(code)
+
+    def _signal(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._signal)
+        logger.info("Starting %d workers", self.workers)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        while self.pids:
+            pid, status = os.wait()
+            if pid not in self.pids:
+                continue
+            slot, started = self.pids.pop(pid)
+            if self.stopping:
+                continue
+            logger.warning(
+                "Worker %d exited with status %d, starting another",
+                pid, os.waitstatus_to_exitcode(status),
+            )
+            if time.monotonic() - started < _MIN_WORKER_LIFETIME:
+                time.sleep(_MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self._spawn(slot)
+        logger.info("All workers stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=settings.SERVE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVE_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    args = parser.parse_args()
+
+    app = preload()
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=settings.SERVE_GRACEFUL_TIMEOUT,
+    )
+    workers = args.workers or os.cpu_count() or 1
+    if workers == 1:
+        DrainingServer(config).run()
+        return
+    sock = config.bind_socket()
+    # asyncio only disables Nagle on connections it accepts from sockets
+    # it created itself; accepted ones inherit this instead. Without it
+    # small responses wait ~40ms for the client's delayed ACK.
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    Supervisor(config, sock, workers).run()
+
+
+if __name__ == "__main__":
+    main()
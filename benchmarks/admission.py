@@ -0,0 +1,201 @@
+"""
+Browse latency during a login or write surge, with and without admission control.
+
+Runs a burst of concurrent logins (or horse creations) while a second
+client keeps browsing `/market/listings`, once with
+ADMISSION_CONTROL_ENABLED off and once on, and reports how many surge
+requests succeeded or were shed with 503, browse p50/p99 with and without
+the surge, and the admission pools' queue wait:
+
+    python -m benchmarks.admission --surge login --requests 400 --concurrency 128
+
+Each mode runs in a fresh interpreter since the admission settings are
+read at import time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks import percentile
+
+MODES = {"off": "false", "on": "true"}
+SURGES = ("login", "write")
+BROWSE_CLIENTS = 4
+
+
+async def _browse(client, headers, stop: asyncio.Event, latencies: List[float], statuses: List[int]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/v1/market/listings?limit=20", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses.append(response.status_code)
+
+
+async def _surge_request(client, surge: str, headers, semaphore, statuses: List[int]) -> None:
+    async with semaphore:
+        if surge == "login":
+            response = await client.post(
+                "/api/v1/auth/login",
+                data={"username": "bench@example.com", "password": "benchmark-password"},
+            )
+        else:
+            response = await client.post(
+                "/api/v1/horses/",
+                headers=headers,
+                json={"name": "Surge", "breed": "Arabian", "age": 5, "gender": "Mare", "color": "bay"},
+            )
+        statuses.append(response.status_code)
+
+
+async def _browsing(client, headers, seconds: float, during=None):
+    latencies: List[float] = []
+    statuses: List[int] = []
+    stop = asyncio.Event()
+    browsers = [
+        asyncio.create_task(_browse(client, headers, stop, latencies, statuses))
+        for _ in range(BROWSE_CLIENTS)
+    ]
+    if during is None:
+        await asyncio.sleep(seconds)
+        result = None
+    else:
+        result = await during
+    stop.set()
+    await asyncio.gather(*browsers)
+    return latencies, statuses, result
+
+
+async def _run(args) -> Dict:
+    import httpx
+    from app.core.admission import admission
+    from app.core.security import create_access_token
+    from app.crud import crud_horse, crud_market, crud_user
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.models.base import Base
+    from app.models.horse import HorseBreed, HorseGender
+    from app.schemas import HorseCreate, MarketListingCreate, UserCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = crud_user.user.create(
+        db,
+        obj_in=UserCreate(
+            email="bench@example.com", username="bench", password="benchmark-password"
+        ),
+    )
+    # Reads the admission stats from /metrics afterwards
+    user = crud_user.user.update(db, db_obj=user, obj_in={"is_superuser": True})
+    for i in range(50):
+        horse = crud_horse.horse.create_with_owner(
+            db,
+            obj_in=HorseCreate(
+                name=f"Horse {i}", breed=HorseBreed.ARABIAN, age=5,
+                gender=HorseGender.MARE, color="bay",
+            ),
+            owner_id=user.id,
+        )
+        crud_market.market.create_with_seller(
+            db,
+            obj_in=MarketListingCreate(horse_id=horse.id, price=1000 + i, location="Here"),
+            seller_id=user.id,
+        )
+    headers = {"Authorization": f"Bearer {create_access_token(user.id)}"}
+    db.close()
+
+    # Startup handlers don't run under ASGITransport
+    admission.size_threadpool()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        # Warm the hashing pool and the principal cache
+        await client.post(
+            "/api/v1/auth/login",
+            data={"username": "bench@example.com", "password": "benchmark-password"},
+        )
+        await client.get("/api/v1/market/listings", headers=headers)
+
+        baseline, _, _ = await _browsing(client, headers, args.baseline_seconds)
+
+        statuses: List[int] = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def surge() -> float:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                _surge_request(client, args.surge, headers, semaphore, statuses)
+                for _ in range(args.requests)
+            ))
+            return time.perf_counter() - started
+
+        during, browse_statuses, elapsed = await _browsing(client, headers, 0, surge())
+        pools = (await client.get("/api/v1/metrics/", headers=headers)).json()["admission"]
+
+    ok = [s for s in statuses if s < 300]
+    result = {
+        "surge_requests": len(statuses),
+        "surge_ok": len(ok),
+        "surge_shed_503": statuses.count(503),
+        "surge_ok_per_s": round(len(ok) / elapsed, 1),
+        "browse_baseline_p50_ms": round(percentile(baseline, 50), 2),
+        "browse_baseline_p99_ms": round(percentile(baseline, 99), 2),
+        "browse_during_surge_p50_ms": round(percentile(during, 50), 2),
+        "browse_during_surge_p99_ms": round(percentile(during, 99), 2),
+        "browse_during_surge_503": browse_statuses.count(503),
+    }
+    # Empty with admission control off
+    surge_pool = pools.get(args.surge, {}).get("queue_wait_ms", {})
+    browse_pool = pools.get("browse", {}).get("queue_wait_ms", {})
+    result["surge_queue_wait_p99_ms"] = surge_pool.get("p99", "-")
+    result["browse_queue_wait_p99_ms"] = browse_pool.get("p99", "-")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--surge", choices=SURGES, default="login")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--mode", choices=sorted(MODES))
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(_run(args))))
+        return
+
+    results = {}
+    for mode, enabled in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                ADMISSION_CONTROL_ENABLED=enabled,
+                REQUEST_METRICS_ENABLED="false",
+            )
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.admission",
+                    "--mode", mode,
+                    "--surge", args.surge,
+                    "--requests", str(args.requests),
+                    "--concurrency", str(args.concurrency),
+                    "--baseline-seconds", str(args.baseline_seconds),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'metric':<30}" + "".join(f"{mode:>12}" for mode in results))
+    for metric in metrics:
+        print(f"{metric:<30}" + "".join(f"{results[m][metric]:>12}" for m in results))
+
+
+if __name__ == "__main__":
+    main()
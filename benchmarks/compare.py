@@ -0,0 +1,114 @@
+"""
+Diff two `benchmarks.endpoints` result files.
+
+Prints throughput and p50/p95/p99 per endpoint side by side with the
+relative change, and flags endpoints whose p95 grew or whose throughput
+fell by more than `--threshold` percent:
+
+    python -m benchmarks.compare results/before.json results/after.json --threshold 10
+
+Exits with status 1 when something regressed and `--fail-on-regression`
+is given, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+# Run settings that make two result files incomparable when they differ
+COMPARABLE_META = ("database", "mode", "target", "scale", "seed", "counts", "concurrency", "duration_s")
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    if not before:
+        return None
+    return (after - before) / before * 100
+
+
+def _fmt_change(change: Optional[float]) -> str:
+    return "n/a" if change is None else f"{change:+.1f}%"
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    One row per endpoint present in either file, with before/after values,
+    their changes in percent and whether the endpoint regressed.
+    """
+    rows = []
+    names = list(before["endpoints"]) + [
+        name for name in after["endpoints"] if name not in before["endpoints"]
+    ]
+    for name in names:
+        old, new = before["endpoints"].get(name), after["endpoints"].get(name)
+        if old is None or new is None:
+            rows.append({"endpoint": name, "missing": "before" if old is None else "after"})
+            continue
+        row: Dict[str, Any] = {"endpoint": name, "changes": {}}
+        for metric in ("p50", "p95", "p99"):
+            row[metric] = (old["latency_ms"][metric], new["latency_ms"][metric])
+            row["changes"][metric] = _change(*row[metric])
+        row["throughput_rps"] = (old["throughput_rps"], new["throughput_rps"])
+        row["changes"]["throughput_rps"] = _change(*row["throughput_rps"])
+        slower = row["changes"]["p95"] is not None and row["changes"]["p95"] > threshold
+        fewer = (
+            row["changes"]["throughput_rps"] is not None
+            and row["changes"]["throughput_rps"] < -threshold
+        )
+        row["regressed"] = slower or fewer
+        row["new_errors"] = sum(new["unexpected_statuses"].values()) - sum(
+            old["unexpected_statuses"].values()
+        )
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Percent change in p95 or throughput counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    for key in COMPARABLE_META:
+        if before["meta"].get(key) != after["meta"].get(key):
+            print(
+                f"note: {key} differs: {before['meta'].get(key)} -> {after['meta'].get(key)}",
+                file=sys.stderr,
+            )
+
+    rows = compare(before, after, args.threshold)
+    print(
+        f"{'endpoint':<44}{'req/s':>22}{'':>9}"
+        + "".join(f"{metric + ' ms':>22}{'':>9}" for metric in ("p50", "p95", "p99"))
+    )
+    regressions = 0
+    for row in rows:
+        if "missing" in row:
+            print(f"{row['endpoint']:<44}  (missing {row['missing']})")
+            continue
+        cells = []
+        for metric in ("throughput_rps", "p50", "p95", "p99"):
+            old, new = row[metric]
+            cells.append(f"{old:>10} -> {new:>8}{_fmt_change(row['changes'][metric]):>9}")
+        flags = []
+        if row["regressed"]:
+            regressions += 1
+            flags.append("REGRESSED")
+        if row["new_errors"] > 0:
+            flags.append(f"+{row['new_errors']} errors")
+        print(f"{row['endpoint']:<44}" + "".join(cells) + ("  " + ", ".join(flags) if flags else ""))
+
+    print(f"\n{regressions} endpoint(s) regressed beyond {args.threshold:g}%", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Concurrent purchases and bookings: correctness and throughput under contention.
+
+Sends every request of a scenario at once from `--buyers` different users
+and then checks the database: each listing sold at most once, with one
+transaction per successful purchase, and no overlapping bookings. The
+scenarios are
+
+- `spread`: each buyer buys a different market listing (no contention)
+- `hot`: all buyers try to buy the same listing
+- `booking`: all buyers book the same rental listing for the same dates,
+  while its owner keeps changing the price
+
+and each runs with the sync and the async stack, in a fresh interpreter
+since DB_ASYNC is read at import time:
+
+    python -m benchmarks.contention --buyers 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks import percentile
+
+MODES = {"sync": "false", "async": "true"}
+SCENARIOS = ("spread", "hot", "booking")
+SELLER = "seller@example.com"
+OWNER_EDITS = 20
+
+
+def _seed(buyers: int) -> Dict[str, List[int]]:
+    from sqlalchemy import insert, select
+
+    from app.core.security import get_password_hash
+    from app.crud import crud_horse, crud_market, crud_rental
+    from app.db.session import SessionLocal, engine
+    from app.models.base import Base
+    from app.models.horse import HorseBreed, HorseGender
+    from app.models.user import User
+    from app.schemas import HorseCreate, MarketListingCreate, RentalListingCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    hashed = get_password_hash("benchmark-password")
+    db.execute(insert(User), [
+        {"email": email, "username": email, "hashed_password": hashed, "is_active": True}
+        for email in [SELLER] + [f"buyer{i}@example.com" for i in range(buyers)]
+    ])
+    db.commit()
+    seller_id, *buyer_ids = db.scalars(select(User.id).order_by(User.id)).all()
+    market_ids = []
+    for i in range(buyers):
+        horse = crud_horse.horse.create_with_owner(
+            db,
+            obj_in=HorseCreate(
+                name=f"Horse {i}", breed=HorseBreed.ARABIAN, age=5,
+                gender=HorseGender.MARE, color="bay",
+            ),
+            owner_id=seller_id,
+        )
+        market_ids.append(crud_market.market.create_with_seller(
+            db,
+            obj_in=MarketListingCreate(horse_id=horse.id, price=1000 + i, location="Here"),
+            seller_id=seller_id,
+        ).id)
+    rental_id = crud_rental.rental_listing.create_with_owner(
+        db,
+        obj_in=RentalListingCreate(
+            horse_id=horse.id, price_per_day=50, location="Here", available_durations="Daily",
+        ),
+        owner_id=seller_id,
+    ).id
+    db.close()
+    return {"seller": [seller_id], "buyers": buyer_ids, "market": market_ids, "rental": [rental_id]}
+
+
+def _check(scenario: str, ids: Dict[str, List[int]], ok: int) -> Dict:
+    from sqlalchemy import func, select
+
+    from app.db.session import SessionLocal
+    from app.models.market import ListingStatus, MarketListing, Transaction
+    from app.models.rental import RentalBooking
+
+    db = SessionLocal()
+    try:
+        if scenario == "booking":
+            bookings = db.scalar(select(func.count(RentalBooking.id)))
+            return {"rows_written": bookings, "correct": bookings == ok == 1}
+        transactions = db.scalar(select(func.count(Transaction.id)))
+        most_per_listing = db.scalar(
+            select(func.count(Transaction.id)).group_by(Transaction.listing_id)
+            .order_by(func.count(Transaction.id).desc()).limit(1)
+        )
+        sold = db.scalar(
+            select(func.count(MarketListing.id)).where(MarketListing.status == ListingStatus.SOLD)
+        )
+        expected = len(ids["buyers"]) if scenario == "spread" else 1
+        return {
+            "rows_written": transactions,
+            "correct": transactions == sold == ok == expected and most_per_listing == 1,
+        }
+    finally:
+        db.close()
+
+
+async def _run(args) -> Dict:
+    import httpx
+    from app.core.admission import admission
+    from app.core.security import create_access_token
+    from app.main import app, dispose_engines
+
+    ids = _seed(args.buyers)
+    tokens = {user_id: create_access_token(user_id) for user_id in ids["seller"] + ids["buyers"]}
+
+    def headers(user_id: int) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {tokens[user_id]}"}
+
+    def request(i: int, buyer_id: int):
+        if args.scenario == "booking":
+            return "/api/v1/rental/bookings", {
+                "rental_listing_id": ids["rental"][0],
+                "start_date": "2030-01-01T00:00:00",
+                "end_date": "2030-01-08T00:00:00",
+                "duration_type": "Daily",
+            }
+        listing_id = ids["market"][i if args.scenario == "spread" else 0]
+        return "/api/v1/market/transactions", {
+            "listing_id": listing_id, "buyer_id": buyer_id, "final_price": 1000,
+            "payment_method": "card", "payment_status": "paid",
+        }
+
+    # Startup handlers don't run under ASGITransport
+    admission.size_threadpool()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        latencies: List[float] = []
+        statuses: List[int] = []
+        edits: List[int] = []
+
+        async def buy(i: int, buyer_id: int) -> None:
+            path, body = request(i, buyer_id)
+            started = time.perf_counter()
+            response = await client.post(path, json=body, headers=headers(buyer_id))
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses.append(response.status_code)
+
+        async def edit_prices() -> None:
+            for i in range(OWNER_EDITS):
+                response = await client.put(
+                    f"/api/v1/rental/listings/{ids['rental'][0]}",
+                    json={"price_per_day": 50 + i},
+                    headers=headers(ids["seller"][0]),
+                )
+                edits.append(response.status_code)
+
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(buy(i, buyer_id) for i, buyer_id in enumerate(ids["buyers"])),
+            *([edit_prices()] if args.scenario == "booking" else []),
+        )
+        elapsed = time.perf_counter() - started
+
+    ok = sum(status < 300 for status in statuses)
+    result = {
+        "requests": len(statuses),
+        "ok": ok,
+        "conflict_409": statuses.count(409),
+        "errors_5xx": sum(status >= 500 for status in statuses),
+        **_check(args.scenario, ids, ok),
+        "owner_edits_ok": sum(status < 300 for status in edits),
+        "requests_per_s": round(len(statuses) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+    }
+    # Nor do shutdown handlers; aiosqlite's threads would keep us alive
+    await dispose_engines()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--buyers", type=int, default=100)
+    parser.add_argument("--scenario", choices=SCENARIOS)
+    parser.add_argument("--mode", choices=sorted(MODES))
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(_run(args))))
+        return
+
+    from app.core.config import settings
+
+    # Queue the whole burst instead of shedding part of it with 503, so
+    # every buyer's request reaches the purchase path
+    pools = dict(settings.ADMISSION_POOLS)
+    pools["write"] = {**pools["write"], "queue": args.buyers, "max_wait_ms": 60000}
+    for scenario in SCENARIOS:
+        results = {}
+        for mode, enabled in MODES.items():
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(
+                    os.environ,
+                    DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                    DB_ASYNC=enabled,
+                    REQUEST_METRICS_ENABLED="false",
+                    ADMISSION_POOLS=json.dumps(pools),
+                )
+                output = subprocess.run(
+                    [
+                        sys.executable, "-m", "benchmarks.contention",
+                        "--mode", mode, "--scenario", scenario, "--buyers", str(args.buyers),
+                    ],
+                    env=env, check=True, capture_output=True, text=True,
+                ).stdout
+                results[mode] = json.loads(output.strip().splitlines()[-1])
+
+        print(f"\n{scenario}")
+        print(f"{'metric':<20}" + "".join(f"{mode:>12}" for mode in results))
+        for metric in next(iter(results.values())):
+            print(f"{metric:<20}" + "".join(f"{str(results[m][metric]):>12}" for m in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,709 @@
+"""
+Throughput and latency of every API endpoint against a seeded dataset.
+
+Seeds the database with `benchmarks.seed` if it is empty, then drives each
+route under `/api/v1` in turn with `--concurrency` concurrent clients for
+`--duration` seconds and reports requests per second and p50/p95/p99
+latency per endpoint. Requests go through an in-process ASGI client unless
+`--base-url` points at a running server:
+
+    python -m benchmarks.endpoints --scale 10k --database-url sqlite:///bench-10k.db \\
+        --output results/10k-sync.json
+    python -m benchmarks.endpoints --scale 10k --database-url sqlite:///bench-10k.db \\
+        --async --output results/10k-async.json
+    python -m benchmarks.compare results/10k-sync.json results/10k-async.json
+
+Request parameters are drawn from a seeded random generator, so two runs
+send the same mix of requests. A SQLite database is copied before the run
+so that write endpoints leave the seeded file untouched; on Postgres they
+add rows, so reseed before runs that need to be compared exactly. In
+process, uploaded images go to a temporary MEDIA_ROOT, and the app's
+startup and shutdown handlers run as they would in a server, warm-up
+included. Routes without a scenario are listed in the report.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from benchmarks import percentile
+from benchmarks.seed import COORDINATES, LOCATIONS, NAME_PARTS, PASSWORD, SCALES
+
+# Users whose tokens the load generator rotates through
+SAMPLE_USERS = 50
+SAMPLE_LISTINGS = 10_000
+BULK_ROWS = 100
+# IDs per batch request, about a page of cards
+BATCH_IDS = 20
+# Images uploaded before the run for the image scenarios to fetch
+SAMPLE_IMAGES = 10
+IMAGE_SIZE = (1200, 900)
+IMAGE_VARIANTS = ("thumb.webp", "thumb.jpg", "large.webp", "large.jpg")
+# New bookings land after the seeded ones
+NEW_BOOKINGS_FROM = datetime(2027, 1, 1)
+
+# (method, path, httpx request keyword arguments)
+Call = Tuple[str, str, Dict[str, Any]]
+
+
+class Scenario(NamedTuple):
+    route: str
+    build: Callable[[random.Random, "Dataset"], Call]
+    expected: Tuple[int, ...] = (200,)
+    variant: str = ""
+
+    @property
+    def name(self) -> str:
+        return f"{self.route} [{self.variant}]" if self.variant else self.route
+
+
+class Dataset:
+    """
+    Ids the scenarios draw from, loaded from the seeded database: a sample of
+    users with their tokens and what they own, and a sample of listings.
+    """
+
+    def __init__(self) -> None:
+        from sqlalchemy import func, select
+
+        from app.core.security import create_access_token
+        from app.db.session import SessionLocal
+        from app.models.horse import Horse
+        from app.models.market import ListingStatus, MarketListing
+        from app.models.rental import RentalBooking, RentalListing
+        from app.models.user import User
+
+        db = SessionLocal()
+        try:
+            self.users: List[Tuple[int, str]] = list(
+                db.execute(select(User.id, User.email).order_by(User.id).limit(SAMPLE_USERS))
+            )
+            if not self.users:
+                raise SystemExit("Database is not seeded; run benchmarks.seed first")
+            user_ids = [id for id, _ in self.users]
+            self.headers = {
+                id: {"Authorization": f"Bearer {create_access_token(id)}"} for id in user_ids
+            }
+            self.superuser = db.scalar(
+                select(User.id).where(User.is_superuser.is_(True)).order_by(User.id).limit(1)
+            )
+            if self.superuser not in self.headers:
+                raise SystemExit("No superuser among the sampled users; reseed with benchmarks.seed")
+            self.max_user_id = db.scalar(select(func.max(User.id)))
+            self.max_horse_id = db.scalar(select(func.max(Horse.id)))
+            self.horses = self._by_owner(
+                db.execute(select(Horse.owner_id, Horse.id).where(Horse.owner_id.in_(user_ids)))
+            )
+            self.market = list(
+                db.execute(
+                    select(MarketListing.id, MarketListing.seller_id, MarketListing.price)
+                    .where(MarketListing.status == ListingStatus.ACTIVE)
+                    .order_by(MarketListing.id)
+                    .limit(SAMPLE_LISTINGS)
+                )
+            )
+            self.market_by_seller = self._by_owner(
+                db.execute(
+                    select(MarketListing.seller_id, MarketListing.id)
+                    .where(MarketListing.seller_id.in_(user_ids))
+                )
+            )
+            self.rental = list(
+                db.execute(
+                    select(RentalListing.id, RentalListing.owner_id)
+                    .order_by(RentalListing.id)
+                    .limit(SAMPLE_LISTINGS)
+                )
+            )
+            self.rental_by_owner = self._by_owner(
+                db.execute(
+                    select(RentalListing.owner_id, RentalListing.id)
+                    .where(RentalListing.owner_id.in_(user_ids))
+                )
+            )
+            self.bookings_by_renter = self._by_owner(
+                db.execute(
+                    select(RentalBooking.renter_id, RentalBooking.id)
+                    .where(RentalBooking.renter_id.in_(user_ids))
+                )
+            )
+            # Digests of the images uploaded by _upload_images
+            self.images: List[str] = []
+            self.counts = {
+                model.__tablename__: db.scalar(select(func.count()).select_from(model))
+                for model in (User, Horse, MarketListing, RentalListing, RentalBooking)
+            }
+        finally:
+            db.close()
+        self._serial = 0
+        self._run = f"{os.getpid()}-{int(time.time())}"
+
+    @staticmethod
+    def _by_owner(rows: Any) -> Dict[int, List[int]]:
+        owned: Dict[int, List[int]] = {}
+        for owner_id, id in rows:
+            owned.setdefault(owner_id, []).append(id)
+        return owned
+
+    def user(self, rng: random.Random, owning: Optional[Dict[int, List[int]]] = None) -> int:
+        candidates = [id for id, _ in self.users if owning is None or owning.get(id)]
+        return rng.choice(candidates)
+
+    def unique(self) -> str:
+        self._serial += 1
+        return f"{self._run}-{self._serial}"
+
+
+def _auth(ds: Dataset, user_id: int, **kwargs: Any) -> Dict[str, Any]:
+    return {"headers": ds.headers[user_id], **kwargs}
+
+
+def _horse_body(rng: random.Random) -> Dict[str, Any]:
+    from app.models.horse import HorseBreed, HorseGender
+
+    return {
+        "name": f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)}",
+        "breed": rng.choice(list(HorseBreed)).value,
+        "age": rng.randint(1, 30),
+        "gender": rng.choice(list(HorseGender)).value,
+        "color": "bay",
+        "height": round(rng.uniform(12, 18), 1),
+    }
+
+
+def _period(rng: random.Random) -> Tuple[datetime, datetime]:
+    start = NEW_BOOKINGS_FROM + timedelta(days=rng.randrange(3650), hours=rng.randrange(24))
+    return start, start + timedelta(days=rng.randint(1, 7))
+
+
+def _login(rng: random.Random, ds: Dataset) -> Call:
+    _, email = rng.choice(ds.users)
+    return "POST", "/auth/login", {"data": {"username": email, "password": PASSWORD}}
+
+
+def _register(rng: random.Random, ds: Dataset) -> Call:
+    name = f"load-{ds.unique()}"
+    return "POST", "/auth/register", {
+        "json": {"email": f"{name}@example.com", "username": name, "password": PASSWORD}
+    }
+
+
+def _list_horses(rng: random.Random, ds: Dataset) -> Call:
+    from app.models.horse import HorseBreed
+
+    params: Dict[str, Any] = {"limit": 20}
+    if rng.random() < 0.5:
+        params["breed"] = rng.choice(list(HorseBreed)).value
+    if rng.random() < 0.5:
+        params["min_age"] = rng.randint(1, 15)
+        params["max_age"] = params["min_age"] + rng.randint(1, 10)
+    params["sort_by"] = rng.choice(["age", "name", "height"])
+    params["order"] = rng.choice(["asc", "desc"])
+    return "GET", "/horses/", _auth(ds, ds.user(rng), params=params)
+
+
+def _search_horses(rng: random.Random, ds: Dataset) -> Call:
+    params = {"q": rng.choice(NAME_PARTS).lower(), "limit": 20}
+    return "GET", "/horses/", _auth(ds, ds.user(rng), params=params)
+
+
+
+
+def _get(path: str, **params: Any) -> Callable[[random.Random, Dataset], Call]:
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        return "GET", path, _auth(ds, ds.user(rng), params=params)
+    return build
+
+
+def _get_random(path: str, ids: Callable[[random.Random, Dataset], int]) -> Callable[[random.Random, Dataset], Call]:
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        return "GET", path.format(id=ids(rng, ds)), _auth(ds, ds.user(rng))
+    return build
+
+
+def _owned(
+    method: str, path: str, owning: str, body: Callable[[random.Random, int], Dict[str, Any]]
+) -> Callable[[random.Random, Dataset], Call]:
+    """
+    A write by a sampled user to one of their own rows; `owning` names the
+    Dataset map to pick the row from, `path` may use the row as `{id}`.
+    """
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        by_owner = getattr(ds, owning)
+        user_id = ds.user(rng, by_owner)
+        id = rng.choice(by_owner[user_id])
+        return method, path.format(id=id), _auth(ds, user_id, json=body(rng, id))
+    return build
+
+
+def _batch(path: str, ids: Callable[[random.Random, Dataset], List[int]]) -> Callable[[random.Random, Dataset], Call]:
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        params = {"ids": ",".join(str(id) for id in ids(rng, ds))}
+        return "GET", path, _auth(ds, ds.user(rng), params=params)
+    return build
+
+
+def _other_user(rng: random.Random, ds: Dataset, owner_id: int) -> int:
+    user_id = ds.user(rng)
+    if user_id == owner_id:
+        user_id = next(id for id, _ in ds.users if id != owner_id)
+    return user_id
+
+
+def _bulk(path: str, row: Callable[[random.Random, Dataset, int], Dict[str, Any]]) -> Callable[[random.Random, Dataset], Call]:
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        user_id = ds.user(rng, ds.horses)
+        horse_ids = ds.horses[user_id]
+        rows = [row(rng, ds, rng.choice(horse_ids)) for _ in range(BULK_ROWS)]
+        return "POST", path, {
+            "content": "".join(json.dumps(row) + "\n" for row in rows),
+            "headers": {**ds.headers[user_id], "Content-Type": "application/x-ndjson"},
+        }
+    return build
+
+
+def _market_listing(rng: random.Random, ds: Dataset, horse_id: int) -> Dict[str, Any]:
+    return {
+        "horse_id": horse_id,
+        "price": round(rng.uniform(1_000, 150_000), 2),
+        "location": rng.choice(LOCATIONS),
+    }
+
+
+def _rental_listing(rng: random.Random, ds: Dataset, horse_id: int) -> Dict[str, Any]:
+    return {
+        "horse_id": horse_id,
+        "price_per_day": round(rng.uniform(50, 500), 2),
+        "location": rng.choice(LOCATIONS),
+        "available_durations": "Daily,Weekly",
+    }
+
+
+def _image(rng: random.Random, ds: Dataset, horse_id: int) -> Dict[str, Any]:
+    return {
+        "horse_id": horse_id,
+        "image_url": f"https://images.example.com/horses/{horse_id}/{ds.unique()}.jpg",
+    }
+
+
+def _upload_image(rng: random.Random, ds: Dataset) -> Call:
+    from PIL import Image
+
+    # A new photo each time, so every upload is stored and rendered
+    buffer = io.BytesIO()
+    color = tuple(rng.randrange(256) for _ in range(3))
+    Image.new("RGB", IMAGE_SIZE, color).save(buffer, "JPEG", quality=90)
+    user_id = ds.user(rng, ds.horses)
+    path = f"/horses/{rng.choice(ds.horses[user_id])}/images/upload"
+    return "POST", path, _auth(ds, user_id, files={"file": ("horse.jpg", buffer.getvalue(), "image/jpeg")})
+
+
+def _image_variant(method: str) -> Callable[[random.Random, Dataset], Call]:
+    # Public, so sent without a token
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        return method, f"/images/{rng.choice(ds.images)}/{rng.choice(IMAGE_VARIANTS)}", {}
+    return build
+
+
+def _available_listings(rng: random.Random, ds: Dataset) -> Call:
+    start, end = _period(rng)
+    params = {"limit": 20, "available_from": start.isoformat(), "available_to": end.isoformat()}
+    return "GET", "/rental/listings", _auth(ds, ds.user(rng), params=params)
+
+
+def _near(path: str) -> Callable[[random.Random, Dataset], Call]:
+    # Listings within 50 km of a point near one of the seeded locations
+    def build(rng: random.Random, ds: Dataset) -> Call:
+        lat, lon = COORDINATES[rng.choice(LOCATIONS)]
+        params = {
+            "limit": 20,
+            "lat": round(lat + rng.uniform(-0.5, 0.5), 4),
+            "lon": round(lon + rng.uniform(-0.5, 0.5), 4),
+            "radius_km": 50,
+        }
+        return "GET", path, _auth(ds, ds.user(rng), params=params)
+    return build
+
+
+def _export_market(rng: random.Random, ds: Dataset) -> Call:
+    # A narrow price band keeps the export a few hundred rows even at 1m
+    low = round(rng.uniform(1_000, 148_000), 2)
+    params = {"location": rng.choice(LOCATIONS), "min_price": low, "max_price": low + 2_000}
+    return "GET", "/market/listings/export", _auth(ds, ds.user(rng), params=params)
+
+
+def _export_rental(rng: random.Random, ds: Dataset) -> Call:
+    low = round(rng.uniform(50, 490), 2)
+    params = {
+        "location": rng.choice(LOCATIONS),
+        "min_price_per_day": low,
+        "max_price_per_day": low + 10,
+    }
+    return "GET", "/rental/listings/export", _auth(ds, ds.user(rng), params=params)
+
+
+def _create_market_listing(rng: random.Random, ds: Dataset) -> Call:
+    user_id = ds.user(rng, ds.horses)
+    body = _market_listing(rng, ds, rng.choice(ds.horses[user_id]))
+    return "POST", "/market/listings", _auth(ds, user_id, json=body)
+
+
+def _create_rental_listing(rng: random.Random, ds: Dataset) -> Call:
+    user_id = ds.user(rng, ds.horses)
+    body = _rental_listing(rng, ds, rng.choice(ds.horses[user_id]))
+    return "POST", "/rental/listings", _auth(ds, user_id, json=body)
+
+
+def _create_transaction(rng: random.Random, ds: Dataset) -> Call:
+    listing_id, seller_id, price = rng.choice(ds.market)
+    user_id = _other_user(rng, ds, seller_id)
+    return "POST", "/market/transactions", _auth(ds, user_id, json={
+        "listing_id": listing_id,
+        "buyer_id": user_id,
+        "final_price": price,
+        "payment_method": "card",
+        "payment_status": "pending",
+    })
+
+
+def _create_booking(rng: random.Random, ds: Dataset) -> Call:
+    listing_id, owner_id = rng.choice(ds.rental)
+    start, end = _period(rng)
+    return "POST", "/rental/bookings", _auth(ds, _other_user(rng, ds, owner_id), json={
+        "rental_listing_id": listing_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "duration_type": "Daily",
+    })
+
+
+def _update_me(rng: random.Random, ds: Dataset) -> Call:
+    body = {"full_name": f"Bench User {rng.randrange(10**6)}"}
+    return "PUT", "/users/me", _auth(ds, ds.user(rng), json=body)
+
+
+def _create_horse(rng: random.Random, ds: Dataset) -> Call:
+    return "POST", "/horses/", _auth(ds, ds.user(rng), json=_horse_body(rng))
+
+
+def _any_user(rng: random.Random, ds: Dataset) -> int:
+    return rng.randint(1, ds.max_user_id)
+
+
+def _any_horse(rng: random.Random, ds: Dataset) -> int:
+    return rng.randint(1, ds.max_horse_id)
+
+
+# What a mobile list view asks for
+MOBILE_LISTING_FIELDS = "id,price,location,horse.name,horse.images.image_url"
+
+SCENARIOS: List[Scenario] = [
+    Scenario("POST /auth/login", _login),
+    Scenario("POST /auth/register", _register),
+    Scenario("GET /users/me", _get("/users/me")),
+    Scenario("PUT /users/me", _update_me),
+    Scenario("GET /users/{user_id}", _get_random("/users/{id}", _any_user)),
+    Scenario("GET /horses/", _list_horses),
+    Scenario("GET /horses/", _search_horses, variant="search"),
+    Scenario("GET /horses/facets", _get("/horses/facets")),
+    Scenario("POST /horses/", _create_horse),
+    Scenario("POST /horses/bulk", _bulk("/horses/bulk", lambda rng, ds, _: _horse_body(rng))),
+    Scenario("POST /horses/images/bulk", _bulk("/horses/images/bulk", _image)),
+    Scenario("GET /horses/my-horses", _get("/horses/my-horses", limit=20)),
+    Scenario("GET /horses/batch", _batch(
+        "/horses/batch", lambda rng, ds: [_any_horse(rng, ds) for _ in range(BATCH_IDS)]
+    )),
+    Scenario("GET /horses/{horse_id}", _get_random("/horses/{id}", _any_horse)),
+    Scenario("PUT /horses/{horse_id}", _owned(
+        "PUT", "/horses/{id}", "horses", lambda rng, _: {"age": rng.randint(1, 30)}
+    )),
+    Scenario("POST /horses/{horse_id}/images", _owned(
+        "POST", "/horses/{id}/images", "horses",
+        lambda rng, id: {"image_url": f"https://images.example.com/horses/{id}/{rng.randrange(10**9)}.jpg"},
+    )),
+    # Uploads beyond what the image pool admits are refused until it catches up
+    Scenario("POST /horses/{horse_id}/images/upload", _upload_image, expected=(200, 503)),
+    Scenario("GET /horses/{horse_id}/images", _get_random("/horses/{id}/images", _any_horse)),
+    Scenario("GET /images/{digest}/{name}", _image_variant("GET")),
+    Scenario("HEAD /images/{digest}/{name}", _image_variant("HEAD")),
+    Scenario("GET /market/listings", _get("/market/listings", limit=20)),
+    Scenario("GET /market/listings", _get(
+        "/market/listings", limit=20, fields=MOBILE_LISTING_FIELDS
+    ), variant="fields"),
+    Scenario("GET /market/listings", _near("/market/listings"), variant="near"),
+    Scenario("GET /market/listings/batch", _batch(
+        "/market/listings/batch",
+        lambda rng, ds: [id for id, _, _ in rng.sample(ds.market, min(BATCH_IDS, len(ds.market)))],
+    )),
+    Scenario("POST /market/listings", _create_market_listing),
+    Scenario("POST /market/listings/bulk", _bulk("/market/listings/bulk", _market_listing)),
+    Scenario("GET /market/my-listings", _get("/market/my-listings", limit=20)),
+    Scenario("GET /market/listings/export", _export_market),
+    Scenario("GET /market/listings/facets", _get("/market/listings/facets", min_price=5000)),
+    Scenario("GET /market/listings/{listing_id}", _get_random(
+        "/market/listings/{id}", lambda rng, ds: rng.choice(ds.market)[0]
+    )),
+    # Concurrent updates of one listing lose the optimistic lock now and then
+    Scenario("PUT /market/listings/{listing_id}", _owned(
+        "PUT", "/market/listings/{id}", "market_by_seller",
+        lambda rng, _: {"description": f"Updated {rng.randrange(10**6)}"},
+    ), expected=(200, 409)),
+    # Listings sold earlier in the run can't be bought again
+    Scenario("POST /market/transactions", _create_transaction, expected=(200, 409)),
+    Scenario("GET /market/my-transactions", _get("/market/my-transactions", limit=20)),
+    Scenario("GET /market/my-transactions/export", _get("/market/my-transactions/export")),
+    Scenario("GET /market/price-stats", _get(
+        "/market/price-stats", breed="Thoroughbred", location="Ocala", age=7
+    )),
+    Scenario("GET /rental/listings", _available_listings),
+    Scenario("GET /rental/listings", _near("/rental/listings"), variant="near"),
+    Scenario("POST /rental/listings", _create_rental_listing),
+    Scenario("POST /rental/listings/bulk", _bulk("/rental/listings/bulk", _rental_listing)),
+    Scenario("GET /rental/my-listings", _get("/rental/my-listings", limit=20)),
+    Scenario("GET /rental/listings/export", _export_rental),
+    Scenario("GET /rental/listings/{listing_id}", _get_random(
+        "/rental/listings/{id}", lambda rng, ds: rng.choice(ds.rental)[0]
+    )),
+    # As with market listings, concurrent updates lose the optimistic lock now and then
+    Scenario("PUT /rental/listings/{listing_id}", _owned(
+        "PUT", "/rental/listings/{id}", "rental_by_owner",
+        lambda rng, _: {"requirements": f"Experienced riders {rng.randrange(10**6)}"},
+    ), expected=(200, 409)),
+    # A random period now and then overlaps an earlier booking
+    Scenario("POST /rental/bookings", _create_booking, expected=(200, 409)),
+    Scenario("GET /rental/my-bookings", _get("/rental/my-bookings", limit=20)),
+    Scenario("GET /rental/my-bookings/export", _get("/rental/my-bookings/export")),
+    Scenario("PUT /rental/bookings/{booking_id}", _owned(
+        "PUT", "/rental/bookings/{id}", "bookings_by_renter",
+        lambda rng, _: {"special_requests": f"Note {rng.randrange(10**6)}"},
+    )),
+    Scenario("GET /metrics/", lambda rng, ds: ("GET", "/metrics/", _auth(ds, ds.superuser))),
+    Scenario("GET /health/live", lambda rng, ds: ("GET", "/health/live", {})),
+    Scenario("GET /health/ready", lambda rng, ds: ("GET", "/health/ready", {})),
+]
+
+
+def _uncovered_routes(app: Any, prefix: str) -> List[str]:
+    from fastapi.routing import APIRoute
+
+    covered = {scenario.route for scenario in SCENARIOS}
+    routes = [
+        f"{method} {route.path[len(prefix):]}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(prefix)
+        for method in sorted(route.methods)
+    ]
+    return [route for route in routes if route not in covered]
+
+
+async def _drive(client: Any, scenario: Scenario, ds: Dataset, prefix: str, args: Any) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+
+    async def request(rng: random.Random) -> None:
+        method, path, kwargs = scenario.build(rng, ds)
+        started = time.perf_counter()
+        response = await client.request(method, prefix + path, **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def worker(index: int, deadline: float) -> None:
+        rng = random.Random(f"{args.seed}:{scenario.name}:{index}")
+        while time.perf_counter() < deadline:
+            await request(rng)
+
+    # Warm caches and pools, then start from clean samples
+    warmup = random.Random(f"{args.seed}:{scenario.name}:warmup")
+    for _ in range(args.warmup):
+        await request(warmup)
+    latencies.clear()
+    statuses.clear()
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(i, deadline) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ok = sum(count for status, count in statuses.items() if status in scenario.expected)
+    return {
+        "requests": len(latencies),
+        "ok": ok,
+        "unexpected_statuses": {
+            str(status): count
+            for status, count in sorted(statuses.items())
+            if status not in scenario.expected
+        },
+        "throughput_rps": round(ok / elapsed, 1),
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+        },
+    }
+
+
+async def _login_remote(client: Any, ds: Dataset, prefix: str) -> None:
+    # A running server signs tokens with its own SECRET_KEY
+    for id, email in ds.users:
+        response = await client.post(
+            prefix + "/auth/login", data={"username": email, "password": PASSWORD}
+        )
+        response.raise_for_status()
+        ds.headers[id] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _upload_images(client: Any, ds: Dataset, prefix: str) -> None:
+    rng = random.Random("images")
+    for _ in range(SAMPLE_IMAGES):
+        method, path, kwargs = _upload_image(rng, ds)
+        response = await client.request(method, prefix + path, **kwargs)
+        response.raise_for_status()
+        # .../images/<digest>/large.webp
+        ds.images.append(response.json()["image_url"].split("/")[-2])
+
+
+async def _run(args: Any) -> Dict[str, Any]:
+    import httpx
+    from app.core.config import settings
+    from app.core.password_pool import password_pool
+    from app.db.session import async_engine, engine
+    from app.main import app
+
+    prefix = settings.API_V1_STR
+    scenarios = [s for s in SCENARIOS if not args.only or re.search(args.only, s.name)]
+    uncovered = _uncovered_routes(app, prefix)
+    for route in uncovered:
+        print(f"warning: no scenario for {route}", file=sys.stderr)
+
+    ds = Dataset()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60
+        )
+    results: Dict[str, Any] = {}
+    try:
+        if not args.base_url:
+            # ASGITransport doesn't send lifespan events
+            await app.router.startup()
+        async with client:
+            if args.base_url:
+                await _login_remote(client, ds, prefix)
+            if any(scenario.route.startswith(("GET /images", "HEAD /images")) for scenario in scenarios):
+                await _upload_images(client, ds, prefix)
+            for scenario in scenarios:
+                results[scenario.name] = await _drive(client, scenario, ds, prefix, args)
+                print(_row(scenario.name, results[scenario.name]), file=sys.stderr)
+    finally:
+        if args.base_url:
+            password_pool.shutdown()
+            engine.dispose()
+            if async_engine is not None:
+                await async_engine.dispose()
+        else:
+            # Disposes of the engines and pools too
+            await app.router.shutdown()
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "mode": "async" if settings.DB_ASYNC else "sync",
+            "target": args.base_url or "asgi",
+            "scale": args.scale,
+            "seed": args.seed,
+            "counts": ds.counts,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "uncovered_routes": uncovered,
+        },
+        "endpoints": results,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _row(name: str, result: Dict[str, Any]) -> str:
+    latency = result["latency_ms"]
+    unexpected = sum(result["unexpected_statuses"].values())
+    return (
+        f"{name:<44}{result['throughput_rps']:>10}{latency['p50']:>10}"
+        f"{latency['p95']:>10}{latency['p99']:>10}{unexpected:>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-url",
+        help="Database to seed and benchmark (default: DATABASE_URL / the configured Postgres)",
+    )
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Serve the async (DB_ASYNC) endpoints")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint")
+    parser.add_argument("--only", help="Regex; only benchmark endpoints whose name matches")
+    parser.add_argument("--base-url", help="Benchmark a running server instead (same database)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    url = args.database_url or os.environ.get("DATABASE_URL")
+    env = dict(os.environ, **({"DATABASE_URL": url} if url else {}))
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.seed", "--scale", args.scale,
+         "--seed", str(args.seed), "--if-empty"],
+        env=env, check=True,
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if url and url.startswith("sqlite:///") and not args.base_url:
+            # Run on a copy so the seeded file stays as it was
+            copy = os.path.join(tmp, "bench.db")
+            shutil.copyfile(url[len("sqlite:///"):], copy)
+            url = f"sqlite:///{copy}"
+        if url:
+            os.environ["DATABASE_URL"] = url
+        if not args.base_url:
+            os.environ["MEDIA_ROOT"] = os.path.join(tmp, "media")
+        os.environ["DB_ASYNC"] = "true" if args.use_async else "false"
+
+        print(f"{'endpoint':<44}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}",
+              file=sys.stderr)
+        report = asyncio.run(_run(args))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Query latency with and without the query-shape indexes.
+
+Times the CRUD calls behind the list, export and facet endpoints (ORM
+loading included) against a seeded database, first without the indexes
+added by migration 0002 and then with them, and reports the median and
+p95 latency of each query shape:
+
+    python -m benchmarks.seed --scale 100k --database-url sqlite:///bench-100k.db
+    python -m benchmarks.indexes --database-url sqlite:///bench-100k.db \\
+        --output results/indexes-100k.json
+
+Parameters (owners, buyers, horses) are drawn from a seeded random
+generator, so both passes run the same calls. A SQLite database is copied
+first; on Postgres the indexes are dropped and recreated in place, so run
+it against a benchmark database only.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple
+
+from benchmarks import percentile
+
+# Indexes of migration 0002, as declared on the models
+QUERY_INDEXES = (
+    "ix_horses_owner",
+    "ix_horse_images_horse",
+    "ix_market_listings_seller",
+    "ix_market_listings_status",
+    "ix_market_listings_active_price",
+    "ix_transactions_buyer",
+    "ix_rental_listings_owner",
+    "ix_rental_bookings_renter",
+)
+# Distinct parameter values each query shape cycles through
+SAMPLES = 20
+
+
+class Shape(NamedTuple):
+    name: str
+    # (db, rng, sample ids) -> number of rows returned
+    run: Callable[[Any, random.Random, Dict[str, List[int]]], int]
+
+
+def _shapes() -> List[Shape]:
+    from app.crud import crud_horse, crud_market, crud_rental
+    from app.models.market import ListingStatus
+
+    active = ListingStatus.ACTIVE
+    return [
+        Shape("horses by owner", lambda db, rng, ids: len(
+            crud_horse.horse.get_by_owner(db, owner_id=rng.choice(ids["owners"]), limit=20)
+        )),
+        Shape("images of a horse", lambda db, rng, ids: len(
+            crud_horse.horse.get_images(db, horse_id=rng.choice(ids["horses"]))
+        )),
+        Shape("market listings by seller", lambda db, rng, ids: len(
+            crud_market.market.get_by_seller(db, seller_id=rng.choice(ids["sellers"]), limit=20)
+        )),
+        Shape("active market listings", lambda db, rng, ids: len(
+            crud_market.market.get_active_listings(db, limit=20)
+        )),
+        Shape("sold market listings export", lambda db, rng, ids: len(
+            db.execute(crud_market.market.select_listings(
+                filters={"status": ListingStatus.SOLD}
+            ).limit(100)).all()
+        )),
+        Shape("active listings in a price range", lambda db, rng, ids: len(
+            db.execute(crud_market.market.select_listings(
+                filters={"status": active, "price": {"min": 100_000, "max": 101_000}}
+            ).limit(100)).all()
+        )),
+        Shape("market facets over a price range", lambda db, rng, ids: (
+            crud_market.market.get_facets(
+                db, filters={"status": active, "price": {"min": 140_000}}
+            )["total"]
+        )),
+        Shape("transactions by buyer", lambda db, rng, ids: len(
+            crud_market.market.get_transactions_by_buyer(
+                db, buyer_id=rng.choice(ids["owners"]), limit=20
+            )
+        )),
+        Shape("rental listings by owner", lambda db, rng, ids: len(
+            crud_rental.rental_listing.get_by_owner(
+                db, owner_id=rng.choice(ids["rental_owners"]), limit=20
+            )
+        )),
+        Shape("rental bookings by renter", lambda db, rng, ids: len(
+            crud_rental.rental_booking.get_by_renter(
+                db, renter_id=rng.choice(ids["renters"]), limit=20
+            )
+        )),
+        Shape("available rental listings", lambda db, rng, ids: len(
+            crud_rental.rental_listing.get_available_listings(db, limit=20)
+        )),
+    ]
+
+
+def _sample_ids(db: Any, seed: int) -> Dict[str, List[int]]:
+    from sqlalchemy import func, select
+
+    from app.models.horse import Horse
+    from app.models.market import MarketListing
+    from app.models.rental import RentalBooking, RentalListing
+
+    rng = random.Random(seed)
+
+    def sample(column: Any) -> List[int]:
+        ids = list(db.scalars(select(column).distinct().order_by(column)))
+        return rng.sample(ids, min(SAMPLES, len(ids))) or [0]
+
+    max_horse = db.scalar(select(func.max(Horse.id))) or 0
+    return {
+        "owners": sample(Horse.owner_id),
+        "horses": [rng.randint(1, max(1, max_horse)) for _ in range(SAMPLES)],
+        "sellers": sample(MarketListing.seller_id),
+        "rental_owners": sample(RentalListing.owner_id),
+        "renters": sample(RentalBooking.renter_id),
+    }
+
+
+def _set_indexes(engine: Any, present: bool) -> None:
+    from app.models.base import Base
+
+    indexes = [
+        index
+        for table in Base.metadata.sorted_tables
+        for index in table.indexes
+        if index.name in QUERY_INDEXES
+    ]
+    for index in indexes:
+        if present:
+            index.create(engine, checkfirst=True)
+        else:
+            index.drop(engine, checkfirst=True)
+    with engine.begin() as connection:
+        # Fresh planner statistics either way
+        connection.exec_driver_sql("ANALYZE")
+
+
+def _measure(shape: Shape, ids: Dict[str, List[int]], args: Any) -> Dict[str, Any]:
+    from app.db.session import SessionLocal
+
+    rng = random.Random(f"{args.seed}:{shape.name}")
+    latencies = []
+    rows = 0
+    db = SessionLocal()
+    try:
+        for i in range(args.warmup + args.repeat):
+            started = time.perf_counter()
+            rows = shape.run(db, rng, ids)
+            elapsed = (time.perf_counter() - started) * 1000
+            # Nothing cached in the session between calls
+            db.rollback()
+            db.expunge_all()
+            if i >= args.warmup:
+                latencies.append(elapsed)
+    finally:
+        db.close()
+    return {
+        "rows": rows,
+        "p50": round(percentile(latencies, 50), 3),
+        "p95": round(percentile(latencies, 95), 3),
+    }
+
+
+def _run(args: Any) -> Dict[str, Any]:
+    from app.core.password_pool import password_pool
+    from app.db.session import SessionLocal, engine
+
+    shapes = _shapes()
+    db = SessionLocal()
+    try:
+        ids = _sample_ids(db, args.seed)
+    finally:
+        db.close()
+    results: Dict[str, Dict[str, Any]] = {shape.name: {} for shape in shapes}
+    try:
+        for phase, present in (("before", False), ("after", True)):
+            _set_indexes(engine, present)
+            for shape in shapes:
+                results[shape.name][phase] = _measure(shape, ids, args)
+        for shape in shapes:
+            print(_row(shape.name, results[shape.name]), file=sys.stderr)
+    finally:
+        password_pool.shutdown()
+        engine.dispose()
+
+    return {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": engine.dialect.name,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "indexes": list(QUERY_INDEXES),
+        },
+        "queries": results,
+    }
+
+
+def _row(name: str, result: Dict[str, Any]) -> str:
+    before, after = result["before"], result["after"]
+    speedup = before["p50"] / after["p50"] if after["p50"] else 0.0
+    return (
+        f"{name:<36}{before['p50']:>10}{before['p95']:>10}"
+        f"{after['p50']:>10}{after['p95']:>10}{speedup:>9.1f}x{after['rows']:>7}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--database-url",
+        help="Seeded database (default: DATABASE_URL / the configured Postgres)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=50, help="Measured calls per query shape")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured calls per query shape")
+    parser.add_argument("--output", default="index-results.json")
+    args = parser.parse_args()
+
+    url = args.database_url or os.environ.get("DATABASE_URL")
+    with tempfile.TemporaryDirectory() as tmp:
+        if url and url.startswith("sqlite:///"):
+            # Work on a copy so the seeded file keeps its indexes as they were
+            copy = os.path.join(tmp, "bench.db")
+            shutil.copyfile(url[len("sqlite:///"):], copy)
+            url = f"sqlite:///{copy}"
+        if url:
+            os.environ["DATABASE_URL"] = url
+        os.environ["DB_ASYNC"] = "false"
+
+        print(
+            f"{'query':<36}{'p50 ms':>10}{'p95 ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p50':>10}{'rows':>7}\n{'':<36}{'before':^20}{'after':^20}",
+            file=sys.stderr,
+        )
+        report = _run(args)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
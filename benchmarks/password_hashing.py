@@ -0,0 +1,161 @@
+"""
+Login throughput and its effect on unrelated endpoints.
+
+Runs a burst of concurrent logins while a second client keeps browsing
+`/market/listings`, once with bcrypt inline on the request threads and once
+in the hashing process pool, and reports login throughput, how many logins
+were shed with 503, and browse p50/p99 with and without the burst:
+
+    python -m benchmarks.password_hashing --logins 200 --concurrency 64
+
+Each mode runs in a fresh interpreter since the hashing settings are read
+at import time.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks import percentile
+
+MODES = {"inline": "0", "pool": str(os.cpu_count() or 2)}
+
+
+async def _browse(client, headers, stop: asyncio.Event, latencies: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/api/v1/market/listings?limit=20", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def _login(client, semaphore, statuses: List[int]) -> None:
+    async with semaphore:
+        response = await client.post(
+            "/api/v1/auth/login",
+            data={"username": "bench@example.com", "password": "benchmark-password"},
+        )
+        statuses.append(response.status_code)
+
+
+async def _run(args) -> Dict:
+    import httpx
+    from app.core.security import create_access_token
+    from app.crud import crud_horse, crud_market, crud_user
+    from app.db.session import SessionLocal, engine
+    from app.main import app
+    from app.models.base import Base
+    from app.models.horse import HorseBreed, HorseGender
+    from app.schemas import HorseCreate, MarketListingCreate, UserCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = crud_user.user.create(
+        db,
+        obj_in=UserCreate(
+            email="bench@example.com", username="bench", password="benchmark-password"
+        ),
+    )
+    for i in range(50):
+        horse = crud_horse.horse.create_with_owner(
+            db,
+            obj_in=HorseCreate(
+                name=f"Horse {i}", breed=HorseBreed.ARABIAN, age=5,
+                gender=HorseGender.MARE, color="bay",
+            ),
+            owner_id=user.id,
+        )
+        crud_market.market.create_with_seller(
+            db,
+            obj_in=MarketListingCreate(horse_id=horse.id, price=1000 + i, location="Here"),
+            seller_id=user.id,
+        )
+    headers = {"Authorization": f"Bearer {create_access_token(user.id)}"}
+    db.close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the hashing pool and the principal cache
+        await client.post(
+            "/api/v1/auth/login",
+            data={"username": "bench@example.com", "password": "benchmark-password"},
+        )
+        await client.get("/api/v1/market/listings", headers=headers)
+
+        baseline: List[float] = []
+        stop = asyncio.Event()
+        browser = asyncio.create_task(_browse(client, headers, stop, baseline))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        await browser
+
+        during: List[float] = []
+        statuses: List[int] = []
+        stop = asyncio.Event()
+        browser = asyncio.create_task(_browse(client, headers, stop, during))
+        semaphore = asyncio.Semaphore(args.concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(_login(client, semaphore, statuses) for _ in range(args.logins))
+        )
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await browser
+
+    ok = statuses.count(200)
+    return {
+        "logins": len(statuses),
+        "logins_ok": ok,
+        "logins_shed_503": statuses.count(503),
+        "login_throughput_per_s": round(ok / elapsed, 1),
+        "browse_baseline_p50_ms": round(percentile(baseline, 50), 2),
+        "browse_baseline_p99_ms": round(percentile(baseline, 99), 2),
+        "browse_during_burst_p50_ms": round(percentile(during, 50), 2),
+        "browse_during_burst_p99_ms": round(percentile(during, 99), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    parser.add_argument("--mode", choices=sorted(MODES))
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(_run(args))))
+        return
+
+    results = {}
+    for mode, workers in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                PASSWORD_HASH_WORKERS=workers,
+            )
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.password_hashing",
+                    "--mode", mode,
+                    "--logins", str(args.logins),
+                    "--concurrency", str(args.concurrency),
+                    "--baseline-seconds", str(args.baseline_seconds),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'metric':<30}" + "".join(f"{mode:>12}" for mode in results))
+    for metric in metrics:
+        print(f"{metric:<30}" + "".join(f"{results[m][metric]:>12}" for m in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Statements per list endpoint, checked against a fixed budget.
+
+Every list endpoint whose response nests related rows must run the same,
+small number of statements however long the page is, i.e. load the nested
+rows eagerly rather than once per item. This requests each of them at two
+page sizes, counts the statements all sessions run meanwhile (relationship
+loads included) with `app.db.query_count.assert_max_queries`, and fails if
+either page exceeds the endpoint's budget or the two counts differ:
+
+    python -m benchmarks.query_counts
+
+Runs with the sync and the async stack, each in a fresh interpreter since
+DB_ASYNC is read at import time, against a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+MODES = {"sync": "false", "async": "true"}
+PAGE_SIZES = (10, 100)
+# Rows of each kind seeded, more than the largest page
+ROWS = 120
+# Most statements one request may run: the page, plus one per nested
+# collection loaded with selectinload
+BUDGETS = {
+    "/api/v1/horses/": 2,
+    "/api/v1/market/listings": 2,
+    "/api/v1/market/my-listings": 2,
+    "/api/v1/market/my-transactions": 2,
+    "/api/v1/rental/listings": 2,
+    "/api/v1/rental/my-bookings": 2,
+}
+
+
+def _seed() -> Dict[str, int]:
+    from sqlalchemy import insert, select
+
+    from app.core.security import get_password_hash
+    from app.db.session import SessionLocal, engine
+    from app.models.base import Base
+    from app.models.horse import Horse, HorseBreed, HorseGender, HorseImage
+    from app.models.market import ListingStatus, MarketListing, Transaction
+    from app.models.rental import BookingStatus, RentalBooking, RentalDuration, RentalListing
+    from app.models.user import User
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    hashed = get_password_hash("benchmark-password")
+    db.execute(insert(User), [
+        {"email": email, "username": email, "hashed_password": hashed, "is_active": True}
+        for email in ("owner@example.com", "customer@example.com")
+    ])
+    owner_id, customer_id = db.scalars(select(User.id).order_by(User.id)).all()
+    db.execute(insert(Horse), [
+        {
+            "name": f"Horse {i}", "breed": HorseBreed.ARABIAN, "age": 5,
+            "gender": HorseGender.MARE, "color": "bay", "owner_id": owner_id,
+        }
+        for i in range(ROWS)
+    ])
+    horse_ids = db.scalars(select(Horse.id).order_by(Horse.id)).all()
+    db.execute(insert(HorseImage), [
+        {"horse_id": horse_id, "image_url": f"/media/{horse_id}.jpg", "is_primary": True}
+        for horse_id in horse_ids
+    ])
+    # Half of the market listings are on sale, the other half sold to the customer
+    db.execute(insert(MarketListing), [
+        {
+            "horse_id": horse_id, "seller_id": owner_id, "price": 1000, "location": "Here",
+            "status": ListingStatus.ACTIVE if i % 2 else ListingStatus.SOLD,
+        }
+        for i, horse_id in enumerate(horse_ids + horse_ids)
+    ])
+    sold = db.scalars(
+        select(MarketListing.id).where(MarketListing.status == ListingStatus.SOLD)
+    ).all()
+    db.execute(insert(Transaction), [
+        {"listing_id": listing_id, "buyer_id": customer_id, "final_price": 1000,
+         "payment_method": "card", "payment_status": "paid"}
+        for listing_id in sold
+    ])
+    db.execute(insert(RentalListing), [
+        {
+            "horse_id": horse_id, "owner_id": owner_id, "price_per_day": 50,
+            "location": "Here", "available_durations": "Daily",
+        }
+        for horse_id in horse_ids
+    ])
+    rental_ids = db.scalars(select(RentalListing.id).order_by(RentalListing.id)).all()
+    start = datetime(2030, 1, 1)
+    db.execute(insert(RentalBooking), [
+        {
+            "rental_listing_id": rental_id, "renter_id": customer_id,
+            "start_date": start, "end_date": start + timedelta(days=7),
+            "duration_type": RentalDuration.DAILY, "total_price": 350,
+            "status": BookingStatus.CONFIRMED,
+        }
+        for rental_id in rental_ids
+    ])
+    db.commit()
+    db.close()
+    return {"owner": owner_id, "customer": customer_id}
+
+
+async def _run() -> Dict[str, Dict[int, int]]:
+    import httpx
+    from sqlalchemy.orm import Session
+
+    from app.core.admission import admission
+    from app.core.security import create_access_token
+    from app.db.query_count import assert_max_queries
+    from app.main import app, dispose_engines
+
+    users = _seed()
+    # The "my-" pages are the customer's bookings and transactions and the
+    # owner's listings
+    as_user = {
+        path: users["owner" if path.endswith("my-listings") else "customer"] for path in BUDGETS
+    }
+    tokens = {user_id: create_access_token(user_id) for user_id in users.values()}
+
+    # Startup handlers don't run under ASGITransport
+    admission.size_threadpool()
+    counts: Dict[str, Dict[int, int]] = {}
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path, budget in BUDGETS.items():
+                headers = {"Authorization": f"Bearer {tokens[as_user[path]]}"}
+                # Fills the principal cache, so that only the page is counted
+                (await client.get(path, params={"limit": 1}, headers=headers)).raise_for_status()
+                counts[path] = {}
+                for size in PAGE_SIZES:
+                    # Each limit is its own response cache key, so nothing is served from it
+                    with assert_max_queries(Session, budget) as counter:
+                        response = await client.get(path, params={"limit": size}, headers=headers)
+                    response.raise_for_status()
+                    if len(response.json()) != size:
+                        raise AssertionError(f"{path}?limit={size} returned {len(response.json())} rows")
+                    counts[path][size] = counter.count
+                if len(set(counts[path].values())) != 1:
+                    raise AssertionError(f"{path} runs more statements for longer pages: {counts[path]}")
+    finally:
+        # Nor do shutdown handlers; aiosqlite's threads would keep us alive
+        await dispose_engines()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=sorted(MODES))
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(_run())))
+        return
+
+    results: Dict[str, Dict[str, Dict[str, int]]] = {}
+    failed: List[str] = []
+    for mode, enabled in MODES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                DB_ASYNC=enabled,
+                REQUEST_METRICS_ENABLED="false",
+            )
+            run = subprocess.run(
+                [sys.executable, "-m", "benchmarks.query_counts", "--mode", mode],
+                env=env, capture_output=True, text=True,
+            )
+        if run.returncode:
+            failed.append(mode)
+            print(f"{mode}:\n{run.stderr}", file=sys.stderr)
+            continue
+        results[mode] = json.loads(run.stdout.strip().splitlines()[-1])
+
+    columns = [f"{mode}@{size}" for mode in results for size in PAGE_SIZES]
+    print(f"{'endpoint':<34}{'budget':>8}" + "".join(f"{column:>12}" for column in columns))
+    for path, budget in BUDGETS.items():
+        cells = [results[mode][path][str(size)] for mode in results for size in PAGE_SIZES]
+        print(f"{path:<34}{budget:>8}" + "".join(f"{cell:>12}" for cell in cells))
+    if failed:
+        raise SystemExit(f"Failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
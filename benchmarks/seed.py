@@ -0,0 +1,282 @@
+"""
+Deterministic benchmark datasets.
+
+Seeds users, horses (one image each), market listings, rental listings and
+bookings into the configured database. Every value, timestamp included,
+comes from a `random.Random(seed)`, so the same scale and seed produce the
+same rows (and, on an empty database, the same ids) every time:
+
+    python -m benchmarks.seed --scale 10k --database-url sqlite:///bench-10k.db
+
+Seeded users log in as `bench<N>@example.com` with `benchmark-password`;
+`bench0` is a superuser.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+PASSWORD = "benchmark-password"
+EPOCH = datetime(2024, 1, 1)
+# Bookings start here so that runs adding new ones don't collide with them
+BOOKINGS_FROM = datetime(2025, 1, 1)
+HORSES_PER_USER = 20
+MARKET_SHARE = 0.3
+RENTAL_SHARE = 0.3
+BOOKINGS_PER_LISTING = 3
+CHUNK_SIZE = 10_000
+
+LOCATIONS = [
+    "Lexington", "Ocala", "Newmarket", "Chantilly", "Dubai", "Wellington",
+    "Aachen", "Calgary", "Melbourne", "Kildare", "Saratoga", "Verden",
+]
+# Where each location is; listings are scattered around it
+COORDINATES = {
+    "Lexington": (38.04, -84.50), "Ocala": (29.19, -82.14), "Newmarket": (52.24, 0.41),
+    "Chantilly": (49.19, 2.47), "Dubai": (25.20, 55.27), "Wellington": (26.66, -80.27),
+    "Aachen": (50.78, 6.08), "Calgary": (51.05, -114.07), "Melbourne": (-37.81, 144.96),
+    "Kildare": (53.16, -6.91), "Saratoga": (43.08, -73.78), "Verden": (52.92, 9.23),
+}
+COLORS = ["bay", "chestnut", "black", "grey", "palomino", "roan", "dun", "pinto"]
+NAME_PARTS = [
+    "Storm", "Silver", "Midnight", "Thunder", "Star", "Shadow", "Blaze",
+    "Spirit", "Duke", "Bella", "Apollo", "Luna", "Comet", "Maverick",
+]
+TRAINING_LEVELS = ["Green", "Novice", "Intermediate", "Advanced", "Grand Prix"]
+
+
+def scale_counts(horses: int) -> Dict[str, int]:
+    rental = int(horses * RENTAL_SHARE)
+    return {
+        "users": max(10, horses // HORSES_PER_USER),
+        "horses": horses,
+        "horse_images": horses,
+        "market_listings": int(horses * MARKET_SHARE),
+        "rental_listings": rental,
+        "rental_bookings": rental * BOOKINGS_PER_LISTING,
+    }
+
+
+def _located(rng: random.Random, row: Dict[str, Any]) -> Dict[str, Any]:
+    # Coordinates mostly within ~100 km of the listing's location
+    lat, lon = COORDINATES[row["location"]]
+    return {
+        **row,
+        "latitude": round(lat + rng.gauss(0, 0.4), 5),
+        "longitude": round(lon + rng.gauss(0, 0.4), 5),
+    }
+
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int = CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _stamp(rng: random.Random) -> Dict[str, datetime]:
+    created = EPOCH + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+    return {"created_at": created, "updated_at": created}
+
+
+def _users(count: int, hashed_password: str) -> Iterator[Dict[str, Any]]:
+    for i in range(count):
+        yield {
+            "email": f"bench{i}@example.com",
+            "username": f"bench{i}",
+            "hashed_password": hashed_password,
+            "full_name": f"Bench User {i}",
+            "is_active": True,
+            "is_verified": True,
+            # Scenarios for superuser-only endpoints use the first user
+            "is_superuser": i == 0,
+            "created_at": EPOCH,
+            "updated_at": EPOCH,
+        }
+
+
+def _horses(rng: random.Random, count: int, user_ids: List[int]) -> Iterator[Dict[str, Any]]:
+    from app.models.horse import HorseBreed, HorseGender
+
+    breeds, genders = list(HorseBreed), list(HorseGender)
+    for i in range(count):
+        name = f"{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)} {i}"
+        yield {
+            "name": name,
+            "breed": rng.choice(breeds),
+            "age": rng.randint(1, 30),
+            "gender": rng.choice(genders),
+            "color": rng.choice(COLORS),
+            "height": round(rng.uniform(12, 18), 1),
+            "weight": round(rng.uniform(350, 750), 1),
+            "description": f"{name} is a {rng.choice(TRAINING_LEVELS).lower()} horse from {rng.choice(LOCATIONS)}.",
+            "training_level": rng.choice(TRAINING_LEVELS),
+            "owner_id": user_ids[i % len(user_ids)],
+            **_stamp(rng),
+        }
+
+
+def seed(scale: str, seed: int = 0, if_empty: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Create the schema and seed `scale` into it. Refuses to touch a database
+    that already has users, since ids (and so every benchmark request) would
+    then differ from a fresh run; with `if_empty` it leaves it as it is and
+    returns None instead.
+    """
+    from sqlalchemy import func, select
+
+    from app.core.security import get_password_hash
+    from app.crud import crud_horse, crud_market, crud_rental, crud_user
+    from app.db.session import SessionLocal, engine
+    from app.models.base import Base
+    from app.models.horse import HorseImage
+    from app.models.market import ListingStatus
+    from app.models.rental import BookingStatus, RentalDuration, RentalStatus
+    from app.models.user import User
+
+    counts = scale_counts(SCALES[scale])
+    rng = random.Random(seed)
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        if db.scalar(select(func.count()).select_from(User)):
+            if if_empty:
+                return None
+            raise SystemExit("Database already has users; seed into an empty one")
+
+        # Hashing is deliberately slow, so every user shares one hash
+        hashed = get_password_hash(PASSWORD)
+        user_ids: List[int] = []
+        for chunk in _chunks(_users(counts["users"], hashed)):
+            user_ids += crud_user.user.create_many(db, objs_in=chunk)
+
+        horse_ids: List[int] = []
+        owners: List[int] = []
+        for chunk in _chunks(_horses(rng, counts["horses"], user_ids)):
+            horse_ids += crud_horse.horse.create_many(db, objs_in=chunk)
+            owners += [row["owner_id"] for row in chunk]
+
+        images = (
+            {
+                "horse_id": horse_id,
+                "image_url": f"https://images.example.com/horses/{horse_id}/0.jpg",
+                "is_primary": True,
+            }
+            for horse_id in horse_ids
+        )
+        for chunk in _chunks(images):
+            crud_horse.horse.create_many(db, objs_in=chunk, model=HorseImage)
+
+        # Sample horses for each kind of listing independently, so some
+        # horses are both for sale and for rent
+        statuses = [ListingStatus.ACTIVE] * 8 + [ListingStatus.PENDING, ListingStatus.SOLD]
+        market_rows = (
+            {
+                "horse_id": horse_ids[i],
+                "seller_id": owners[i],
+                "price": round(rng.uniform(1_000, 150_000), 2),
+                "description": f"Listing for horse {horse_ids[i]}",
+                "status": rng.choice(statuses),
+                "is_negotiable": rng.random() < 0.5,
+                "location": rng.choice(LOCATIONS),
+                **_stamp(rng),
+            }
+            for i in sorted(rng.sample(range(len(horse_ids)), counts["market_listings"]))
+        )
+        # Coordinates come from their own generator, so adding them left
+        # every other seeded value as it was
+        places = random.Random(f"{seed}:coordinates")
+        for chunk in _chunks(market_rows):
+            crud_market.market.create_many(
+                db, objs_in=[_located(places, row) for row in chunk]
+            )
+
+        durations = list(RentalDuration)
+        rental_rows = []
+        for i in sorted(rng.sample(range(len(horse_ids)), counts["rental_listings"])):
+            per_day = round(rng.uniform(50, 500), 2)
+            offered = rng.sample(durations, rng.randint(1, len(durations)))
+            rental_rows.append({
+                "horse_id": horse_ids[i],
+                "owner_id": owners[i],
+                "price_per_hour": round(per_day / 6, 2),
+                "price_per_day": per_day,
+                "price_per_week": round(per_day * 6, 2),
+                "price_per_month": round(per_day * 25, 2),
+                "description": f"Rent horse {horse_ids[i]}",
+                "status": RentalStatus.AVAILABLE if rng.random() < 0.9 else RentalStatus.UNAVAILABLE,
+                "location": rng.choice(LOCATIONS),
+                "available_durations": ",".join(d.value for d in durations if d in offered),
+                **_stamp(rng),
+            })
+        listings = []
+        for chunk in _chunks(iter(rental_rows)):
+            chunk = [_located(places, row) for row in chunk]
+            ids = crud_rental.rental_listing.create_many(db, objs_in=chunk)
+            listings += [(id, row["owner_id"], row["price_per_day"]) for id, row in zip(ids, chunk)]
+        del rental_rows
+
+        def bookings() -> Iterator[Dict[str, Any]]:
+            # Back-to-back bookings with gaps, never overlapping per listing
+            for listing_id, owner_id, per_day in listings:
+                start = BOOKINGS_FROM + timedelta(days=rng.randrange(60))
+                for _ in range(BOOKINGS_PER_LISTING):
+                    days = rng.randint(1, 14)
+                    end = start + timedelta(days=days)
+                    index = rng.randrange(len(user_ids))
+                    if user_ids[index] == owner_id:
+                        index = (index + 1) % len(user_ids)
+                    yield {
+                        "rental_listing_id": listing_id,
+                        "renter_id": user_ids[index],
+                        "start_date": start,
+                        "end_date": end,
+                        "duration_type": RentalDuration.DAILY,
+                        "total_price": round(per_day * days, 2),
+                        "status": rng.choice([BookingStatus.CONFIRMED, BookingStatus.COMPLETED]),
+                        **_stamp(rng),
+                    }
+                    start = end + timedelta(days=rng.randint(0, 30))
+
+        for chunk in _chunks(bookings()):
+            crud_rental.rental_booking.create_many(db, objs_in=chunk)
+    finally:
+        db.close()
+    return {
+        "scale": scale,
+        "seed": seed,
+        "counts": counts,
+        "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=SCALES, default="10k")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--database-url",
+        help="Target database (default: DATABASE_URL / the configured Postgres)",
+    )
+    parser.add_argument(
+        "--if-empty", action="store_true", help="Do nothing if the database is already seeded"
+    )
+    args = parser.parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    result = seed(args.scale, args.seed, if_empty=args.if_empty)
+    if result is not None:
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
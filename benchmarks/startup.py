@@ -0,0 +1,186 @@
+"""
+Time to the first fast request after a worker starts, with and without warm-up.
+
+Starts `python -m app.serve` against a freshly seeded SQLite database,
+once with WARMUP_ENABLED off and once on, and from launch on polls
+/api/v1/health/ready the way a load balancer would. As soon as it passes,
+sends rounds of requests to a few endpoints (including a login) and
+reports when the worker became ready, how slow the first request to each
+endpoint was next to its steady-state p50, and how long after launch the
+first round came back with every request fast, i.e. within twice its
+steady-state p50 plus a millisecond:
+
+    python -m benchmarks.startup --workers 1 --rounds 30
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks import percentile
+
+MODES = {"cold": "false", "warm": "true"}
+# (name, method, path); logins send the form below
+PROBES: List[Tuple[str, str, str]] = [
+    ("market_listings", "GET", "/api/v1/market/listings?limit=20"),
+    ("rental_listings", "GET", "/api/v1/rental/listings?limit=20"),
+    ("horses", "GET", "/api/v1/horses/?limit=20"),
+    ("horse", "GET", "/api/v1/horses/1"),
+    ("price_stats", "GET", "/api/v1/market/price-stats"),
+    ("login", "POST", "/api/v1/auth/login"),
+]
+LOGIN = {"username": "bench@example.com", "password": "benchmark-password"}
+SECRET_KEY = "startup-benchmark"
+
+
+def _seed(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    from app.crud import crud_horse, crud_market, crud_rental, crud_user
+    from app.db.session import SessionLocal, engine
+    from app.models.base import Base
+    from app.models.horse import HorseBreed, HorseGender
+    from app.schemas import HorseCreate, MarketListingCreate, RentalListingCreate, UserCreate
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user = crud_user.user.create(
+        db, obj_in=UserCreate(email=LOGIN["username"], username="bench", password=LOGIN["password"])
+    )
+    for i in range(50):
+        horse = crud_horse.horse.create_with_owner(
+            db,
+            obj_in=HorseCreate(
+                name=f"Horse {i}", breed=HorseBreed.ARABIAN, age=5,
+                gender=HorseGender.MARE, color="bay",
+            ),
+            owner_id=user.id,
+        )
+        crud_market.market.create_with_seller(
+            db,
+            obj_in=MarketListingCreate(horse_id=horse.id, price=1000 + i, location="Here"),
+            seller_id=user.id,
+        )
+        crud_rental.rental_listing.create_with_owner(
+            db,
+            obj_in=RentalListingCreate(
+                horse_id=horse.id, price_per_day=50 + i, location="Here",
+                available_durations="Daily",
+            ),
+            owner_id=user.id,
+        )
+    db.close()
+    engine.dispose()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _run(mode: str, args, database_url: str, token: str) -> Dict:
+    import httpx
+
+    port = _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        SECRET_KEY=SECRET_KEY,
+        WARMUP_ENABLED=MODES[mode],
+        REQUEST_METRICS_ENABLED="false",
+        SERVE_DRAIN_SECONDS="0",
+    )
+    launched = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    rounds: List[Dict[str, float]] = []
+    round_done: List[float] = []
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            listening = None
+            while True:
+                try:
+                    status = client.get("/api/v1/health/ready").status_code
+                except httpx.TransportError:
+                    status = None
+                if status is not None and listening is None:
+                    listening = time.perf_counter() - launched
+                if status == 200:
+                    ready = time.perf_counter() - launched
+                    break
+                if server.poll() is not None:
+                    raise RuntimeError(f"Server exited with {server.returncode}")
+                time.sleep(0.01)
+
+            for _ in range(args.rounds):
+                latencies = {}
+                for name, method, path in PROBES:
+                    started = time.perf_counter()
+                    if method == "POST":
+                        response = client.post(path, data=LOGIN)
+                    else:
+                        response = client.get(path, headers=headers)
+                    latencies[name] = (time.perf_counter() - started) * 1000
+                    response.raise_for_status()
+                rounds.append(latencies)
+                round_done.append(time.perf_counter() - launched)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+    steady = {
+        name: percentile([r[name] for r in rounds[len(rounds) // 2:]], 50)
+        for name, _, _ in PROBES
+    }
+    first_fast = next(
+        (
+            done for r, done in zip(rounds, round_done)
+            if all(r[name] <= 2 * steady[name] + 1 for name in steady)
+        ),
+        None,
+    )
+    result = {
+        "listening_s": round(listening, 2),
+        "ready_s": round(ready, 2),
+        "first_fast_round_s": round(first_fast, 2) if first_fast is not None else "-",
+        "first_round_ms": round(sum(rounds[0].values()), 1),
+        "steady_round_ms": round(sum(steady.values()), 1),
+    }
+    for name, _, _ in PROBES:
+        result[f"{name}_first_ms"] = round(rounds[0][name], 1)
+        result[f"{name}_p50_ms"] = round(steady[name], 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ["SECRET_KEY"] = SECRET_KEY
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        _seed(database_url)
+        from app.core.security import create_access_token
+
+        token = create_access_token(1)
+        results = {mode: _run(mode, args, database_url, token) for mode in MODES}
+
+    metrics = list(next(iter(results.values())))
+    print(f"{'metric':<30}" + "".join(f"{mode:>12}" for mode in results))
+    for metric in metrics:
+        print(f"{metric:<30}" + "".join(f"{results[m][metric]:>12}" for m in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from app.main import app
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    from app.serve import main
+
+    main()